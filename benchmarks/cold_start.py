@@ -0,0 +1,349 @@
+"""
+Cold-start benchmark of every Lambda handler module.
+
+Each handler is imported and invoked once in a fresh interpreter, the way a new
+Lambda container would run it, with every AWS call answered locally.  Reports
+import time, first-invocation latency and peak RSS (medians over `--runs`
+subprocesses), plus the packages that contribute most to each phase, and exits
+non-zero if a handler goes over its budget in `cold_start_budgets.json`.
+
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py --handler api.v1.places.get --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+DEFAULT_BUDGETS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "cold_start_budgets.json"
+)
+
+IMPORT_START = "--- cold start: import ---"
+INVOKE_START = "--- cold start: invoke ---"
+PHASE_END = "--- cold start: end ---"
+
+USER = "benchmark-user"
+AUTHORIZER = {"authorizer": {"claims": {"cognito:username": USER}}}
+VIEWPORT = {"min_lat": "-10", "min_lng": "-20", "max_lat": "30", "max_lng": "40"}
+PLACE = {
+    "place_id": "benchmark-place",
+    "name": "Benchmark Place",
+    "address": "1 Main St",
+    "city": "Springfield",
+    "state": "IL",
+    "country": "United States",
+    "zip_code": "62701",
+    "latitude": 39.78,
+    "longitude": -89.65,
+    "destination_id": "benchmark-destination",
+}
+DESTINATION = {
+    "place_id": "benchmark-destination",
+    "name": "Springfield",
+    "country": "United States",
+    "country_code": "US",
+    "latitude": 39.78,
+    "longitude": -89.65,
+}
+
+
+def _event(method, query=None, body=None, path="/", request_context=None):
+    return {
+        "httpMethod": method,
+        "resource": path,
+        "path": path,
+        "headers": {},
+        "queryStringParameters": query,
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+        "requestContext": request_context or {},
+    }
+
+
+# Handler -> the event it is invoked with on its first call
+HANDLERS = {
+    "api.v1.places.get": _event("GET", {"user": USER}),
+    "api.v1.places.post": _event("POST", body=PLACE, request_context=AUTHORIZER),
+    "api.v1.places.delete": _event(
+        "DELETE", {"place_id": "benchmark-place"}, request_context=AUTHORIZER
+    ),
+    "api.v1.places.viewport": _event("GET", dict(VIEWPORT, user=USER)),
+    "api.v1.destinations.get": _event("GET", {"user": USER}),
+    "api.v1.destinations.post": _event(
+        "POST", body=DESTINATION, request_context=AUTHORIZER
+    ),
+    "api.v1.destinations.delete": _event(
+        "DELETE", {"place_id": "benchmark-destination"}, request_context=AUTHORIZER
+    ),
+    "api.v1.lambda_function": _event("GET", {"user": USER}, path="/places"),
+    "api.v1.photos.get": _event("GET", {"user": USER, "place_id": "benchmark-place"}),
+    "api.v1.map.get": _event("GET", {"user": USER}, path="/map"),
+    "api.v1.clusters.get": _event("GET", dict(VIEWPORT, user=USER, zoom="4")),
+    "api.v1.auth.lambda_function": _event(
+        "POST",
+        body={"username": USER, "password": "benchmark-password"},
+        path="/auth/login",
+    ),
+}
+
+ENVIRONMENT = {
+    "AWS_DEFAULT_REGION": "us-west-2",
+    "AWS_ACCESS_KEY_ID": "benchmark",
+    "AWS_SECRET_ACCESS_KEY": "benchmark",
+    "DYNAMO_READ_ROLE_ARN": "arn:aws:iam::123456789012:role/benchmark-read",
+    "DYNAMO_WRITE_ROLE_ARN": "arn:aws:iam::123456789012:role/benchmark-write",
+    "DYNAMO_TABLE_NAME": "benchmark-table",
+    "CURSOR_SIGNING_KEY_ARN": (
+        "arn:aws:secretsmanager:us-west-2:123456789012:secret:benchmark"
+    ),
+    "USER_POOL_ID": "us-west-2_benchmark",
+    "CLIENT_ID": "benchmark-client",
+    "USER_POOL_ACCESS_ROLE_ARN": "arn:aws:iam::123456789012:role/benchmark-cognito",
+    "PHOTO_BUCKET_NAME": "benchmark-photos",
+    "PHOTO_BUCKET_ROLE_ARN": "arn:aws:iam::123456789012:role/benchmark-photos",
+}
+
+
+# --- Child process ----------------------------------------------------------
+
+
+def _stub_responses():
+    from datetime import datetime, timedelta, timezone
+
+    token = "benchmark"
+    return {
+        "AssumeRole": {
+            "Credentials": {
+                "AccessKeyId": token,
+                "SecretAccessKey": token,
+                "SessionToken": token,
+                "Expiration": datetime.now(timezone.utc) + timedelta(hours=1),
+            }
+        },
+        "GetItem": {},
+        "Query": {"Items": [], "Count": 0, "ScannedCount": 0},
+        "PutItem": {},
+        "UpdateItem": {"Attributes": {"Version": {"N": "1"}}},
+        "BatchWriteItem": {"UnprocessedItems": {}},
+        "TransactWriteItems": {},
+        "GetSecretValue": {"SecretString": token},
+        "DescribeUserPoolClient": {"UserPoolClient": {"ClientSecret": token}},
+        "InitiateAuth": {
+            "AuthenticationResult": {
+                "IdToken": token,
+                "RefreshToken": token,
+                "AccessToken": token,
+                "ExpiresIn": 3600,
+                "TokenType": "Bearer",
+            }
+        },
+    }
+
+
+class _HTTPResponse:
+    status_code = 200
+    headers: dict = {}
+
+
+def _patch_botocore(client_module):
+    """
+    Answers every request locally.  Only the HTTP round trip is replaced, so
+    parameter validation, serialization and the after-call hooks that boto3
+    resources rely on still run.
+    """
+    responses = _stub_responses()
+
+    def _make_request(self, operation_model, request_dict, request_context):
+        return _HTTPResponse(), dict(responses.get(operation_model.name, {}))
+
+    client_module.BaseClient._make_request = _make_request
+
+
+class _StubOnImport:
+    """
+    Patches botocore.client as soon as the handler imports it, so botocore's
+    import cost stays in whichever phase actually pays it.
+    """
+
+    def find_spec(self, name, path, target=None):
+        if name != "botocore.client":
+            return None
+
+        sys.meta_path.remove(self)
+        import importlib.util
+
+        spec = importlib.util.find_spec(name)
+        exec_module = spec.loader.exec_module
+
+        def exec_and_patch(module):
+            exec_module(module)
+            _patch_botocore(module)
+
+        spec.loader.exec_module = exec_and_patch
+        return spec
+
+
+class _Context:
+    function_name = "cold-start-benchmark"
+    memory_limit_in_mb = 128
+    aws_request_id = "cold-start-benchmark"
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    # Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_child(handler: str):
+    import importlib
+
+    os.environ.update(ENVIRONMENT)
+    sys.path.insert(0, SRC)
+    sys.meta_path.insert(0, _StubOnImport())
+    event = HANDLERS[handler]
+
+    sys.stderr.write(IMPORT_START + "\n")
+    start = time.perf_counter()
+    module = importlib.import_module(handler)
+    import_ms = (time.perf_counter() - start) * 1000
+    import_rss_mb = _peak_rss_mb()
+
+    sys.stderr.write(INVOKE_START + "\n")
+    start = time.perf_counter()
+    response = module.lambda_handler(event, _Context())
+    invoke_ms = (time.perf_counter() - start) * 1000
+    sys.stderr.write(PHASE_END + "\n")
+
+    print(
+        json.dumps(
+            {
+                "import_ms": import_ms,
+                "invoke_ms": invoke_ms,
+                "import_rss_mb": import_rss_mb,
+                "peak_rss_mb": _peak_rss_mb(),
+                "status_code": response["statusCode"],
+            }
+        )
+    )
+
+
+# --- Parent process ---------------------------------------------------------
+
+
+def _spawn(handler: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += [os.path.abspath(__file__), "--child", handler]
+    return subprocess.run(command, capture_output=True, text=True, check=True)
+
+
+def import_contributors(stderr: str):
+    """
+    Self import time (ms) per top-level package for each phase, parsed from the
+    `-X importtime` output between the child's phase markers.
+    """
+    phases = {"import": defaultdict(float), "invoke": defaultdict(float)}
+    phase = None
+    for line in stderr.splitlines():
+        if line == IMPORT_START:
+            phase = "import"
+        elif line == INVOKE_START:
+            phase = "invoke"
+        elif line == PHASE_END:
+            phase = None
+        elif phase and line.startswith("import time:") and "|" in line:
+            self_us, _, name = (part.strip() for part in line[12:].split("|"))
+            if self_us.isdigit():
+                phases[phase][name.split(".")[0]] += int(self_us) / 1000
+    return phases
+
+
+def measure(handler: str, runs: int):
+    results = [json.loads(_spawn(handler).stdout) for _ in range(runs)]
+    summary = {
+        key: statistics.median(result[key] for result in results)
+        for key in ("import_ms", "invoke_ms", "import_rss_mb", "peak_rss_mb")
+    }
+    summary["status_code"] = results[0]["status_code"]
+    summary["contributors"] = import_contributors(_spawn(handler, True).stderr)
+    return summary
+
+
+def over_budget(handler: str, summary, budgets):
+    budget = dict(budgets.get("default", {}), **budgets.get(handler, {}))
+    return [
+        f"{key} {summary[key]:.1f} > {limit}"
+        for key, limit in budget.items()
+        if summary.get(key, 0) > limit
+    ]
+
+
+def _top(contributors, count: int) -> str:
+    ranked = sorted(contributors.items(), key=lambda item: item[1], reverse=True)
+    return ", ".join(f"{name} {ms:.0f}" for name, ms in ranked[:count]) or "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--handler", action="append", choices=sorted(HANDLERS))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--budgets", default=DEFAULT_BUDGETS)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    with open(args.budgets) as f:
+        budgets = json.load(f)
+
+    results = {}
+    failures = []
+    for handler in args.handler or HANDLERS:
+        summary = measure(handler, args.runs)
+        results[handler] = summary
+        problems = over_budget(handler, summary, budgets)
+        failures.extend(f"{handler}: {problem}" for problem in problems)
+
+        print(
+            f"{handler:<30} import {summary['import_ms']:7.1f} ms  "
+            f"first call {summary['invoke_ms']:7.1f} ms  "
+            f"rss {summary['import_rss_mb']:5.1f} -> {summary['peak_rss_mb']:5.1f} MB  "
+            f"status {summary['status_code']}{'  OVER BUDGET' if problems else ''}"
+        )
+        print(
+            f"{'':<30} import:     {_top(summary['contributors']['import'], args.top)}"
+        )
+        print(
+            f"{'':<30} first call: {_top(summary['contributors']['invoke'], args.top)}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if failures:
+        print("\nOver budget:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
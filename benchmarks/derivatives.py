@@ -0,0 +1,96 @@
+"""
+Throughput of photo derivative rendering (`utils.images.render_all`), in images
+per second, over synthetic phone-sized JPEGs.
+
+    sequential  one image at a time, derivatives one after another
+    threads     one image at a time, derivatives in parallel on a thread pool,
+                as the derivatives worker runs them in Lambda
+    processes   several images at once on a process pool (not available in
+                Lambda, for comparison)
+
+    python benchmarks/derivatives.py --images 20 --workers 4
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.images import DERIVATIVES, render_all  # noqa: E402
+
+
+def make_jpeg(width: int, height: int, seed: int) -> bytes:
+    """
+    A JPEG with enough detail that it does not compress to nothing.
+    """
+    rng = random.Random(seed)
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(200):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randint(10, width // 8)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=color)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+def _render_sequential(data: bytes) -> int:
+    return sum(len(derivative.body) for derivative in render_all(data, DERIVATIVES))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    originals = [
+        make_jpeg(args.width, args.height, seed) for seed in range(args.images)
+    ]
+    megabytes = sum(len(data) for data in originals) / 1024 / 1024
+    print(
+        f"{args.images} originals of {args.width}x{args.height}, "
+        f"{megabytes:.1f} MiB, {args.workers} workers, {os.cpu_count()} CPUs\n"
+    )
+
+    def sequential():
+        for data in originals:
+            _render_sequential(data)
+
+    def threads():
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            for data in originals:
+                render_all(data, DERIVATIVES, executor)
+
+    def processes():
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(_render_sequential, originals))
+
+    for name, run in (
+        ("sequential", sequential),
+        ("threads", threads),
+        ("processes", processes),
+    ):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>10}: {args.images / elapsed:6.2f} images/s  "
+            f"{elapsed / args.images * 1000:7.1f} ms/image"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,683 @@
+"""
+In-process stand-ins for DynamoDB, STS, Secrets Manager and Cognito, for running
+the real handlers without AWS.
+
+`install(fakes)` replaces botocore's HTTP round trip, so everything up to the
+request (parameter validation, boto3's condition and type serialization) and
+after it (deserialization) runs as it would against AWS.  The DynamoDB
+stand-in evaluates the wire-format key condition, filter, condition, update and
+projection expressions the handlers send, which covers the subset of the
+expression language boto3 generates.
+"""
+import bisect
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+_deserializer = TypeDeserializer()
+_serializer = TypeSerializer()
+
+MISSING = object()
+
+
+class FakeAWSError(Exception):
+    def __init__(self, code: str, message: str = ""):
+        super().__init__(message or code)
+        self.code = code
+        self.message = message or code
+
+
+# --- Expressions --------------------------------------------------------------
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<number>\d+)|(?P<name>[#:]?[A-Za-z_][A-Za-z0-9_\-]*)"
+    r"|(?P<op><>|<=|>=|[=<>(),.\[\]]))"
+)
+_KEYWORDS = {"AND", "OR", "NOT", "BETWEEN", "IN"}
+
+
+def _tokenize(expression: str) -> List[str]:
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise FakeAWSError(
+                "ValidationException", f"Cannot parse <{expression[position:]}>"
+            )
+        tokens.append(match.group(match.lastgroup))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser producing nested tuples, e.g.
+    ("and", ("=", ("path", ["PK"]), ("value", "user")), ...).
+    """
+
+    def __init__(self, expression: str, names: Dict, values: Dict):
+        self._tokens = _tokenize(expression)
+        self._position = 0
+        self._names = names or {}
+        self._values = values or {}
+
+    def _peek(self) -> Optional[str]:
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+        return None
+
+    def _next(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise FakeAWSError("ValidationException", "Unexpected end of expression")
+        self._position += 1
+        return token
+
+    def _expect(self, expected: str):
+        token = self._next()
+        if token.upper() != expected:
+            raise FakeAWSError(
+                "ValidationException", f"Expected <{expected}>, got <{token}>"
+            )
+
+    def done(self) -> bool:
+        return self._peek() is None
+
+    def condition(self):
+        node = self._and()
+        while self._peek() and self._peek().upper() == "OR":
+            self._next()
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._peek() and self._peek().upper() == "AND":
+            self._next()
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        if self._peek() and self._peek().upper() == "NOT":
+            self._next()
+            return ("not", self._not())
+        return self._primary()
+
+    def _primary(self):
+        if self._peek() == "(":
+            self._next()
+            node = self.condition()
+            self._expect(")")
+            return node
+
+        token = self._peek()
+        following = (
+            self._tokens[self._position + 1]
+            if self._position + 1 < len(self._tokens)
+            else None
+        )
+        if following == "(" and token.lower() != "size":
+            return self._function()
+
+        left = self.operand()
+        operator = self._next()
+        if operator.upper() == "BETWEEN":
+            low = self.operand()
+            self._expect("AND")
+            return ("between", left, low, self.operand())
+        if operator.upper() == "IN":
+            self._expect("(")
+            options = [self.operand()]
+            while self._peek() == ",":
+                self._next()
+                options.append(self.operand())
+            self._expect(")")
+            return ("in", left, options)
+        if operator in ("=", "<>", "<", "<=", ">", ">="):
+            return (operator, left, self.operand())
+        raise FakeAWSError("ValidationException", f"Unknown operator <{operator}>")
+
+    def _function(self):
+        name = self._next().lower()
+        self._expect("(")
+        args = [self.operand()]
+        while self._peek() == ",":
+            self._next()
+            args.append(self.operand())
+        self._expect(")")
+        return ("function", name, args)
+
+    def operand(self):
+        token = self._peek()
+        if token.startswith(":"):
+            self._next()
+            if token not in self._values:
+                raise FakeAWSError("ValidationException", f"Unknown value <{token}>")
+            return ("value", _deserializer.deserialize(self._values[token]))
+        if token.lower() == "size":
+            self._next()
+            self._expect("(")
+            path = self.path()
+            self._expect(")")
+            return ("size", path)
+        return self.path()
+
+    def path(self):
+        parts: List = [self._name(self._next())]
+        while self._peek() in (".", "["):
+            if self._next() == ".":
+                parts.append(self._name(self._next()))
+            else:
+                parts.append(int(self._next()))
+                self._expect("]")
+        return ("path", parts)
+
+    def _name(self, token: str) -> str:
+        if token.startswith("#"):
+            if token not in self._names:
+                raise FakeAWSError("ValidationException", f"Unknown name <{token}>")
+            return self._names[token]
+        if token.upper() in _KEYWORDS:
+            raise FakeAWSError("ValidationException", f"Unexpected <{token}>")
+        return token
+
+
+def _resolve(item: Dict, parts: List):
+    value = item
+    for part in parts:
+        if isinstance(part, int):
+            if not isinstance(value, list) or part >= len(value):
+                return MISSING
+            value = value[part]
+        else:
+            if not isinstance(value, dict) or part not in value:
+                return MISSING
+            value = value[part]
+    return value
+
+
+def _operand(item: Dict, node):
+    kind = node[0]
+    if kind == "value":
+        return node[1]
+    if kind == "size":
+        value = _operand(item, node[1])
+        return MISSING if value is MISSING else Decimal(len(value))
+    return _resolve(item, node[1])
+
+
+def _compare(operator: str, left, right) -> bool:
+    if left is MISSING or right is MISSING:
+        return operator == "<>" and not (left is MISSING and right is MISSING)
+    try:
+        return {
+            "=": lambda: left == right,
+            "<>": lambda: left != right,
+            "<": lambda: left < right,
+            "<=": lambda: left <= right,
+            ">": lambda: left > right,
+            ">=": lambda: left >= right,
+        }[operator]()
+    except TypeError:
+        return False
+
+
+def evaluate(node, item: Dict) -> bool:
+    kind = node[0]
+    if kind == "and":
+        return evaluate(node[1], item) and evaluate(node[2], item)
+    if kind == "or":
+        return evaluate(node[1], item) or evaluate(node[2], item)
+    if kind == "not":
+        return not evaluate(node[1], item)
+    if kind == "between":
+        value = _operand(item, node[1])
+        return _compare(">=", value, _operand(item, node[2])) and _compare(
+            "<=", value, _operand(item, node[3])
+        )
+    if kind == "in":
+        value = _operand(item, node[1])
+        return any(_compare("=", value, _operand(item, o)) for o in node[2])
+    if kind == "function":
+        name, args = node[1], node[2]
+        if name == "attribute_exists":
+            return _operand(item, args[0]) is not MISSING
+        if name == "attribute_not_exists":
+            return _operand(item, args[0]) is MISSING
+        value = _operand(item, args[0])
+        operand = _operand(item, args[1])
+        if value is MISSING or operand is MISSING:
+            return False
+        if name == "begins_with":
+            return isinstance(value, str) and value.startswith(operand)
+        if name == "contains":
+            return operand in value
+        raise FakeAWSError("ValidationException", f"Unknown function <{name}>")
+    return _compare(kind, _operand(item, node[1]), _operand(item, node[2]))
+
+
+def parse_condition(expression: str, names: Dict, values: Dict):
+    parser = _Parser(expression, names, values)
+    node = parser.condition()
+    if not parser.done():
+        raise FakeAWSError("ValidationException", f"Trailing input in <{expression}>")
+    return node
+
+
+def _key_equalities(node, found: Dict):
+    if node[0] == "and":
+        _key_equalities(node[1], found)
+        _key_equalities(node[2], found)
+    elif node[0] == "=" and node[1][0] == "path" and node[2][0] == "value":
+        found[node[1][1][0]] = node[2][1]
+    return found
+
+
+def _range_bounds(node, range_key: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    The (lowest, highest) range key values a key condition can match, so a
+    query can seek into the partition rather than scan it.
+    """
+    if node[0] == "and":
+        for child in node[1:]:
+            bounds = _range_bounds(child, range_key)
+            if bounds != (None, None):
+                return bounds
+        return None, None
+
+    target = node[2][0] if node[0] == "function" else node[1]
+    if target[0] != "path" or target[1] != [range_key]:
+        return None, None
+    if node[0] == "function" and node[1] == "begins_with":
+        prefix = node[2][1][1]
+        return prefix, prefix + "\U0010ffff"
+    if node[0] == "between":
+        return node[2][1], node[3][1]
+    if node[0] == "=":
+        return node[2][1], node[2][1]
+    if node[0] in (">", ">="):
+        return node[2][1], None
+    if node[0] in ("<", "<="):
+        return None, node[2][1]
+    return None, None
+
+
+def project(item: Dict, expression: Optional[str], names: Dict) -> Dict:
+    if not expression:
+        return item
+
+    projected: Dict = {}
+    parser = _Parser(expression, names, {})
+    while True:
+        parts = parser.path()[1]
+        value = _resolve(item, parts)
+        if value is not MISSING:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+        if parser.done():
+            return projected
+        parser._expect(",")
+
+
+def apply_update(item: Dict, expression: str, names: Dict, values: Dict) -> Dict:
+    """
+    Applies SET/ADD/REMOVE clauses (plain assignments only).  Returns the
+    attributes that were written.
+    """
+    updated: Dict = {}
+    clauses = re.split(r"\b(SET|ADD|REMOVE|DELETE)\b", expression)
+    for action, body in zip(clauses[1::2], clauses[2::2]):
+        action = action.upper()
+        for assignment in filter(None, (part.strip() for part in body.split(","))):
+            parser = _Parser(assignment, names, values)
+            parts = parser.path()[1]
+            if action == "REMOVE":
+                item.pop(parts[0], None)
+                continue
+            if action == "SET":
+                parser._expect("=")
+            value = _operand(item, parser.operand())
+            if action == "ADD":
+                current = _resolve(item, parts)
+                value = value + (0 if current is MISSING else current)
+            target = item
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+            updated[parts[0]] = item[parts[0]]
+    return updated
+
+
+# --- DynamoDB -----------------------------------------------------------------
+
+
+class FakeDynamoDB:
+    """
+    A single table with a (hash, range) primary key and any number of global
+    secondary indexes over the same hash key, stored as deserialized items.
+    """
+
+    def __init__(
+        self,
+        hash_key: str = "PK",
+        range_key: str = "SK",
+        indexes: Optional[Dict[str, str]] = None,
+    ):
+        self.hash_key = hash_key
+        self.range_key = range_key
+        # Index name -> its range key
+        self.indexes = indexes or {}
+        self._partitions: Dict[str, Dict[str, Dict]] = defaultdict(dict)
+        self._sorted: Dict[Tuple[str, Optional[str]], Tuple[List, List]] = {}
+        self._lock = threading.RLock()
+
+    def _key(self, key: Dict) -> Tuple[str, str]:
+        return key[self.hash_key], key[self.range_key]
+
+    def put(self, item: Dict):
+        with self._lock:
+            pk, sk = self._key(item)
+            self._partitions[pk][sk] = item
+            self._invalidate(pk)
+
+    def get(self, key: Dict) -> Optional[Dict]:
+        pk, sk = self._key(key)
+        return self._partitions.get(pk, {}).get(sk)
+
+    def delete(self, key: Dict):
+        with self._lock:
+            pk, sk = self._key(key)
+            self._partitions.get(pk, {}).pop(sk, None)
+            self._invalidate(pk)
+
+    def _invalidate(self, pk: str):
+        for index in [None, *self.indexes]:
+            self._sorted.pop((pk, index), None)
+
+    def _ordered(self, pk: str, index: Optional[str]) -> Tuple[List, List]:
+        cached = self._sorted.get((pk, index))
+        if cached is None:
+            range_key = self.indexes[index] if index else self.range_key
+            entries = sorted(
+                ((item[range_key], item[self.range_key]), item)
+                for item in self._partitions.get(pk, {}).values()
+                # Indexes are sparse
+                if range_key in item
+            )
+            cached = ([sort for sort, _ in entries], [item for _, item in entries])
+            self._sorted[(pk, index)] = cached
+        return cached
+
+    def _check(self, params: Dict, item: Optional[Dict]):
+        expression = params.get("ConditionExpression")
+        if expression and not evaluate(
+            parse_condition(
+                expression,
+                params.get("ExpressionAttributeNames"),
+                params.get("ExpressionAttributeValues"),
+            ),
+            item or {},
+        ):
+            raise FakeAWSError(
+                "ConditionalCheckFailedException", "The conditional request failed"
+            )
+
+    def handle(self, operation: str, params: Dict) -> Dict:
+        handler = getattr(self, f"_{operation}", None)
+        if handler is None:
+            raise FakeAWSError("UnknownOperationException", operation)
+        with self._lock:
+            return handler(params)
+
+    def _GetItem(self, params: Dict) -> Dict:
+        item = self.get(_deserializer.deserialize({"M": params["Key"]}))
+        if item is None:
+            return {}
+        item = project(
+            item,
+            params.get("ProjectionExpression"),
+            params.get("ExpressionAttributeNames"),
+        )
+        return {"Item": _serialize_item(item)}
+
+    def _PutItem(self, params: Dict) -> Dict:
+        item = _deserializer.deserialize({"M": params["Item"]})
+        self._check(params, self.get(item))
+        self.put(item)
+        return {}
+
+    def _DeleteItem(self, params: Dict) -> Dict:
+        key = _deserializer.deserialize({"M": params["Key"]})
+        self._check(params, self.get(key))
+        self.delete(key)
+        return {}
+
+    def _UpdateItem(self, params: Dict) -> Dict:
+        key = _deserializer.deserialize({"M": params["Key"]})
+        existing = self.get(key)
+        self._check(params, existing)
+        item = dict(existing or key)
+        updated = apply_update(
+            item,
+            params["UpdateExpression"],
+            params.get("ExpressionAttributeNames"),
+            params.get("ExpressionAttributeValues"),
+        )
+        self.put(item)
+
+        return_values = params.get("ReturnValues", "NONE")
+        if return_values == "UPDATED_NEW":
+            return {"Attributes": _serialize_item(updated)}
+        if return_values == "ALL_NEW":
+            return {"Attributes": _serialize_item(item)}
+        return {}
+
+    def _Query(self, params: Dict) -> Dict:
+        names = params.get("ExpressionAttributeNames")
+        values = params.get("ExpressionAttributeValues")
+        key_condition = parse_condition(params["KeyConditionExpression"], names, values)
+        pk = _key_equalities(key_condition, {}).get(self.hash_key)
+        index = params.get("IndexName")
+        range_key = self.indexes[index] if index else self.range_key
+        sort_keys, items = self._ordered(pk, index)
+
+        lower, upper = _range_bounds(key_condition, range_key)
+        start = 0 if lower is None else bisect.bisect_left(sort_keys, (lower,))
+        if "ExclusiveStartKey" in params:
+            start_key = _deserializer.deserialize({"M": params["ExclusiveStartKey"]})
+            start = max(
+                start,
+                bisect.bisect_right(
+                    sort_keys, (start_key[range_key], start_key[self.range_key])
+                ),
+            )
+
+        limit = params.get("Limit")
+        filter_expression = (
+            parse_condition(params["FilterExpression"], names, values)
+            if "FilterExpression" in params
+            else None
+        )
+
+        found: List[Dict] = []
+        scanned = 0
+        last_key = None
+        position = start
+        for position in range(start, len(items)):
+            item = items[position]
+            if upper is not None and item[range_key] > upper:
+                break
+            if not evaluate(key_condition, item):
+                continue
+            scanned += 1
+            if filter_expression is None or evaluate(filter_expression, item):
+                found.append(project(item, params.get("ProjectionExpression"), names))
+            if limit is not None and scanned >= limit:
+                if position < len(items) - 1:
+                    last_key = {self.hash_key: pk, self.range_key: item[self.range_key]}
+                    if index:
+                        last_key[range_key] = item[range_key]
+                break
+
+        response = {
+            "Items": [_serialize_item(item) for item in found],
+            "Count": len(found),
+            "ScannedCount": scanned,
+        }
+        if last_key is not None:
+            response["LastEvaluatedKey"] = _serialize_item(last_key)
+        return response
+
+    def _BatchWriteItem(self, params: Dict) -> Dict:
+        for requests in params["RequestItems"].values():
+            for request in requests:
+                if "PutRequest" in request:
+                    self._PutItem(request["PutRequest"])
+                else:
+                    self._DeleteItem(request["DeleteRequest"])
+        return {"UnprocessedItems": {}}
+
+    def _TransactWriteItems(self, params: Dict) -> Dict:
+        actions = {"Put": self._PutItem, "Delete": self._DeleteItem}
+        for transact_item in params["TransactItems"]:
+            for action, request in transact_item.items():
+                actions[action](request)
+        return {}
+
+
+def _serialize_item(item: Dict) -> Dict:
+    return {name: _serializer.serialize(value) for name, value in item.items()}
+
+
+# --- STS, Secrets Manager and Cognito -----------------------------------------
+
+
+class FakeSTS:
+    def handle(self, operation: str, params: Dict) -> Dict:
+        if operation != "AssumeRole":
+            raise FakeAWSError("UnknownOperationException", operation)
+        return {
+            "Credentials": {
+                "AccessKeyId": "fake",
+                "SecretAccessKey": "fake",
+                "SessionToken": "fake",
+                "Expiration": datetime.now(timezone.utc) + timedelta(hours=1),
+            }
+        }
+
+
+class FakeSecretsManager:
+    def handle(self, operation: str, params: Dict) -> Dict:
+        if operation != "GetSecretValue":
+            raise FakeAWSError("UnknownOperationException", operation)
+        return {"ARN": params["SecretId"], "SecretString": "fake-secret"}
+
+
+class FakeCognito:
+    def __init__(self, client_secret: str = "fake-client-secret"):
+        self.client_secret = client_secret
+        self.users: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def handle(self, operation: str, params: Dict) -> Dict:
+        with self._lock:
+            if operation == "DescribeUserPoolClient":
+                return {"UserPoolClient": {"ClientSecret": self.client_secret}}
+            if operation == "SignUp":
+                if params["Username"] in self.users:
+                    raise FakeAWSError("UsernameExistsException")
+                self.users[params["Username"]] = params["Password"]
+                return {"UserConfirmed": False}
+            if operation == "InitiateAuth":
+                auth = params["AuthParameters"]
+                if self.users.get(auth["USERNAME"]) != auth["PASSWORD"]:
+                    raise FakeAWSError(
+                        "NotAuthorizedException", "Incorrect username or password."
+                    )
+                token = f"token-{auth['USERNAME']}"
+                return {
+                    "AuthenticationResult": {
+                        "IdToken": token,
+                        "RefreshToken": token,
+                        "AccessToken": token,
+                        "ExpiresIn": 3600,
+                        "TokenType": "Bearer",
+                    }
+                }
+        raise FakeAWSError("UnknownOperationException", operation)
+
+
+# --- Wiring -------------------------------------------------------------------
+
+
+class _HTTPResponse:
+    headers: Dict = {}
+
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+class Fakes:
+    """
+    The stand-ins, plus per-call timing: every call's duration is passed to
+    `on_call(service, operation, seconds)`.  `latency` (seconds, per service)
+    is slept on each call to approximate the network round trip.
+    """
+
+    def __init__(
+        self,
+        dynamodb: Optional[FakeDynamoDB] = None,
+        cognito: Optional[FakeCognito] = None,
+        latency: Optional[Dict[str, float]] = None,
+    ):
+        self.services = {
+            "dynamodb": dynamodb or FakeDynamoDB(),
+            "sts": FakeSTS(),
+            "secretsmanager": FakeSecretsManager(),
+            "cognito-idp": cognito or FakeCognito(),
+        }
+        self.latency = latency or {}
+        self.on_call: Optional[Callable[[str, str, float], None]] = None
+
+    def request(self, service: str, operation: str, params: Dict):
+        start = time.perf_counter()
+        try:
+            delay = self.latency.get(service, 0)
+            if delay:
+                time.sleep(delay)
+            return 200, self.services[service].handle(operation, params)
+        except FakeAWSError as e:
+            return 400, {"Error": {"Code": e.code, "Message": e.message}}
+        finally:
+            if self.on_call is not None:
+                self.on_call(service, operation, time.perf_counter() - start)
+
+
+def install(fakes: Fakes):
+    """
+    Routes every botocore request in the process to `fakes`.
+    """
+    from botocore.client import BaseClient
+
+    def _make_request(self, operation_model, request_dict, request_context):
+        service = operation_model.service_model.service_name
+        body = request_dict.get("body") or b""
+        params = {}
+        # DynamoDB and Cognito speak JSON; STS's query protocol is not needed
+        if operation_model.service_model.protocol == "json" and body:
+            params = json.loads(body)
+        status_code, parsed = fakes.request(service, operation_model.name, params)
+        return _HTTPResponse(status_code), parsed
+
+    BaseClient._make_request = _make_request
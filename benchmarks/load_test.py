@@ -0,0 +1,441 @@
+"""
+End-to-end load test of the real Lambda handlers against the in-process
+stand-ins in `fakes.py`.
+
+Synthetic users are created with `--users` maps of `--destinations`
+destinations holding `--places` places each, then a request trace is replayed
+against the handlers one request at a time, like a single warm Lambda
+container.  Reports throughput and p50/p95/p99 latency per endpoint, broken
+down into the time spent in each (stand-in) AWS call and in the handler itself.
+
+A trace is JSONL, one request per line:
+
+    {"endpoint": "places.get", "user": "user-3", "query": {"limit": "100"}}
+    {"endpoint": "places.post", "user": "user-3", "body": {...}}
+
+Without `--trace`, `--requests` requests are generated from the `--mix`
+weights (and can be saved with `--write-trace` to replay later).
+
+    python benchmarks/load_test.py --users 20 --places 50 --requests 2000
+    python benchmarks/load_test.py --trace trace.jsonl --dynamodb-latency-ms 4
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterator, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import fakes  # noqa: E402
+
+ENVIRONMENT = {
+    "AWS_DEFAULT_REGION": "us-west-2",
+    "AWS_ACCESS_KEY_ID": "load-test",
+    "AWS_SECRET_ACCESS_KEY": "load-test",
+    "DYNAMO_READ_ROLE_ARN": "arn:aws:iam::123456789012:role/load-test-read",
+    "DYNAMO_WRITE_ROLE_ARN": "arn:aws:iam::123456789012:role/load-test-write",
+    "DYNAMO_TABLE_NAME": "load-test-table",
+    "CURSOR_SIGNING_KEY_ARN": (
+        "arn:aws:secretsmanager:us-west-2:123456789012:secret:load-test"
+    ),
+    "USER_POOL_ID": "us-west-2_loadtest",
+    "CLIENT_ID": "load-test-client",
+    "USER_POOL_ACCESS_ROLE_ARN": "arn:aws:iam::123456789012:role/load-test-cognito",
+    "PHOTO_BUCKET_NAME": "load-test-photos",
+    "PHOTO_BUCKET_ROLE_ARN": "arn:aws:iam::123456789012:role/load-test-photos",
+}
+
+PASSWORD = "Load-test-password-1"
+
+# Endpoint -> (handler module, HTTP method, path)
+ENDPOINTS = {
+    "places.get": ("api.v1.places.get", "GET", "/places"),
+    "places.post": ("api.v1.places.post", "POST", "/places"),
+    "places.delete": ("api.v1.places.delete", "DELETE", "/places"),
+    "places.viewport": ("api.v1.places.viewport", "GET", "/places/viewport"),
+    "destinations.get": ("api.v1.destinations.get", "GET", "/destinations"),
+    "destinations.post": ("api.v1.destinations.post", "POST", "/destinations"),
+    "destinations.delete": ("api.v1.destinations.delete", "DELETE", "/destinations"),
+    "clusters.get": ("api.v1.clusters.get", "GET", "/clusters"),
+    "map.get": ("api.v1.map.get", "GET", "/map"),
+    "auth.login": ("api.v1.auth.lambda_function", "POST", "/auth/login"),
+}
+
+# Served by the single places, destinations and map function with --mono
+MONO_HANDLER = "api.v1.lambda_function"
+MONO_ENDPOINTS = {
+    "places.get",
+    "places.post",
+    "places.delete",
+    "destinations.get",
+    "destinations.post",
+    "destinations.delete",
+    "map.get",
+}
+
+DEFAULT_MIX = (
+    "places.get=40,destinations.get=15,places.viewport=15,clusters.get=10,"
+    "places.post=10,places.delete=5,auth.login=5"
+)
+
+
+class Context:
+    function_name = "load-test"
+    memory_limit_in_mb = 128
+    aws_request_id = "load-test"
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+# --- Synthetic data -----------------------------------------------------------
+
+
+def _coordinate(value: float) -> Decimal:
+    return Decimal(f"{value:.6f}")
+
+
+def make_destination(rng: random.Random, place_id: str) -> Dict:
+    return {
+        "place_id": place_id,
+        "name": f"Destination {place_id}",
+        "country": "United States",
+        "country_code": "US",
+        "latitude": _coordinate(rng.uniform(-60, 60)),
+        "longitude": _coordinate(rng.uniform(-180, 180)),
+    }
+
+
+def make_place(rng: random.Random, place_id: str, destination: Dict) -> Dict:
+    return {
+        "place_id": place_id,
+        "name": f"Place {place_id}",
+        "address": f"{rng.randint(1, 9999)} Main St",
+        "city": "Springfield",
+        "state": "IL",
+        "country": "United States",
+        "zip_code": f"{rng.randint(10000, 99999)}",
+        "latitude": _coordinate(float(destination["latitude"]) + rng.uniform(-1, 1)),
+        "longitude": _coordinate(
+            max(
+                -180.0, min(180.0, float(destination["longitude"]) + rng.uniform(-1, 1))
+            )
+        ),
+        "destination_id": destination["place_id"],
+    }
+
+
+def populate(
+    table: fakes.FakeDynamoDB,
+    cognito: fakes.FakeCognito,
+    users: int,
+    destinations: int,
+    places: int,
+    seed: int,
+) -> Dict[str, Dict[str, List[Dict]]]:
+    """
+    Writes every synthetic user's map straight into the stand-in table, and
+    returns it so the trace generator can refer to existing items.
+    """
+    from utils.boto3.dynamo import SortKeyFormatStrings, create_record
+
+    rng = random.Random(seed)
+    maps = {}
+    for user_index in range(users):
+        user = f"user-{user_index}"
+        cognito.users[user] = PASSWORD
+        user_map: Dict[str, List[Dict]] = {"destinations": [], "places": []}
+        for destination_index in range(destinations):
+            destination = make_destination(rng, f"{user}-d{destination_index}")
+            user_map["destinations"].append(destination)
+            table.put(
+                create_record(
+                    user,
+                    SortKeyFormatStrings.DESTINATION.format(
+                        place_id=destination["place_id"]
+                    ),
+                    destination,
+                )
+            )
+            for place_index in range(places):
+                place = make_place(
+                    rng, f"{destination['place_id']}-p{place_index}", destination
+                )
+                user_map["places"].append(place)
+                table.put(
+                    create_record(
+                        user,
+                        SortKeyFormatStrings.PLACE.format(place_id=place["place_id"]),
+                        place,
+                    )
+                )
+        maps[user] = user_map
+    return maps
+
+
+def _json_ready(entity: Dict) -> Dict:
+    return {
+        key: float(value) if isinstance(value, Decimal) else value
+        for key, value in entity.items()
+    }
+
+
+def generate_trace(
+    maps: Dict[str, Dict[str, List[Dict]]], mix: Dict[str, float], count: int, seed: int
+) -> Iterator[Dict]:
+    rng = random.Random(seed)
+    users = sorted(maps)
+    endpoints = list(mix)
+    weights = [mix[endpoint] for endpoint in endpoints]
+
+    for index in range(count):
+        endpoint = rng.choices(endpoints, weights)[0]
+        user = rng.choice(users)
+        user_map = maps[user]
+        request: Dict = {"endpoint": endpoint, "user": user}
+
+        if endpoint in ("places.get", "destinations.get", "map.get"):
+            request["query"] = {"user": user}
+        elif endpoint in ("places.viewport", "clusters.get"):
+            lat = rng.uniform(-60, 60)
+            lng = rng.uniform(-170, 170)
+            request["query"] = {
+                "user": user,
+                "min_lat": str(round(lat - 5, 4)),
+                "min_lng": str(round(lng - 10, 4)),
+                "max_lat": str(round(lat + 5, 4)),
+                "max_lng": str(round(lng + 10, 4)),
+            }
+            if endpoint == "clusters.get":
+                request["query"]["zoom"] = str(rng.randint(0, 12))
+        elif endpoint == "places.post":
+            destination = rng.choice(user_map["destinations"])
+            request["body"] = _json_ready(
+                make_place(rng, f"{user}-new-{index}", destination)
+            )
+        elif endpoint == "destinations.post":
+            request["body"] = _json_ready(make_destination(rng, f"{user}-new-{index}"))
+        elif endpoint == "places.delete":
+            request["query"] = {"place_id": rng.choice(user_map["places"])["place_id"]}
+        elif endpoint == "destinations.delete":
+            destination = rng.choice(user_map["destinations"])
+            request["query"] = {"place_id": destination["place_id"]}
+        elif endpoint == "auth.login":
+            request["body"] = {"username": user, "password": PASSWORD}
+
+        yield request
+
+
+def read_trace(path: str) -> Iterator[Dict]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# --- Replay -------------------------------------------------------------------
+
+
+def make_event(request: Dict) -> Dict:
+    _, method, path = ENDPOINTS[request["endpoint"]]
+    body = request.get("body")
+    return {
+        "httpMethod": method,
+        "resource": path,
+        "path": path,
+        "headers": request.get("headers", {}),
+        "queryStringParameters": request.get("query"),
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+        "requestContext": {
+            "authorizer": {"claims": {"cognito:username": request.get("user")}}
+        },
+    }
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Recorder:
+    """
+    Collects the total latency of every request and, per request, the time
+    spent in each AWS operation.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, List[float]] = defaultdict(list)
+        self.phases: Dict[str, Dict[str, List[float]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._current: Dict[str, float] = defaultdict(float)
+
+    def on_call(self, service: str, operation: str, seconds: float):
+        self._current[f"{service}.{operation}"] += seconds
+
+    def start(self):
+        self._current = defaultdict(float)
+
+    def finish(self, endpoint: str, seconds: float, status_code: int):
+        self.totals[endpoint].append(seconds)
+        self.statuses[endpoint][status_code] += 1
+        phases = self.phases[endpoint]
+        phases["handler"].append(seconds - sum(self._current.values()))
+        for phase, spent in self._current.items():
+            phases[phase].append(spent)
+
+
+def replay(requests: Iterator[Dict], recorder: Recorder, mono: bool = False) -> float:
+    context = Context()
+    handlers = {}
+    start = time.perf_counter()
+    for request in requests:
+        endpoint = request["endpoint"]
+        if endpoint not in handlers:
+            module = ENDPOINTS[endpoint][0]
+            if mono and endpoint in MONO_ENDPOINTS:
+                module = MONO_HANDLER
+            handlers[endpoint] = importlib.import_module(module).lambda_handler
+        event = make_event(request)
+
+        recorder.start()
+        request_start = time.perf_counter()
+        response = handlers[endpoint](event, context)
+        recorder.finish(
+            endpoint, time.perf_counter() - request_start, response["statusCode"]
+        )
+    return time.perf_counter() - start
+
+
+def report(recorder: Recorder, elapsed: float) -> Dict:
+    total = sum(len(values) for values in recorder.totals.values())
+    print(f"{total} requests in {elapsed:.2f} s: {total / elapsed:.1f} requests/s\n")
+
+    def row(name: str, values: List[float], count_label: str) -> str:
+        return f"  {name:<38} {count_label:>7} " + " ".join(
+            f"{percentile(values, fraction) * 1000:8.2f}"
+            for fraction in (0.5, 0.95, 0.99)
+        )
+
+    results = {}
+    print(
+        f"  {'endpoint / phase':<38} {'n':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for endpoint in sorted(recorder.totals):
+        totals = recorder.totals[endpoint]
+        statuses = ", ".join(
+            f"{status}x{count}"
+            for status, count in sorted(recorder.statuses[endpoint].items())
+        )
+        print(row(endpoint, totals, str(len(totals))) + f"   [{statuses}]")
+        results[endpoint] = {
+            "count": len(totals),
+            "statuses": dict(recorder.statuses[endpoint]),
+            "phases": {},
+        }
+        for fraction, label in ((0.5, "p50"), (0.95, "p95"), (0.99, "p99")):
+            results[endpoint][label] = percentile(totals, fraction)
+
+        for phase, values in sorted(recorder.phases[endpoint].items()):
+            # Per phase percentiles are over the requests that made the call
+            print(row(f"  {phase}", values, str(len(values))))
+            results[endpoint]["phases"][phase] = {
+                label: percentile(values, fraction)
+                for fraction, label in ((0.5, "p50"), (0.95, "p95"), (0.99, "p99"))
+            }
+    return {"requests": total, "seconds": elapsed, "endpoints": results}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        endpoint, _, weight = part.partition("=")
+        if endpoint not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint <{endpoint}>")
+        weights[endpoint] = float(weight or 1)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--destinations", type=int, default=5)
+    parser.add_argument("--places", type=int, default=20, help="Per destination")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--trace", help="Replay this JSONL trace instead")
+    parser.add_argument("--write-trace", help="Save the generated trace here")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--dynamodb-latency-ms", type=float, default=0.0)
+    parser.add_argument("--cognito-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--mono",
+        action="store_true",
+        help=f"Serve places, destinations and the map through {MONO_HANDLER}",
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    os.environ.update(ENVIRONMENT)
+
+    from utils.boto3.dynamo import Indexes, ScrapMapDDBSchema
+
+    table = fakes.FakeDynamoDB(
+        indexes={
+            Indexes.GEO: ScrapMapDDBSchema.GeoSK,
+            Indexes.CHANGES: ScrapMapDDBSchema.ChangeSK,
+        }
+    )
+    cognito = fakes.FakeCognito()
+    stand_ins = fakes.Fakes(
+        table,
+        cognito,
+        latency={
+            "dynamodb": args.dynamodb_latency_ms / 1000,
+            "cognito-idp": args.cognito_latency_ms / 1000,
+        },
+    )
+    fakes.install(stand_ins)
+
+    maps = populate(
+        table, cognito, args.users, args.destinations, args.places, args.seed
+    )
+    if args.trace:
+        requests = list(read_trace(args.trace))
+    else:
+        requests = list(
+            generate_trace(maps, parse_mix(args.mix), args.requests, args.seed)
+        )
+        if args.write_trace:
+            with open(args.write_trace, "w") as f:
+                f.writelines(json.dumps(request) + "\n" for request in requests)
+
+    # Imports, role assumption and the first cache fills are cold start, not load
+    warmup = Recorder()
+    replay(iter(requests[: args.warmup]), warmup, args.mono)
+
+    recorder = Recorder()
+    stand_ins.on_call = recorder.on_call
+    elapsed = replay(iter(requests[args.warmup :]), recorder, args.mono)
+    results = report(recorder, elapsed)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark of turning a page of DynamoDB items, as they come off the wire,
+into the GET handlers' JSON body: deserializing with boto3's `TypeDeserializer`
+(every number a `Decimal`) or with `NativeNumberDeserializer`, then encoding
+with `json.dumps(..., cls=DecimalEncoder)` (the handlers' original path) or
+`utils.serializers.serialize_items`.
+
+    python benchmarks/serialization.py --items 10000 --repeat 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer  # noqa: E402
+
+from utils.boto3.dynamo import DecimalEncoder, NativeNumberDeserializer  # noqa: E402
+from utils.serializers import serialize_items  # noqa: E402
+
+
+def make_items(count: int, seed: int = 0):
+    """
+    Items shaped like what boto3 returns for PLACE records, numbers as Decimals.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "PK": "benchmark-user",
+            "SK": f"PLACE#place-{index}",
+            "Entity": {
+                "place_id": f"place-{index}",
+                "name": f"Place {index}",
+                "address": f"{rng.randint(1, 9999)} Main St",
+                "city": "Springfield",
+                "state": "IL",
+                "country": "United States",
+                "zip_code": f"{rng.randint(10000, 99999)}",
+                "latitude": Decimal(f"{rng.uniform(-90, 90):.6f}"),
+                "longitude": Decimal(f"{rng.uniform(-180, 180):.6f}"),
+                "destination_id": f"destination-{index % 50}",
+            },
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    serializer = TypeSerializer()
+    wire = [
+        {name: serializer.serialize(value) for name, value in item.items()}
+        for item in make_items(args.items)
+    ]
+
+    def deserialize(deserializer):
+        for item in wire:
+            yield {
+                name: deserializer.deserialize(value) for name, value in item.items()
+            }
+
+    decimals, native = TypeDeserializer(), NativeNumberDeserializer()
+    candidates = {
+        "DecimalEncoder": lambda: json.dumps(
+            list(deserialize(decimals)), cls=DecimalEncoder
+        ),
+        "serialize_items": lambda: serialize_items(deserialize(decimals)),
+        "native numbers": lambda: serialize_items(deserialize(native)),
+    }
+
+    timings = {name: [] for name in candidates}
+    # Interleave the candidates so noise from the host affects them equally
+    for _ in range(args.repeat):
+        for name, func in candidates.items():
+            start = time.process_time()
+            func()
+            timings[name].append(time.process_time() - start)
+
+    for name, func in candidates.items():
+        runs = sorted(timings[name])
+        print(
+            f"{name:>16}: min {runs[0] * 1000:7.2f} ms  "
+            f"median {runs[len(runs) // 2] * 1000:7.2f} ms  "
+            f"{len(func()) / 1024:6.0f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of request body validation: building models from a batch of
+POST /places entries with `validate_batch` (one compiled check over the whole
+list) and entry by entry with `Place.from_dict`, and converting them with
+`to_item` against the generic `attr.asdict` walk.
+
+    python benchmarks/validation.py --entries 1000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import attr
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from models.v1 import Place, validate_batch  # noqa: E402
+
+
+def make_entries(count: int, seed: int = 0):
+    """
+    Entries shaped like a parsed POST /places body, coordinates as floats.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "place_id": f"place-{index}",
+            "name": f"Place {index}",
+            "address": f"{rng.randint(1, 9999)} Main St",
+            "city": "Springfield",
+            "state": "IL",
+            "country": "United States",
+            "zip_code": f"{rng.randint(10000, 99999)}",
+            "latitude": round(rng.uniform(-90, 90), 6),
+            "longitude": round(rng.uniform(-180, 180), 6),
+            "destination_id": f"destination-{index % 50}",
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    entries = make_entries(args.entries)
+    invalid = list(entries)
+    invalid[-1] = dict(invalid[-1], latitude=91)
+    places = [Place.from_dict(entry) for entry in entries]
+
+    candidates = {
+        "validate_batch": lambda: validate_batch(Place, entries),
+        "validate_batch (1 bad)": lambda: validate_batch(Place, invalid),
+        "from_dict each": lambda: [Place.from_dict(entry) for entry in entries],
+        "to_item": lambda: [place.to_item() for place in places],
+        "attr.asdict": lambda: [attr.asdict(place) for place in places],
+    }
+
+    timings = {name: [] for name in candidates}
+    # Interleave the candidates so noise from the host affects them equally
+    for _ in range(args.repeat):
+        for name, func in candidates.items():
+            start = time.process_time()
+            func()
+            timings[name].append(time.process_time() - start)
+
+    for name in candidates:
+        runs = sorted(timings[name])
+        median = runs[len(runs) // 2]
+        print(
+            f"{name:>22}: min {runs[0] * 1000:7.2f} ms  "
+            f"median {median * 1000:7.2f} ms  "
+            f"{args.entries / max(median * 1000, 1e-9):8.0f} entries/ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
-import { Stack, StackProps } from 'aws-cdk-lib';
-import { Construct } from 'constructs';
+import { Aspects, IAspect, Stack, StackProps } from 'aws-cdk-lib';
+import { Construct, IConstruct } from 'constructs';
+import { PolicyStatement } from 'aws-cdk-lib/aws-iam';
+import { CfnFunction, Function, Tracing } from 'aws-cdk-lib/aws-lambda';
 import { ApiStack } from './stacks/apiStack'
 import { StorageStack } from './stacks/storageStack';
 import { UserPoolStack } from './stacks/userPoolStack';
@@ -9,6 +11,31 @@ const env = {
   region: "us-west-2"
 }
 
+// Turns on the per-request EMF metrics (src/utils/instrumentation.py) of every
+// function, with `-c xray=true` active X-Ray tracing and its subsegments, and
+// with `-c capacityHeader=true` the X-Consumed-Capacity debug header
+class Instrumentation implements IAspect {
+  constructor(private readonly xray: boolean, private readonly capacityHeader: boolean) {}
+
+  public visit(node: IConstruct): void {
+    if (!(node instanceof Function)) {
+      return
+    }
+    node.addEnvironment('METRICS_ENABLED', 'true')
+    if (this.capacityHeader) {
+      node.addEnvironment('CAPACITY_HEADER_ENABLED', 'true')
+    }
+    if (this.xray) {
+      node.addEnvironment('XRAY_ENABLED', 'true');
+      (node.node.defaultChild as CfnFunction).tracingConfig = { mode: Tracing.ACTIVE }
+      node.addToRolePolicy(new PolicyStatement({
+        actions: ['xray:PutTraceSegments', 'xray:PutTelemetryRecords'],
+        resources: ['*']
+      }))
+    }
+  }
+}
+
 export class ScrapMapStack extends Stack {
   constructor(scope: Construct, id: string, props?: StackProps) {
     super(scope, id, {...props, env});
@@ -28,7 +55,13 @@ export class ScrapMapStack extends Stack {
       userPoolRole: userPoolStack.userPoolRole,
       dynamoTableReadRole: storageStack.dynamoTableReadRole,
       dynamoTableWriteRole: storageStack.dynamoTableWriteRole,
-      dynamoTableName: storageStack.dynamoTableName
+      dynamoTableName: storageStack.dynamoTableName,
+      photoBucketName: storageStack.photoBucket.bucketName,
+      photoBucketRole: storageStack.photoBucketRole
     })
+
+    const flag = (name: string) => this.node.tryGetContext(name) === true
+      || this.node.tryGetContext(name) === 'true'
+    Aspects.of(this).add(new Instrumentation(flag('xray'), flag('capacityHeader')))
   }
 }
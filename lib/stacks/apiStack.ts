@@ -1,9 +1,10 @@
 import { Duration, Stack, StackProps } from 'aws-cdk-lib';
 import { Construct } from 'constructs';
-import { CfnAuthorizer, AuthorizationType, RequestValidator, LambdaIntegration, ProxyResource, Resource, RestApi, Method, Model, JsonSchemaType } from 'aws-cdk-lib/aws-apigateway'
+import { CfnAuthorizer, AuthorizationType, RequestValidator, LambdaIntegration, ProxyResource, Resource, RestApi, Method, Model, JsonSchema, JsonSchemaType } from 'aws-cdk-lib/aws-apigateway'
 import { Code, Function, Runtime, LayerVersion } from 'aws-cdk-lib/aws-lambda';
 import { Role } from 'aws-cdk-lib/aws-iam';
 import { UserPool } from 'aws-cdk-lib/aws-cognito';
+import { Secret } from 'aws-cdk-lib/aws-secretsmanager';
 
 interface apiStackProps extends StackProps {
   userPool: UserPool,
@@ -12,6 +13,8 @@ interface apiStackProps extends StackProps {
   dynamoTableReadRole: Role,
   dynamoTableWriteRole: Role,
   dynamoTableName: string,
+  photoBucketName: string,
+  photoBucketRole: Role,
 }
 
 export class ApiStack extends Stack {
@@ -20,7 +23,11 @@ export class ApiStack extends Stack {
   constructor(scope: Construct, id: string, props: apiStackProps) {
     super(scope, id, props);
 
-    this.restApi = new RestApi(this, 'scrapMapRestApi', {})
+    this.restApi = new RestApi(this, 'scrapMapRestApi', {
+      // Lets handlers return compressed bodies base64 encoded (isBase64Encoded),
+      // which API Gateway only decodes for binary media types
+      binaryMediaTypes: ['*/*']
+    })
 
     //Utilities
     const cognitoRequestAuthorizer = new CfnAuthorizer(this, "cognitoRequestAuthorizer", {
@@ -37,6 +44,16 @@ export class ApiStack extends Stack {
       validateRequestBody: true
     })
 
+    // Signs the opaque pagination cursors handed out by the GET endpoints.  The
+    // functions get its ARN and read it at runtime, so the key itself is never
+    // part of their configuration
+    const cursorSigningKey = new Secret(this, 'cursorSigningKey', {
+      generateSecretString: {
+        passwordLength: 64,
+        excludePunctuation: true,
+      }
+    })
+
     const authApiResource = new Resource(this, 'authApiResource', {
       pathPart: 'auth',
       parent: this.restApi.root
@@ -75,6 +92,42 @@ export class ApiStack extends Stack {
       defaultIntegration: new LambdaIntegration(authProxyFunction),
     })
 
+    // With the `monoHandler` context flag (cdk deploy -c monoHandler=true), every
+    // places, destinations and map route is served by one function, so one pool of
+    // warm containers, sessions and caches serves all of them
+    const monoHandler = this.node.tryGetContext('monoHandler') === true
+      || this.node.tryGetContext('monoHandler') === 'true'
+
+    const placesAndDestinationsFunction = new Function(this, 'placesAndDestinationsFunction', {
+      runtime: Runtime.PYTHON_3_8,
+      memorySize: 128,
+      timeout: Duration.seconds(30),
+      handler: "api.v1.lambda_function.lambda_handler",
+      code: Code.fromAsset('src/'),
+      environment: {
+        PYTHONPATH: "/var/runtime:/opt",
+        DYNAMO_READ_ROLE_ARN: props.dynamoTableReadRole.roleArn,
+        DYNAMO_WRITE_ROLE_ARN: props.dynamoTableWriteRole.roleArn,
+        DYNAMO_TABLE_NAME: props.dynamoTableName,
+        CURSOR_SIGNING_KEY_ARN: cursorSigningKey.secretArn,
+        PHOTO_BUCKET_NAME: props.photoBucketName,
+        PHOTO_BUCKET_ROLE_ARN: props.photoBucketRole.roleArn
+      },
+      layers: [flaskLayer]
+    })
+
+    if (placesAndDestinationsFunction.role) {
+      props.dynamoTableReadRole.grant(placesAndDestinationsFunction.role, 'sts:AssumeRole')
+      props.dynamoTableWriteRole.grant(placesAndDestinationsFunction.role, 'sts:AssumeRole')
+      props.photoBucketRole.grant(placesAndDestinationsFunction.role, 'sts:AssumeRole')
+    }
+    cursorSigningKey.grantRead(placesAndDestinationsFunction)
+
+    const placesAndDestinationsIntegration = new LambdaIntegration(placesAndDestinationsFunction)
+    const routeIntegration = (routeFunction: Function) => monoHandler
+      ? placesAndDestinationsIntegration
+      : new LambdaIntegration(routeFunction)
+
     // Destinations
     const destinationsApiResource = new Resource(this, 'destinationsApiResource', {
       pathPart: 'destinations',
@@ -90,7 +143,8 @@ export class ApiStack extends Stack {
       environment: {
         PYTHONPATH: "/var/runtime:/opt",
         DYNAMO_READ_ROLE_ARN: props.dynamoTableReadRole.roleArn,
-        DYNAMO_TABLE_NAME: props.dynamoTableName
+        DYNAMO_TABLE_NAME: props.dynamoTableName,
+        CURSOR_SIGNING_KEY_ARN: cursorSigningKey.secretArn
       },
       layers: [flaskLayer]
     })
@@ -98,8 +152,9 @@ export class ApiStack extends Stack {
     if (destinationsGetFunction.role) {
       props.dynamoTableReadRole.grant(destinationsGetFunction.role, 'sts:AssumeRole')
     }
+    cursorSigningKey.grantRead(destinationsGetFunction)
 
-    destinationsApiResource.addMethod('GET', new LambdaIntegration(destinationsGetFunction), { 
+    destinationsApiResource.addMethod('GET', routeIntegration(destinationsGetFunction), { 
       authorizationType: AuthorizationType.COGNITO,
       authorizer: {
         authorizerId: cognitoRequestAuthorizer.ref
@@ -107,6 +162,9 @@ export class ApiStack extends Stack {
       requestValidator: requestValidator,
       requestParameters: {
         "method.request.querystring.user": true,
+        "method.request.querystring.limit": false,
+        "method.request.querystring.cursor": false,
+        "method.request.querystring.since": false,
       }
     })
 
@@ -128,25 +186,36 @@ export class ApiStack extends Stack {
       props.dynamoTableWriteRole.grant(destinationsPostFunction.role, 'sts:AssumeRole')
     }
 
+    const destinationSchema: JsonSchema = {
+      type: JsonSchemaType.OBJECT,
+      required: ["place_id", "name", "country", "country_code", "latitude", "longitude"],
+      properties: {
+        place_id: { type: JsonSchemaType.STRING },
+        name: { type: JsonSchemaType.STRING },
+        country: { type: JsonSchemaType.STRING },
+        country_code: { type: JsonSchemaType.STRING },
+        latitude: { type: JsonSchemaType.NUMBER },
+        longitude: { type: JsonSchemaType.NUMBER },
+      },
+    }
+
     const destinationsModel = new Model(this, "destinationsModel", {
       restApi: this.restApi,
       contentType: "application/json",
       modelName: "destinationsModel",
+      // A single object, or an array of them for batch creates. Array entries are
+      // only checked to be objects: the handler validates each one and reports the
+      // invalid entries alongside the saved ones, which a gateway-side rejection of
+      // the whole batch would make impossible.
       schema: {
-        type: JsonSchemaType.OBJECT,
-        required: ["place_id", "name", "country", "country_code", "latitude", "longitude"],
-        properties: {
-          place_id: { type: JsonSchemaType.STRING },
-          name: { type: JsonSchemaType.STRING },
-          country: { type: JsonSchemaType.STRING },
-          country_code: { type: JsonSchemaType.STRING },
-          latitude: { type: JsonSchemaType.NUMBER },
-          longitude: { type: JsonSchemaType.NUMBER },
-        },
+        oneOf: [
+          destinationSchema,
+          { type: JsonSchemaType.ARRAY, items: { type: JsonSchemaType.OBJECT } },
+        ],
       },
     });
 
-    destinationsApiResource.addMethod('POST', new LambdaIntegration(destinationsPostFunction), { 
+    destinationsApiResource.addMethod('POST', routeIntegration(destinationsPostFunction), { 
       authorizationType: AuthorizationType.COGNITO,
       authorizer: {
         authorizerId: cognitoRequestAuthorizer.ref
@@ -166,16 +235,19 @@ export class ApiStack extends Stack {
       environment: {
         PYTHONPATH: "/var/runtime:/opt",
         DYNAMO_WRITE_ROLE_ARN: props.dynamoTableWriteRole.roleArn,
-        DYNAMO_TABLE_NAME: props.dynamoTableName
+        DYNAMO_TABLE_NAME: props.dynamoTableName,
+        PHOTO_BUCKET_NAME: props.photoBucketName,
+        PHOTO_BUCKET_ROLE_ARN: props.photoBucketRole.roleArn
       },
       layers: [flaskLayer]
     })
 
     if (destinationsDeleteFunction.role) {
       props.dynamoTableWriteRole.grant(destinationsDeleteFunction.role, 'sts:AssumeRole')
+      props.photoBucketRole.grant(destinationsDeleteFunction.role, 'sts:AssumeRole')
     }
 
-    destinationsApiResource.addMethod('DELETE', new LambdaIntegration(destinationsDeleteFunction), { 
+    destinationsApiResource.addMethod('DELETE', routeIntegration(destinationsDeleteFunction), { 
       authorizationType: AuthorizationType.COGNITO,
       authorizer: {
         authorizerId: cognitoRequestAuthorizer.ref
@@ -183,6 +255,43 @@ export class ApiStack extends Stack {
       requestValidator: requestValidator,
       requestParameters: {
         "method.request.querystring.place_id": true,
+        "method.request.querystring.cascade": false,
+      }
+    });
+
+    // Clusters
+    const clustersApiResource = new Resource(this, 'clustersApiResource', {
+      pathPart: 'clusters',
+      parent: this.restApi.root
+    })
+
+    const clustersGetFunction = new Function(this, 'clustersGetFunction', {
+      runtime: Runtime.PYTHON_3_8,
+      memorySize: 128,
+      timeout: Duration.seconds(30),
+      handler: "api.v1.clusters.get.lambda_handler",
+      code: Code.fromAsset('src/'),
+      environment: {
+        PYTHONPATH: "/var/runtime:/opt",
+        DYNAMO_READ_ROLE_ARN: props.dynamoTableReadRole.roleArn,
+        DYNAMO_TABLE_NAME: props.dynamoTableName
+      },
+      layers: [flaskLayer]
+    })
+
+    if (clustersGetFunction.role) {
+      props.dynamoTableReadRole.grant(clustersGetFunction.role, 'sts:AssumeRole')
+    }
+
+    clustersApiResource.addMethod('GET', new LambdaIntegration(clustersGetFunction), { 
+      requestValidator: requestValidator,
+      requestParameters: {
+        "method.request.querystring.user": true,
+        "method.request.querystring.zoom": true,
+        "method.request.querystring.min_lat": true,
+        "method.request.querystring.min_lng": true,
+        "method.request.querystring.max_lat": true,
+        "method.request.querystring.max_lng": true,
       }
     });
 
@@ -201,7 +310,8 @@ export class ApiStack extends Stack {
       environment: {
         PYTHONPATH: "/var/runtime:/opt",
         DYNAMO_READ_ROLE_ARN: props.dynamoTableReadRole.roleArn,
-        DYNAMO_TABLE_NAME: props.dynamoTableName
+        DYNAMO_TABLE_NAME: props.dynamoTableName,
+        CURSOR_SIGNING_KEY_ARN: cursorSigningKey.secretArn
       },
       layers: [flaskLayer]
     })
@@ -209,11 +319,49 @@ export class ApiStack extends Stack {
     if (placesGetFunction.role) {
       props.dynamoTableReadRole.grant(placesGetFunction.role, 'sts:AssumeRole')
     }
+    cursorSigningKey.grantRead(placesGetFunction)
 
-    placesApiResource.addMethod('GET', new LambdaIntegration(placesGetFunction), { 
+    placesApiResource.addMethod('GET', routeIntegration(placesGetFunction), { 
       requestValidator: requestValidator,
       requestParameters: {
         "method.request.querystring.user": true,
+        "method.request.querystring.limit": false,
+        "method.request.querystring.cursor": false,
+        "method.request.querystring.since": false,
+      }
+    });
+
+    const placesViewportApiResource = new Resource(this, 'placesViewportApiResource', {
+      pathPart: 'viewport',
+      parent: placesApiResource
+    })
+
+    const placesViewportFunction = new Function(this, 'placesViewportFunction', {
+      runtime: Runtime.PYTHON_3_8,
+      memorySize: 128,
+      timeout: Duration.seconds(30),
+      handler: "api.v1.places.viewport.lambda_handler",
+      code: Code.fromAsset('src/'),
+      environment: {
+        PYTHONPATH: "/var/runtime:/opt",
+        DYNAMO_READ_ROLE_ARN: props.dynamoTableReadRole.roleArn,
+        DYNAMO_TABLE_NAME: props.dynamoTableName
+      },
+      layers: [flaskLayer]
+    })
+
+    if (placesViewportFunction.role) {
+      props.dynamoTableReadRole.grant(placesViewportFunction.role, 'sts:AssumeRole')
+    }
+
+    placesViewportApiResource.addMethod('GET', new LambdaIntegration(placesViewportFunction), { 
+      requestValidator: requestValidator,
+      requestParameters: {
+        "method.request.querystring.user": true,
+        "method.request.querystring.min_lat": true,
+        "method.request.querystring.min_lng": true,
+        "method.request.querystring.max_lat": true,
+        "method.request.querystring.max_lng": true,
       }
     });
 
@@ -235,41 +383,52 @@ export class ApiStack extends Stack {
       props.dynamoTableWriteRole.grant(placesPostFunction.role, 'sts:AssumeRole')
     }
 
+    const placeSchema: JsonSchema = {
+      type: JsonSchemaType.OBJECT,
+      required: [
+        "place_id", 
+        "name",
+        "address",
+        "city",
+        "state", 
+        "country", 
+        "zip_code", 
+        "latitude", 
+        "longitude",
+        "destination_id"
+      ],
+      properties: {
+        place_id: { type: JsonSchemaType.STRING },
+        name: { type: JsonSchemaType.STRING },
+        address: { type: JsonSchemaType.STRING },
+        city: { type: JsonSchemaType.STRING },
+        state: { type: JsonSchemaType.STRING },
+        country: { type: JsonSchemaType.STRING },
+        zip_code: { type: JsonSchemaType.STRING },
+        latitude: { type: JsonSchemaType.NUMBER },
+        longitude: { type: JsonSchemaType.NUMBER },
+        // Destination_Id is the place_id of the Destination
+        destination_id: { type: JsonSchemaType.STRING }
+      },
+    }
+
     const placesModel = new Model(this, "placesModel", {
       restApi: this.restApi,
       contentType: "application/json",
       modelName: "placesModel",
+      // A single object, or an array of them for batch creates. Array entries are
+      // only checked to be objects: the handler validates each one and reports the
+      // invalid entries alongside the saved ones, which a gateway-side rejection of
+      // the whole batch would make impossible.
       schema: {
-        type: JsonSchemaType.OBJECT,
-        required: [
-          "place_id", 
-          "name",
-          "address",
-          "city",
-          "state", 
-          "country", 
-          "zip_code", 
-          "latitude", 
-          "longitude",
-          "destination_id"
+        oneOf: [
+          placeSchema,
+          { type: JsonSchemaType.ARRAY, items: { type: JsonSchemaType.OBJECT } },
         ],
-        properties: {
-          place_id: { type: JsonSchemaType.STRING },
-          name: { type: JsonSchemaType.STRING },
-          address: { type: JsonSchemaType.STRING },
-          city: { type: JsonSchemaType.STRING },
-          state: { type: JsonSchemaType.STRING },
-          country: { type: JsonSchemaType.STRING },
-          zip_code: { type: JsonSchemaType.STRING },
-          latitude: { type: JsonSchemaType.NUMBER },
-          longitude: { type: JsonSchemaType.NUMBER },
-          // Destination_Id is the place_id of the Destination
-          destination_id: { type: JsonSchemaType.STRING }
-        },
       },
     });
 
-    placesApiResource.addMethod('POST', new LambdaIntegration(placesPostFunction), { 
+    placesApiResource.addMethod('POST', routeIntegration(placesPostFunction), { 
       authorizationType: AuthorizationType.COGNITO,
       authorizer: {
         authorizerId: cognitoRequestAuthorizer.ref
@@ -289,16 +448,19 @@ export class ApiStack extends Stack {
       environment: {
         PYTHONPATH: "/var/runtime:/opt",
         DYNAMO_WRITE_ROLE_ARN: props.dynamoTableWriteRole.roleArn,
-        DYNAMO_TABLE_NAME: props.dynamoTableName
+        DYNAMO_TABLE_NAME: props.dynamoTableName,
+        PHOTO_BUCKET_NAME: props.photoBucketName,
+        PHOTO_BUCKET_ROLE_ARN: props.photoBucketRole.roleArn
       },
       layers: [flaskLayer]
     })
 
     if (placesDeleteFunction.role) {
       props.dynamoTableWriteRole.grant(placesDeleteFunction.role, 'sts:AssumeRole')
+      props.photoBucketRole.grant(placesDeleteFunction.role, 'sts:AssumeRole')
     }
 
-    placesApiResource.addMethod('DELETE', new LambdaIntegration(placesDeleteFunction), { 
+    placesApiResource.addMethod('DELETE', routeIntegration(placesDeleteFunction), { 
       authorizationType: AuthorizationType.COGNITO,
       authorizer: {
         authorizerId: cognitoRequestAuthorizer.ref
@@ -309,5 +471,141 @@ export class ApiStack extends Stack {
       }
     });
 
+
+    // Photos
+    const photosApiResource = new Resource(this, 'photosApiResource', {
+      pathPart: 'photos',
+      parent: this.restApi.root
+    })
+
+    const photosGetFunction = new Function(this, 'photosGetFunction', {
+      runtime: Runtime.PYTHON_3_8,
+      memorySize: 128,
+      timeout: Duration.seconds(30),
+      handler: "api.v1.photos.get.lambda_handler",
+      code: Code.fromAsset('src/'),
+      environment: {
+        PYTHONPATH: "/var/runtime:/opt",
+        DYNAMO_READ_ROLE_ARN: props.dynamoTableReadRole.roleArn,
+        DYNAMO_TABLE_NAME: props.dynamoTableName,
+        CURSOR_SIGNING_KEY_ARN: cursorSigningKey.secretArn,
+        PHOTO_BUCKET_NAME: props.photoBucketName,
+        PHOTO_BUCKET_ROLE_ARN: props.photoBucketRole.roleArn
+      },
+      layers: [flaskLayer]
+    })
+
+    if (photosGetFunction.role) {
+      props.dynamoTableReadRole.grant(photosGetFunction.role, 'sts:AssumeRole')
+      props.photoBucketRole.grant(photosGetFunction.role, 'sts:AssumeRole')
+    }
+    cursorSigningKey.grantRead(photosGetFunction)
+
+    photosApiResource.addMethod('GET', new LambdaIntegration(photosGetFunction), { 
+      requestValidator: requestValidator,
+      requestParameters: {
+        "method.request.querystring.user": true,
+        "method.request.querystring.place_id": true,
+        "method.request.querystring.limit": false,
+        "method.request.querystring.cursor": false,
+      }
+    });
+
+    const photosPostFunction = new Function(this, 'photosPostFunction', {
+      runtime: Runtime.PYTHON_3_8,
+      memorySize: 128,
+      timeout: Duration.seconds(30),
+      handler: "api.v1.photos.post.lambda_handler",
+      code: Code.fromAsset('src/'),
+      environment: {
+        PYTHONPATH: "/var/runtime:/opt",
+        DYNAMO_WRITE_ROLE_ARN: props.dynamoTableWriteRole.roleArn,
+        DYNAMO_TABLE_NAME: props.dynamoTableName,
+        PHOTO_BUCKET_NAME: props.photoBucketName,
+        PHOTO_BUCKET_ROLE_ARN: props.photoBucketRole.roleArn
+      },
+      layers: [flaskLayer]
+    })
+
+    if (photosPostFunction.role) {
+      props.dynamoTableWriteRole.grant(photosPostFunction.role, 'sts:AssumeRole')
+      props.photoBucketRole.grant(photosPostFunction.role, 'sts:AssumeRole')
+    }
+
+    // The handler validates the body, so a 400 says what is wrong with it
+    photosApiResource.addMethod('POST', new LambdaIntegration(photosPostFunction), { 
+      authorizationType: AuthorizationType.COGNITO,
+      authorizer: {
+        authorizerId: cognitoRequestAuthorizer.ref
+      },
+    });
+
+    const photosCompleteApiResource = new Resource(this, 'photosCompleteApiResource', {
+      pathPart: 'complete',
+      parent: photosApiResource
+    })
+
+    const photosCompleteFunction = new Function(this, 'photosCompleteFunction', {
+      runtime: Runtime.PYTHON_3_8,
+      memorySize: 128,
+      timeout: Duration.seconds(30),
+      handler: "api.v1.photos.complete.lambda_handler",
+      code: Code.fromAsset('src/'),
+      environment: {
+        PYTHONPATH: "/var/runtime:/opt",
+        DYNAMO_WRITE_ROLE_ARN: props.dynamoTableWriteRole.roleArn,
+        DYNAMO_TABLE_NAME: props.dynamoTableName,
+        PHOTO_BUCKET_NAME: props.photoBucketName,
+        PHOTO_BUCKET_ROLE_ARN: props.photoBucketRole.roleArn
+      },
+      layers: [flaskLayer]
+    })
+
+    if (photosCompleteFunction.role) {
+      props.dynamoTableWriteRole.grant(photosCompleteFunction.role, 'sts:AssumeRole')
+      props.photoBucketRole.grant(photosCompleteFunction.role, 'sts:AssumeRole')
+    }
+
+    photosCompleteApiResource.addMethod('POST', new LambdaIntegration(photosCompleteFunction), { 
+      authorizationType: AuthorizationType.COGNITO,
+      authorizer: {
+        authorizerId: cognitoRequestAuthorizer.ref
+      },
+    });
+
+
+    // Map
+    const mapApiResource = new Resource(this, 'mapApiResource', {
+      pathPart: 'map',
+      parent: this.restApi.root
+    })
+
+    const mapGetFunction = new Function(this, 'mapGetFunction', {
+      runtime: Runtime.PYTHON_3_8,
+      memorySize: 128,
+      timeout: Duration.seconds(30),
+      handler: "api.v1.map.get.lambda_handler",
+      code: Code.fromAsset('src/'),
+      environment: {
+        PYTHONPATH: "/var/runtime:/opt",
+        DYNAMO_READ_ROLE_ARN: props.dynamoTableReadRole.roleArn,
+        DYNAMO_TABLE_NAME: props.dynamoTableName,
+        PHOTO_BUCKET_NAME: props.photoBucketName,
+        PHOTO_BUCKET_ROLE_ARN: props.photoBucketRole.roleArn
+      },
+      layers: [flaskLayer]
+    })
+
+    if (mapGetFunction.role) {
+      props.dynamoTableReadRole.grant(mapGetFunction.role, 'sts:AssumeRole')
+      props.photoBucketRole.grant(mapGetFunction.role, 'sts:AssumeRole')
+    }
+
+    mapApiResource.addMethod('GET', routeIntegration(mapGetFunction), { 
+      requestValidator: requestValidator,
+      requestParameters: {
+        "method.request.querystring.user": true,
+      }
+    });
   }
 }
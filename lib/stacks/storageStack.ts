@@ -1,21 +1,51 @@
 import { Table, AttributeType, BillingMode } from 'aws-cdk-lib/aws-dynamodb';
-import { Stack, StackProps } from 'aws-cdk-lib';
+import { Duration, Stack, StackProps } from 'aws-cdk-lib';
 import { Construct } from 'constructs';
 import { AccountRootPrincipal, Role } from 'aws-cdk-lib/aws-iam'
+import { BlockPublicAccess, Bucket, BucketEncryption, EventType, HttpMethods } from 'aws-cdk-lib/aws-s3';
+import { LambdaDestination } from 'aws-cdk-lib/aws-s3-notifications';
+import { Code, Function, LayerVersion, Runtime } from 'aws-cdk-lib/aws-lambda';
 
 export class StorageStack extends Stack {
   public dynamoTableReadRole: Role;
   public dynamoTableWriteRole: Role;
   public dynamoTableName: string;
+  public photoBucket: Bucket;
+  public photoBucketRole: Role;
   constructor(scope: Construct, id: string, props: StackProps) {
     super(scope, id, props);
 
     const dynamoTable = new Table(this, `ScrapMapTable`, {
       partitionKey: {name: "PK", type: AttributeType.STRING},
       sortKey: {name: "SK", type: AttributeType.STRING},
-      billingMode: BillingMode.PAY_PER_REQUEST
+      billingMode: BillingMode.PAY_PER_REQUEST,
+      // Tombstones left by deletes expire on their own
+      timeToLiveAttribute: "ExpiresAt"
     })
 
+    // Places and destinations by geohash, for viewport queries
+    dynamoTable.addGlobalSecondaryIndex({
+      indexName: "GeoIndex",
+      partitionKey: {name: "PK", type: AttributeType.STRING},
+      sortKey: {name: "GeoSK", type: AttributeType.STRING},
+    })
+
+    // CloudFormation adds at most one GSI to an existing table per update. Tables
+    // deployed before both indexes existed are upgraded in two deploys (see the
+    // README): `cdk deploy -c deferChangesIndex=true` adds GeoIndex, then a plain
+    // `cdk deploy` adds ChangesIndex. New tables are created with both.
+    const deferChangesIndex = this.node.tryGetContext('deferChangesIndex') === true
+      || this.node.tryGetContext('deferChangesIndex') === 'true'
+
+    // Items in the order they were last written, for delta syncs
+    if (!deferChangesIndex) {
+      dynamoTable.addGlobalSecondaryIndex({
+        indexName: "ChangesIndex",
+        partitionKey: {name: "PK", type: AttributeType.STRING},
+        sortKey: {name: "ChangeSK", type: AttributeType.STRING},
+      })
+    }
+
     this.dynamoTableName = dynamoTable.tableName;
 
     this.dynamoTableReadRole = new Role(this, 'dynamoDBReadRole', {
@@ -28,6 +58,69 @@ export class StorageStack extends Stack {
 
     dynamoTable.grantReadData(this.dynamoTableReadRole);
     dynamoTable.grantWriteData(this.dynamoTableWriteRole);
+    // Photos are only written if their place exists, checked in the same transaction
+    dynamoTable.grant(this.dynamoTableWriteRole, 'dynamodb:ConditionCheckItem');
+
+    // Photos are uploaded and downloaded directly with presigned URLs
+    this.photoBucket = new Bucket(this, 'photoBucket', {
+      blockPublicAccess: BlockPublicAccess.BLOCK_ALL,
+      encryption: BucketEncryption.S3_MANAGED,
+      enforceSSL: true,
+      cors: [{
+        allowedMethods: [HttpMethods.PUT, HttpMethods.GET],
+        allowedOrigins: ['*'],
+        allowedHeaders: ['*'],
+        // Clients need each part's ETag to complete a multipart upload
+        exposedHeaders: ['ETag'],
+      }],
+      lifecycleRules: [{
+        abortIncompleteMultipartUploadAfter: Duration.days(1),
+      }],
+    })
+
+    this.photoBucketRole = new Role(this, 'photoBucketRole', {
+      assumedBy: new AccountRootPrincipal()
+    })
+
+    this.photoBucket.grantReadWrite(this.photoBucketRole);
+
+    // Renders resized copies of each photo once its upload completes. Lives next to
+    // the bucket, since the bucket's notifications have to reference it.
+    const pillowLayer = new LayerVersion(this, 'pillowLambdaLayer', {
+      compatibleRuntimes: [
+        Runtime.PYTHON_3_9,
+        Runtime.PYTHON_3_8,
+      ],
+      code: Code.fromAsset('layers/pillow'),
+    });
+
+    const photoDerivativesFunction = new Function(this, 'photoDerivativesFunction', {
+      runtime: Runtime.PYTHON_3_8,
+      // Above ~1.8 GB a function gets more than one vCPU to render on
+      memorySize: 2048,
+      timeout: Duration.seconds(60),
+      handler: "workers.photo_derivatives.lambda_handler",
+      code: Code.fromAsset('src/'),
+      environment: {
+        PYTHONPATH: "/var/runtime:/opt",
+        DYNAMO_WRITE_ROLE_ARN: this.dynamoTableWriteRole.roleArn,
+        DYNAMO_TABLE_NAME: dynamoTable.tableName,
+        PHOTO_BUCKET_ROLE_ARN: this.photoBucketRole.roleArn
+      },
+      layers: [pillowLayer]
+    })
+
+    if (photoDerivativesFunction.role) {
+      this.dynamoTableWriteRole.grant(photoDerivativesFunction.role, 'sts:AssumeRole')
+      this.photoBucketRole.grant(photoDerivativesFunction.role, 'sts:AssumeRole')
+    }
+
+    // Derivatives are written outside photos/, so they do not trigger the function
+    this.photoBucket.addEventNotification(
+      EventType.OBJECT_CREATED,
+      new LambdaDestination(photoDerivativesFunction),
+      { prefix: 'photos/' }
+    )
 
   }
 }
@@ -1,12 +1,17 @@
-from api.v1.auth.lambda_function import app, logger
+from api.v1.auth.lambda_function import router, logger
 
-import boto3
 import os
-from utils.boto3.sts_session import create_sts_session
+from utils.boto3.sts_session import session_registry
 from utils.environment import EnvironmentVariables, validate_environment
 from utils.requests import CHANGE_PASSWORD_URL
-from flask import request
-from utils.flask import make_exception, make_response, Methods
+from utils.circuit_breaker import CircuitOpenError
+from utils.router import (
+    Methods,
+    Request,
+    make_exception,
+    make_response,
+    service_unavailable,
+)
 
 
 required_env_vars = [
@@ -16,18 +21,17 @@ required_env_vars = [
 ]
 
 
-@app.route(CHANGE_PASSWORD_URL, methods=[Methods.POST])
-def change_password():
+@router.route(CHANGE_PASSWORD_URL, methods=[Methods.POST])
+def change_password(request: Request):
     env = os.environ
 
     validate_environment(env, required_env_vars)
 
-    sts_client = boto3.Session().client("sts")
-    cognito = create_sts_session(
-        sts_client=sts_client,
+    cognito = session_registry.client(
+        "cognito-idp",
         role_arn=env[EnvironmentVariables.USER_POOL_ACCESS_ROLE_ARN.name],
         role_session_name="GET_USER_POOL_INFO",
-    ).client("cognito-idp")
+    )
 
     body = request.json
 
@@ -44,5 +48,7 @@ def change_password():
 
         return make_response(204, "")
 
+    except CircuitOpenError as e:
+        return service_unavailable(e)
     except Exception:
         make_exception(500, "Server Error", logger)
@@ -1,13 +1,18 @@
-from api.v1.auth.lambda_function import app, logger
+from api.v1.auth.lambda_function import router, logger
 
-import boto3
 import os
-from utils.boto3.sts_session import create_sts_session
+from utils.boto3.sts_session import session_registry
 from utils.environment import EnvironmentVariables, validate_environment
-from utils.boto3.cognito import get_secret_hash
+from utils.boto3.cognito import get_secret_hash, invalidate_secret_on_hash_error
 from utils.requests import CONFIRM_FORGOT_PASSWORD_URL
-from flask import request
-from utils.flask import make_exception, make_response, Methods
+from utils.circuit_breaker import CircuitOpenError
+from utils.router import (
+    Methods,
+    Request,
+    make_exception,
+    make_response,
+    service_unavailable,
+)
 
 
 required_env_vars = [
@@ -17,27 +22,19 @@ required_env_vars = [
 ]
 
 
-@app.route(CONFIRM_FORGOT_PASSWORD_URL, methods=[Methods.POST])
-def confirm_forgot_password():
+@router.route(CONFIRM_FORGOT_PASSWORD_URL, methods=[Methods.POST])
+def confirm_forgot_password(request: Request):
     env = os.environ
 
     validate_environment(env, required_env_vars)
 
-    sts_client = boto3.Session().client("sts")
-    cognito = create_sts_session(
-        sts_client=sts_client,
+    cognito = session_registry.client(
+        "cognito-idp",
         role_arn=env[EnvironmentVariables.USER_POOL_ACCESS_ROLE_ARN.name],
         role_session_name="GET_USER_POOL_INFO",
-    ).client("cognito-idp")
-
-    client_id = env[EnvironmentVariables.CLIENT_ID.name]
-    user_pool_id = env[EnvironmentVariables.USER_POOL_ID.name]
-
-    response = cognito.describe_user_pool_client(
-        UserPoolId=user_pool_id, ClientId=client_id
     )
 
-    client_secret = response["UserPoolClient"]["ClientSecret"]
+    client_id = env[EnvironmentVariables.CLIENT_ID.name]
 
     body = request.json
 
@@ -45,7 +42,7 @@ def confirm_forgot_password():
     code = body["confirmation_code"]
     password = body["password"]
 
-    secret_hash = get_secret_hash(username, client_id, client_secret)
+    secret_hash = get_secret_hash(cognito, env, username, client_id)
 
     try:
         cognito.confirm_forgot_password(
@@ -56,9 +53,12 @@ def confirm_forgot_password():
             Username=username,
         )
         return make_response(204, "")
-    except cognito.exceptions.NotAuthorizedException:
+    except cognito.exceptions.NotAuthorizedException as e:
+        invalidate_secret_on_hash_error(e, env, client_id)
         return make_exception(401, "The username or password is incorrect", logger)
     except cognito.exceptions.UserNotConfirmedException:
         return make_exception(403, "User is not confirmed", logger)
+    except CircuitOpenError as e:
+        return service_unavailable(e)
     except Exception:
         return make_exception(500, "Server Error", logger)
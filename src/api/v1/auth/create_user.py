@@ -1,13 +1,19 @@
-from api.v1.auth.lambda_function import app, logger
+from api.v1.auth.lambda_function import router, logger
 
-import boto3
 import os
-from utils.boto3.sts_session import create_sts_session
+from typing import Dict
+from utils.boto3.sts_session import session_registry
 from utils.environment import EnvironmentVariables, validate_environment
-from utils.boto3.cognito import get_secret_hash
+from utils.boto3.cognito import get_secret_hash, invalidate_secret_on_hash_error
 from utils.requests import CREATE_USER_URL
-from flask import request, Response
-from utils.flask import make_exception, make_response, Methods
+from utils.circuit_breaker import CircuitOpenError
+from utils.router import (
+    Methods,
+    Request,
+    make_exception,
+    make_response,
+    service_unavailable,
+)
 
 required_env_vars = [
     EnvironmentVariables.CLIENT_ID.name,
@@ -16,17 +22,16 @@ required_env_vars = [
 ]
 
 
-@app.route(CREATE_USER_URL, methods=[Methods.POST])
-def create_user() -> Response:
+@router.route(CREATE_USER_URL, methods=[Methods.POST])
+def create_user(request: Request) -> Dict:
     env = os.environ
     validate_environment(env, required_env_vars)
 
-    sts_client = boto3.Session().client("sts")
-    cognito = create_sts_session(
-        sts_client=sts_client,
+    cognito = session_registry.client(
+        "cognito-idp",
         role_arn=env[EnvironmentVariables.USER_POOL_ACCESS_ROLE_ARN.name],
         role_session_name="GET_USER_POOL_INFO",
-    ).client("cognito-idp")
+    )
 
     client_id = env[EnvironmentVariables.CLIENT_ID.name]
 
@@ -64,5 +69,8 @@ def create_user() -> Response:
     except cognito.exceptions.UserLambdaValidationException:
         return make_exception(400, "An account with this email already exists", logger)
 
-    except Exception:
+    except CircuitOpenError as e:
+        return service_unavailable(e)
+    except Exception as e:
+        invalidate_secret_on_hash_error(e, env, client_id)
         return make_exception(500, "Error. Please try again later", logger)
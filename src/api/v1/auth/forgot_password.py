@@ -1,13 +1,18 @@
-from api.v1.auth.lambda_function import app, logger
+from api.v1.auth.lambda_function import router, logger
 
-import boto3
 import os
-from utils.boto3.sts_session import create_sts_session
+from utils.boto3.sts_session import session_registry
 from utils.environment import EnvironmentVariables, validate_environment
-from utils.boto3.cognito import get_secret_hash
+from utils.boto3.cognito import get_secret_hash, invalidate_secret_on_hash_error
 from utils.requests import FORGOT_PASSWORD_URL
-from flask import request
-from utils.flask import make_exception, make_response, Methods
+from utils.circuit_breaker import CircuitOpenError
+from utils.router import (
+    Methods,
+    Request,
+    make_exception,
+    make_response,
+    service_unavailable,
+)
 
 required_env_vars = [
     EnvironmentVariables.CLIENT_ID.name,
@@ -16,18 +21,17 @@ required_env_vars = [
 ]
 
 
-@app.route(FORGOT_PASSWORD_URL, methods=[Methods.POST])
-def forgot_password():
+@router.route(FORGOT_PASSWORD_URL, methods=[Methods.POST])
+def forgot_password(request: Request):
     env = os.environ
 
     validate_environment(env, required_env_vars)
 
-    sts_client = boto3.Session().client("sts")
-    cognito = create_sts_session(
-        sts_client=sts_client,
+    cognito = session_registry.client(
+        "cognito-idp",
         role_arn=env[EnvironmentVariables.USER_POOL_ACCESS_ROLE_ARN.name],
         role_session_name="GET_USER_POOL_INFO",
-    ).client("cognito-idp")
+    )
 
     client_id = env[EnvironmentVariables.CLIENT_ID.name]
 
@@ -50,7 +54,10 @@ def forgot_password():
         return make_exception(400, f"User <{username}> is not confirmed yet", logger)
     except cognito.exceptions.CodeMismatchException:
         return make_exception(400, "Invalid verification code", logger)
-    except cognito.exceptions.NotAuthorizedException:
+    except cognito.exceptions.NotAuthorizedException as e:
+        invalidate_secret_on_hash_error(e, env, client_id)
         return make_exception(403, "Not authorized", logger)
+    except CircuitOpenError as e:
+        return service_unavailable(e)
     except Exception:
         return make_exception(500, "Server Error. Try again later", logger)
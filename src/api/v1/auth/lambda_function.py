@@ -1,19 +1,37 @@
-import awsgi
-from flask import Flask
+from utils.instrumentation import instrumented
+from utils.log_policy import log_event
+from utils.router import Methods, Router
+from utils.requests import (
+    CREATE_USER_URL,
+    FORGOT_PASSWORD_URL,
+    LOGIN_URL,
+    REFRESH_TOKENS_URL,
+    RESPOND_TO_AUTH_CHALLENGE_URL,
+    VERIFY_USER_URL,
+)
 
 import logging
 
 logger = logging.getLogger(__name__)
+logger.setLevel("INFO")
 
-app = Flask(__name__)
+router = Router()
 
+# Each route's module (and boto3 with it) is imported on the route's first call
+router.lazy(LOGIN_URL, [Methods.POST], "api.v1.auth.login")
+router.lazy(CREATE_USER_URL, [Methods.POST], "api.v1.auth.create_user")
+router.lazy(REFRESH_TOKENS_URL, [Methods.POST], "api.v1.auth.refresh_tokens")
+router.lazy(VERIFY_USER_URL, [Methods.POST], "api.v1.auth.verify_user")
+router.lazy(FORGOT_PASSWORD_URL, [Methods.POST], "api.v1.auth.forgot_password")
+router.lazy(
+    RESPOND_TO_AUTH_CHALLENGE_URL,
+    [Methods.POST],
+    "api.v1.auth.respond_to_auth_challenge",
+)
 
-import api.v1.auth.login
-import api.v1.auth.create_user
-import api.v1.auth.refresh_tokens
-import api.v1.auth.verify_user
-import api.v1.auth.forgot_password
-import api.v1.auth.respond_to_auth_challenge
 
+@instrumented("auth")
 def lambda_handler(event, context):
-    return awsgi.response(app, event, context)
+    # Bodies hold passwords and tokens, which are redacted before any is logged
+    log_event(logger, event)
+    return router.dispatch(event, context)
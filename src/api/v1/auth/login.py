@@ -1,16 +1,26 @@
-from api.v1.auth.lambda_function import app, logger
+from api.v1.auth.lambda_function import router, logger
 
-import boto3
 import json
 import os
 from models.v1.auth import AuthenticationResult, Challenge
 from utils.encoders import DataclassEncoder
-from utils.boto3.sts_session import create_sts_session
+from utils.boto3.sts_session import session_registry
 from utils.environment import EnvironmentVariables, validate_environment
-from utils.boto3.cognito import AuthFlows, AuthParameters, get_secret_hash
+from utils.boto3.cognito import (
+    AuthFlows,
+    AuthParameters,
+    get_secret_hash,
+    invalidate_secret_on_hash_error,
+)
 from utils.requests import LOGIN_URL
-from flask import request
-from utils.flask import make_exception, make_response, Methods
+from utils.circuit_breaker import CircuitOpenError
+from utils.router import (
+    Methods,
+    Request,
+    make_exception,
+    make_response,
+    service_unavailable,
+)
 
 
 required_env_vars = [
@@ -20,18 +30,17 @@ required_env_vars = [
 ]
 
 
-@app.route(LOGIN_URL, methods=[Methods.POST])
-def login():
+@router.route(LOGIN_URL, methods=[Methods.POST])
+def login(request: Request):
     env = os.environ
 
     validate_environment(env, required_env_vars)
 
-    sts_client = boto3.Session().client("sts")
-    cognito = create_sts_session(
-        sts_client=sts_client,
+    cognito = session_registry.client(
+        "cognito-idp",
         role_arn=env[EnvironmentVariables.USER_POOL_ACCESS_ROLE_ARN.name],
         role_session_name="GET_USER_POOL_INFO",
-    ).client("cognito-idp")
+    )
 
     client_id = env[EnvironmentVariables.CLIENT_ID.name]
 
@@ -56,7 +65,8 @@ def login():
             },
         )
 
-    except cognito.exceptions.NotAuthorizedException:
+    except cognito.exceptions.NotAuthorizedException as e:
+        invalidate_secret_on_hash_error(e, env, client_id)
         return make_exception(401, "The username or password is incorrect", logger)
 
     except cognito.exceptions.UserNotConfirmedException:
@@ -65,6 +75,8 @@ def login():
     except cognito.exceptions.UserNotFoundException:
         return make_exception(404, "User does not exist", logger)
 
+    except CircuitOpenError as e:
+        return service_unavailable(e)
     except Exception:
         return make_exception(500, "Server Error. Please try again later", logger)
 
@@ -1,14 +1,24 @@
-from api.v1.auth.lambda_function import app, logger
+from api.v1.auth.lambda_function import router, logger
 
-import boto3
 import json
 import os
-from utils.boto3.sts_session import create_sts_session
+from utils.boto3.sts_session import session_registry
 from utils.environment import EnvironmentVariables, validate_environment
-from utils.boto3.cognito import get_secret_hash, AuthFlows, AuthParameters
+from utils.boto3.cognito import (
+    get_secret_hash,
+    invalidate_secret_on_hash_error,
+    AuthFlows,
+    AuthParameters,
+)
 from utils.requests import REFRESH_TOKENS_URL, AuthBodyFields
-from flask import request
-from utils.flask import make_exception, make_response, Methods
+from utils.circuit_breaker import CircuitOpenError
+from utils.router import (
+    Methods,
+    Request,
+    make_exception,
+    make_response,
+    service_unavailable,
+)
 
 
 required_env_vars = [
@@ -18,39 +28,28 @@ required_env_vars = [
 ]
 
 
-@app.route(REFRESH_TOKENS_URL, methods=[Methods.POST])
-def refresh_tokens():
+@router.route(REFRESH_TOKENS_URL, methods=[Methods.POST])
+def refresh_tokens(request: Request):
     env = dict(os.environ)
 
     validate_environment(env, required_env_vars)
 
-    sts_client = boto3.Session().client("sts")
-    cognito = create_sts_session(
-        sts_client=sts_client,
+    cognito = session_registry.client(
+        "cognito-idp",
         role_arn=env[EnvironmentVariables.USER_POOL_ACCESS_ROLE_ARN.name],
         role_session_name="GET_USER_POOL_INFO",
-    ).client("cognito-idp")
-
-    client_id = env[EnvironmentVariables.CLIENT_ID.name]
-    user_pool_id = env[EnvironmentVariables.USER_POOL_ID.name]
-
-    response = cognito.describe_user_pool_client(
-        UserPoolId=user_pool_id, ClientId=client_id
     )
 
-    client_secret = response["UserPoolClient"]["ClientSecret"]
+    client_id = env[EnvironmentVariables.CLIENT_ID.name]
 
     body = request.json
     username = body[AuthBodyFields.USERNAME]
     refresh_token = body[AuthBodyFields.REFRESH_TOKEN]
 
-    secret_hash = get_secret_hash(username, client_id, client_secret)
+    secret_hash = get_secret_hash(cognito, env, username, client_id)
 
     try:
-        client = boto3.client("cognito-idp")
-
-        secret_hash = get_secret_hash(username, client_id, client_secret)
-        resp = client.initiate_auth(
+        resp = cognito.initiate_auth(
             ClientId=client_id,
             AuthFlow=AuthFlows.REFRESH_TOKEN_AUTH,
             AuthParameters={
@@ -75,5 +74,8 @@ def refresh_tokens():
 
         return make_response(200, json.dumps(body))
 
+    except CircuitOpenError as e:
+        return service_unavailable(e)
     except Exception as e:
+        invalidate_secret_on_hash_error(e, env, client_id)
         return make_exception(500, str(e), logger)
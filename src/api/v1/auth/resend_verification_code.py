@@ -1,13 +1,18 @@
-from api.v1.auth.lambda_function import app, logger
+from api.v1.auth.lambda_function import router, logger
 
-import boto3
 import os
-from utils.boto3.sts_session import create_sts_session
+from utils.boto3.sts_session import session_registry
 from utils.environment import EnvironmentVariables, validate_environment
-from utils.boto3.cognito import get_secret_hash
+from utils.boto3.cognito import get_secret_hash, invalidate_secret_on_hash_error
 from utils.requests import RESEND_VERIFICATION_CODE_URL
-from flask import request
-from utils.flask import make_exception, make_response, Methods
+from utils.circuit_breaker import CircuitOpenError
+from utils.router import (
+    Methods,
+    Request,
+    make_exception,
+    make_response,
+    service_unavailable,
+)
 
 required_env_vars = [
     EnvironmentVariables.CLIENT_ID.name,
@@ -16,33 +21,25 @@ required_env_vars = [
 ]
 
 
-@app.route(RESEND_VERIFICATION_CODE_URL, methods=[Methods.POST])
-def resend_verification_code():
+@router.route(RESEND_VERIFICATION_CODE_URL, methods=[Methods.POST])
+def resend_verification_code(request: Request):
     env = os.environ
 
     validate_environment(env, required_env_vars)
 
-    sts_client = boto3.Session().client("sts")
-    cognito = create_sts_session(
-        sts_client=sts_client,
+    cognito = session_registry.client(
+        "cognito-idp",
         role_arn=env[EnvironmentVariables.USER_POOL_ACCESS_ROLE_ARN.name],
         role_session_name="GET_USER_POOL_INFO",
-    ).client("cognito-idp")
-
-    client_id = env[EnvironmentVariables.CLIENT_ID.name]
-    user_pool_id = env[EnvironmentVariables.USER_POOL_ID.name]
-
-    response = cognito.describe_user_pool_client(
-        UserPoolId=user_pool_id, ClientId=client_id
     )
 
-    client_secret = response["UserPoolClient"]["ClientSecret"]
+    client_id = env[EnvironmentVariables.CLIENT_ID.name]
 
     body = request.json
     username = body["username"]
 
     try:
-        secret_hash = get_secret_hash(username, client_id, client_secret)
+        secret_hash = get_secret_hash(cognito, env, username, client_id)
         cognito.resend_confirmation_code(
             ClientId=client_id,
             SecretHash=secret_hash,
@@ -53,5 +50,8 @@ def resend_verification_code():
         return make_exception(404, "User does not exist", logger)
     except cognito.exceptions.InvalidParameterException:
         return make_exception(400, "User is already confirmed", logger)
-    except Exception:
+    except CircuitOpenError as e:
+        return service_unavailable(e)
+    except Exception as e:
+        invalidate_secret_on_hash_error(e, env, client_id)
         return make_exception(500, "Server Error", logger)
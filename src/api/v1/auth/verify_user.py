@@ -1,14 +1,19 @@
-from api.v1.auth.lambda_function import app, logger
+from api.v1.auth.lambda_function import router, logger
 
-import boto3
 import json
 import os
-from utils.boto3.sts_session import create_sts_session
+from utils.boto3.sts_session import session_registry
 from utils.environment import EnvironmentVariables, validate_environment
-from utils.boto3.cognito import get_secret_hash
+from utils.boto3.cognito import get_secret_hash, invalidate_secret_on_hash_error
 from utils.requests import VERIFY_USER_URL
-from flask import request
-from utils.flask import make_exception, make_response, Methods
+from utils.circuit_breaker import CircuitOpenError
+from utils.router import (
+    Methods,
+    Request,
+    make_exception,
+    make_response,
+    service_unavailable,
+)
 
 
 required_env_vars = [
@@ -18,18 +23,17 @@ required_env_vars = [
 ]
 
 
-@app.route(VERIFY_USER_URL, methods=[Methods.POST])
-def verify_user():
+@router.route(VERIFY_USER_URL, methods=[Methods.POST])
+def verify_user(request: Request):
     env = os.environ
 
     validate_environment(env, required_env_vars)
 
-    sts_client = boto3.Session().client("sts")
-    cognito = create_sts_session(
-        sts_client=sts_client,
+    cognito = session_registry.client(
+        "cognito-idp",
         role_arn=env[EnvironmentVariables.USER_POOL_ACCESS_ROLE_ARN.name],
         role_session_name="GET_USER_POOL_INFO",
-    ).client("cognito-idp")
+    )
 
     client_id = env[EnvironmentVariables.CLIENT_ID.name]
 
@@ -39,9 +43,7 @@ def verify_user():
 
     try:
         secret_hash = get_secret_hash(cognito, env, username, client_id)
-        client = boto3.client("cognito-idp")
-
-        response = client.confirm_sign_up(
+        response = cognito.confirm_sign_up(
             ClientId=client_id,
             SecretHash=secret_hash,
             Username=username,
@@ -52,11 +54,14 @@ def verify_user():
         logger.info(json.dumps(response))
         return make_response(204, "")
 
-    except client.exceptions.UserNotFoundException:
+    except cognito.exceptions.UserNotFoundException:
         return make_exception(404, "User not found", logger)
-    except client.exceptions.CodeMismatchException:
+    except cognito.exceptions.CodeMismatchException:
         return make_exception(400, "Invalid verification code", logger)
-    except client.exceptions.NotAuthorizedException:
+    except cognito.exceptions.NotAuthorizedException as e:
+        invalidate_secret_on_hash_error(e, env, client_id)
         return make_exception(400, "User is already confirmed", logger)
+    except CircuitOpenError as e:
+        return service_unavailable(e)
     except Exception:
         return make_exception(500, "Server Error. Please try again later", logger)
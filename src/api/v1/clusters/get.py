@@ -0,0 +1,157 @@
+import json
+from typing import Dict, List
+from botocore.exceptions import ClientError
+import os
+from utils import geohash
+from utils.boto3.dynamo import (
+    Entities,
+    ScrapMapDDBSchema,
+    SortKeyPrefixes,
+    get_version,
+    query_geohash_ranges,
+    read_native_numbers,
+)
+from utils.boto3.sts_session import session_registry
+from utils.cache import collection_cache
+from utils.clustering import (
+    MAX_ZOOM,
+    Cluster,
+    Point,
+    cluster_points,
+    clusters_in_view,
+    precision_for_zoom,
+)
+from utils.boto3.lambda_ import make_response, service_unavailable
+from utils.circuit_breaker import CircuitOpenError
+from utils.environment import EnvironmentVariables, validate_environment
+from utils.instrumentation import count, instrumented, size, span
+from utils.log_policy import log_event
+from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
+from aws_lambda_powertools.utilities.data_classes import (
+    APIGatewayProxyEvent,
+    event_source,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel("INFO")
+
+required_env_vars = [
+    EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name,
+    EnvironmentVariables.DYNAMO_TABLE_NAME.name,
+]
+
+CLUSTERED_ENTITIES = (Entities.DESTINATION, Entities.PLACE)
+
+# Only what clustering needs, rather than the whole entity
+POINT_PROJECTION = {
+    "ProjectionExpression": "#sk, #geo_sk, #entity.latitude, #entity.longitude",
+    "ExpressionAttributeNames": {
+        "#sk": ScrapMapDDBSchema.SK,
+        "#geo_sk": ScrapMapDDBSchema.GeoSK,
+        "#entity": ScrapMapDDBSchema.Entity,
+    },
+}
+
+
+def query_clusters(table: Table, user: str, precision: int) -> List[Cluster]:
+    """
+    Buckets every destination and place on the user's map at `precision`.
+    """
+    clusters: List[Cluster] = []
+    for entity in CLUSTERED_ENTITIES:
+        prefix = getattr(SortKeyPrefixes, entity)
+        items = query_geohash_ranges(
+            table, user, prefix, geohash.cover(geohash.WORLD), **POINT_PROJECTION
+        )
+        points = (
+            Point(
+                entity,
+                item[ScrapMapDDBSchema.GeoSK][len(prefix) :],
+                float(item[ScrapMapDDBSchema.Entity]["latitude"]),
+                float(item[ScrapMapDDBSchema.Entity]["longitude"]),
+                item[ScrapMapDDBSchema.SK][len(prefix) :],
+            )
+            for item in items
+        )
+        clusters.extend(cluster_points(points, precision))
+    return clusters
+
+
+@instrumented("clusters.get")
+@event_source(data_class=APIGatewayProxyEvent)
+def lambda_handler(event: APIGatewayProxyEvent, context):
+    log_event(logger, event.raw_event)
+
+    logger.info("Validating Environment Variables")
+    env: Dict = dict(os.environ)
+    validate_environment(env, required_env_vars)
+
+    # Only reads, so numbers can come back as int/float rather than Decimal
+    dynamo: DynamoDBServiceResource = read_native_numbers(
+        session_registry.resource(
+            "dynamodb",
+            role_arn=env[EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name],
+            role_session_name="GET_CLUSTERS_FOR_USER",
+        )
+    )
+
+    table: Table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
+
+    # API Gateway will validate that the parameters exist
+    user: str = event.query_string_parameters["user"]
+
+    try:
+        zoom = int(event.get_query_string_value("zoom"))
+        if not 0 <= zoom <= MAX_ZOOM:
+            raise ValueError(f"Zoom must be between 0 and {MAX_ZOOM}")
+        box = geohash.parse_bounding_box(
+            *(
+                event.get_query_string_value(name)
+                for name in geohash.BoundingBox._fields
+            )
+        )
+    except (TypeError, ValueError):
+        logger.exception("Invalid Zoom or Viewport")
+        return make_response(400, "Invalid Zoom or Viewport")
+
+    try:
+        precision = precision_for_zoom(zoom)
+        version = get_version(table, user)
+
+        # The whole map is clustered once per zoom level and version, each
+        # viewport is then cut out of the cached clusters
+        cache_key = (user, "CLUSTERS", precision)
+        clusters = collection_cache.get(cache_key, version)
+        count("CacheMiss" if clusters is None else "CacheHit")
+        if clusters is None:
+            clusters = tuple(query_clusters(table, user, precision))
+            collection_cache.put(cache_key, version, clusters)
+        size("CacheBytes", collection_cache.bytes)
+
+        precision, visible = clusters_in_view(clusters, box, precision)
+        logger.info(
+            "%d of %d clusters in view at precision %d",
+            len(visible),
+            len(clusters),
+            precision,
+        )
+
+        count("Items", len(visible))
+        with span("serialize"):
+            body = json.dumps(
+                {
+                    "precision": precision,
+                    "clusters": [cluster.asdict() for cluster in visible],
+                }
+            )
+        return make_response(200, body)
+    except CircuitOpenError as e:
+        logger.warning("Failing fast: %s", e)
+        return service_unavailable(e)
+    except ClientError:
+        logger.exception("AWS Client Error")
+        return make_response(500, "Server Error")
+    except Exception:
+        logger.exception("An Unknown Error has Occured")
+        return make_response(500, "Server Error")
@@ -1,13 +1,26 @@
 from typing import Dict
+from boto3.dynamodb.conditions import Attr
 from botocore.exceptions import ClientError
-import boto3
+import json
 import os
-from utils.boto3.dynamo import ScrapMapDDBSchema, SortKeyFormatStrings
-from utils.boto3.sts_session import create_sts_session
-from utils.boto3.lambda_ import make_response
+from utils.boto3.cascade import KEYS_ONLY, places_with_photo_keys
+from utils.boto3.dynamo import (
+    ScrapMapDDBSchema,
+    SortKeyFormatStrings,
+    SortKeyPrefixes,
+    bump_version,
+    delete_record,
+    delete_with_children,
+    query_entities,
+)
+from utils.boto3.s3 import s3_config
+from utils.boto3.sts_session import session_registry
+from utils.boto3.lambda_ import make_response, service_unavailable
+from utils.circuit_breaker import CircuitOpenError
 from utils.environment import EnvironmentVariables, validate_environment
+from utils.instrumentation import instrumented
+from utils.log_policy import log_event
 from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
-from mypy_boto3_sts.client import STSClient
 from aws_lambda_powertools.utilities.data_classes import (
     APIGatewayProxyEvent,
     event_source,
@@ -20,42 +33,90 @@ logger.setLevel("INFO")
 required_env_vars = [
     EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name,
     EnvironmentVariables.DYNAMO_TABLE_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name,
 ]
 
 
+@instrumented("destinations.delete")
 @event_source(data_class=APIGatewayProxyEvent)
 def lambda_handler(event: APIGatewayProxyEvent, context):
-    logger.info(event.raw_event)
+    log_event(logger, event.raw_event)
 
     logger.info("Validating Environment Variables")
     env: Dict = dict(os.environ)
     validate_environment(env, required_env_vars)
 
-    sts_client: STSClient = boto3.Session().client("sts")
-    dynamo: DynamoDBServiceResource = create_sts_session(
-        sts_client=sts_client,
+    dynamo: DynamoDBServiceResource = session_registry.resource(
+        "dynamodb",
         role_arn=env[EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name],
         role_session_name="DELETE_DESTINATION",
-    ).resource("dynamodb")
+    )
 
     table: Table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
 
+    endpoint_url = env.get(EnvironmentVariables.S3_ENDPOINT_URL.name)
+    s3 = session_registry.client(
+        "s3",
+        role_arn=env[EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name],
+        role_session_name="DELETE_PHOTOS",
+        endpoint_url=endpoint_url,
+        config=s3_config(endpoint_url),
+    )
+    bucket = env[EnvironmentVariables.PHOTO_BUCKET_NAME.name]
+
     username: str = event.request_context.authorizer.claims.get("cognito:username")
 
     # API Gateway will validate that the place_id parameter exists
     place_id: str = event.query_string_parameters["place_id"]
+    key = {
+        ScrapMapDDBSchema.PK: username,
+        ScrapMapDDBSchema.SK: SortKeyFormatStrings.DESTINATION.format(
+            place_id=place_id
+        ),
+    }
+    cascade: bool = event.get_query_string_value("cascade", "false").lower() == "true"
+
     try:
         logger.info("PK: %s", username)
-        response = table.delete_item(
-            Key={
-                ScrapMapDDBSchema.PK: username,
-                ScrapMapDDBSchema.SK: SortKeyFormatStrings.DESTINATION.format(
-                    place_id=place_id
-                ),
-            }
+        if not cascade:
+            deleted = delete_record(
+                table, key[ScrapMapDDBSchema.PK], key[ScrapMapDDBSchema.SK]
+            )
+            logger.info("Deleted: %s", deleted)
+            if deleted:
+                bump_version(table, username)
+            return make_response(204, "")
+
+        # Only the keys are needed, and places are found by their destination_id
+        place_keys = query_entities(
+            table,
+            username,
+            SortKeyPrefixes.PLACE,
+            FilterExpression=Attr(f"{ScrapMapDDBSchema.Entity}.destination_id").eq(
+                place_id
+            ),
+            ProjectionExpression=KEYS_ONLY,
+        )
+        result = delete_with_children(
+            dynamo,
+            table,
+            key,
+            # Each place's photos go with it
+            places_with_photo_keys(table, s3, bucket, username, place_keys),
+            time_remaining=lambda: context.get_remaining_time_in_millis() / 1000,
+        )
+        logger.info("Result: %s", result)
+        if not result.found:
+            return make_response(404, "Destination Not Found")
+        if result.deleted:
+            bump_version(table, username)
+        return make_response(
+            200, json.dumps({"deleted": result.deleted, "complete": result.complete})
         )
-        logger.info("Result: %s", response)
-        return make_response(204, "")
+    except CircuitOpenError as e:
+        logger.warning("Failing fast: %s", e)
+        return service_unavailable(e)
     except ClientError:
         logger.exception("AWS Client Error")
         return make_response(500, "Server Error")
@@ -1,10 +1,19 @@
-import boto3
+import json
 import os
-from utils.boto3.dynamo import SortKeyFormatStrings, create_record
-from utils.boto3.sts_session import create_sts_session
+from utils.boto3.dynamo import (
+    MAX_BATCH_CREATE_ENTRIES,
+    SortKeyFormatStrings,
+    batch_create_records,
+    bump_version,
+    create_record,
+)
+from utils.boto3.sts_session import session_registry
 from utils.environment import EnvironmentVariables, validate_environment
-from utils.boto3.lambda_ import make_response
-from models.v1.destination import Destination
+from utils.instrumentation import count, instrumented, span
+from utils.log_policy import log_event
+from utils.boto3.lambda_ import make_response, service_unavailable
+from utils.circuit_breaker import CircuitOpenError
+from models.v1 import Destination, validate_batch
 from botocore.exceptions import ClientError
 import logging
 from aws_lambda_powertools.utilities.data_classes import (
@@ -21,37 +30,75 @@ required_env_vars = [
 ]
 
 
+@instrumented("destinations.post")
 @event_source(data_class=APIGatewayProxyEvent)
 def lambda_handler(event: APIGatewayProxyEvent, context):
-    logger.info("Event: %s", event.raw_event)
+    log_event(logger, event.raw_event)
 
     logger.info("Validating Environment Variables")
     env = os.environ
     validate_environment(env, required_env_vars)
 
+    # Bad bodies are turned away before any role is assumed or AWS call is made
+    try:
+        body = json.loads(event.decoded_body)
+        if isinstance(body, list):
+            if len(body) > MAX_BATCH_CREATE_ENTRIES:
+                return make_response(
+                    413, f"At most {MAX_BATCH_CREATE_ENTRIES} entries per request"
+                )
+            with span("validate"):
+                records, invalid = validate_batch(Destination, body)
+            count("Items", len(body))
+            count("InvalidItems", len(invalid))
+        else:
+            destination = Destination.from_dict(body)
+    except (TypeError, ValueError) as e:
+        logger.info("Invalid Body: %s", e)
+        return make_response(400, f"Invalid Destination: {e}")
+
     logger.info("Generating Dynamo Resource with Assumed Role")
-    sts_client = boto3.Session().client("sts")
-    dynamo = create_sts_session(
-        sts_client=sts_client,
+    dynamo = session_registry.resource(
+        "dynamodb",
         role_arn=env[EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name],
         role_session_name="CREATE_NEW_DESTINATION",
-    ).resource("dynamodb")
+    )
 
     table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
 
     try:
-        logger.info("Body: %s", event.raw_event)
-        destination: Destination = Destination(**event.json_body)
-
         username: str = event.request_context.authorizer.claims.get("cognito:username")
+
+        if isinstance(body, list):
+            report = batch_create_records(
+                dynamo,
+                env[EnvironmentVariables.DYNAMO_TABLE_NAME.name],
+                username,
+                records,
+                SortKeyFormatStrings.DESTINATION,
+                invalid,
+            )
+            logger.info(
+                "Batch Result: %d succeeded, %d failed",
+                len(report["succeeded"]),
+                len(report["failed"]),
+            )
+            if report["succeeded"]:
+                bump_version(table, username)
+            return make_response(207 if report["failed"] else 200, json.dumps(report))
+
         sk = SortKeyFormatStrings.DESTINATION.format(place_id=destination.place_id)
 
-        item = create_record(username, sk, destination.asdict())
-        logger.info("Item: %s", item)
+        item = create_record(username, sk, destination.to_item())
+        logger.debug("Item: %s", item)
 
         response = table.put_item(Item=item)
-        logger.info("Response: %s", response)
+        logger.debug("Response: %s", response)
+        bump_version(table, username)
         return make_response(204, "")
+    except CircuitOpenError as e:
+        logger.warning("Failing fast: %s", e)
+        return service_unavailable(e)
     except ClientError:
         logger.exception("AWS Client Error")
         return make_response(500, "Server Error")
@@ -0,0 +1,55 @@
+"""
+Single function serving every places, destinations and map route.
+
+The per-route handlers are imported at init and dispatched to on the request's
+HTTP method and API Gateway resource, so one warm container serves them all with
+one set of clients, sessions and caches.  Each handler module still exposes its
+own `lambda_handler` and can be deployed on its own.
+"""
+
+from api.v1.destinations import delete as destinations_delete
+from api.v1.destinations import get as destinations_get
+from api.v1.destinations import post as destinations_post
+from api.v1.map import get as map_get
+from api.v1.places import delete as places_delete
+from api.v1.places import get as places_get
+from api.v1.places import post as places_post
+from utils.boto3.sts_session import session_registry
+from utils.instrumentation import instrumented
+from utils.requests import DESTINATIONS_URL, MAP_URL, PLACES_URL
+from utils.router import Methods, Request, Router
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One session (and one AssumeRole) per role, whichever route asks for it first
+session_registry.share_sessions("SCRAPMAP_API")
+
+router = Router(match_resource=True)
+
+ROUTES = {
+    (Methods.GET, PLACES_URL): places_get.lambda_handler,
+    (Methods.POST, PLACES_URL): places_post.lambda_handler,
+    (Methods.DELETE, PLACES_URL): places_delete.lambda_handler,
+    (Methods.GET, DESTINATIONS_URL): destinations_get.lambda_handler,
+    (Methods.POST, DESTINATIONS_URL): destinations_post.lambda_handler,
+    (Methods.DELETE, DESTINATIONS_URL): destinations_delete.lambda_handler,
+    (Methods.GET, MAP_URL): map_get.lambda_handler,
+}
+
+
+def _delegate(handler):
+    def route(request: Request):
+        return handler(request.event, request.context)
+
+    return route
+
+
+for (method, resource), handler in ROUTES.items():
+    router.route(resource, [method])(_delegate(handler))
+
+
+@instrumented("api")
+def lambda_handler(event, context):
+    return router.dispatch(event, context)
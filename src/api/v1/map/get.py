@@ -0,0 +1,164 @@
+from typing import Dict, List
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Attr
+import os
+from utils.boto3.dynamo import (
+    ScrapMapDDBSchema,
+    SortKeyPrefixes,
+    query_entity_groups,
+    read_native_numbers,
+)
+from utils.boto3.s3 import presign_photo, s3_config
+from utils.boto3.sts_session import session_registry
+from utils.serializers import dumps
+from utils.boto3.lambda_ import make_response, service_unavailable
+from utils.circuit_breaker import CircuitOpenError
+from utils.environment import EnvironmentVariables, validate_environment
+from utils.instrumentation import count, instrumented, span
+from utils.log_policy import log_event
+from models.v1.photo import PhotoStatus
+from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
+from aws_lambda_powertools.utilities.data_classes import (
+    APIGatewayProxyEvent,
+    event_source,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel("INFO")
+
+required_env_vars = [
+    EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name,
+    EnvironmentVariables.DYNAMO_TABLE_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name,
+]
+
+
+def build_map(destinations: List[Dict], places: List[Dict], photos: List[Dict]) -> Dict:
+    """
+    Nests the entities of a map: photos under their place and places under their
+    destination.  Places whose destination does not exist (any more) are
+    returned on their own, as are photos whose place does not.
+    """
+    destinations = [dict(destination, places=[]) for destination in destinations]
+    places = [dict(place, photos=[]) for place in places]
+    destinations_by_id = {
+        destination["place_id"]: destination for destination in destinations
+    }
+    places_by_id = {place["place_id"]: place for place in places}
+
+    unassigned_places = []
+    for place in places:
+        destination = destinations_by_id.get(place["destination_id"])
+        if destination is None:
+            unassigned_places.append(place)
+        else:
+            destination["places"].append(place)
+
+    unassigned_photos = []
+    for photo in photos:
+        place = places_by_id.get(photo["place_id"])
+        if place is None:
+            unassigned_photos.append(photo)
+        else:
+            place["photos"].append(photo)
+
+    return {
+        "destinations": destinations,
+        "places": unassigned_places,
+        "photos": unassigned_photos,
+    }
+
+
+@instrumented("map.get")
+@event_source(data_class=APIGatewayProxyEvent)
+def lambda_handler(event: APIGatewayProxyEvent, context):
+    """
+    The user's whole map in one response: destinations with their places, and
+    places with their uploaded photos, fetched with one concurrent query per
+    entity type.
+    """
+    log_event(logger, event.raw_event)
+
+    logger.info("Validating Environment Variables")
+    env: Dict = dict(os.environ)
+    validate_environment(env, required_env_vars)
+
+    # Only reads, so numbers can come back as int/float rather than Decimal
+    dynamo: DynamoDBServiceResource = read_native_numbers(
+        session_registry.resource(
+            "dynamodb",
+            role_arn=env[EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name],
+            role_session_name="GET_MAP_FOR_USER",
+        )
+    )
+
+    table: Table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
+
+    endpoint_url = env.get(EnvironmentVariables.S3_ENDPOINT_URL.name)
+    s3 = session_registry.client(
+        "s3",
+        role_arn=env[EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name],
+        role_session_name="DOWNLOAD_PHOTO",
+        endpoint_url=endpoint_url,
+        config=s3_config(endpoint_url),
+    )
+    bucket = env[EnvironmentVariables.PHOTO_BUCKET_NAME.name]
+
+    # API Gateway will validate that the user parameter exists
+    user: str = event.query_string_parameters["user"]
+
+    try:
+        logger.info("PK: %s", user)
+        groups = query_entity_groups(
+            table,
+            user,
+            {
+                SortKeyPrefixes.DESTINATION: {},
+                SortKeyPrefixes.PLACE: {},
+                # Photos still being uploaded are not shown
+                SortKeyPrefixes.PHOTO: {
+                    "FilterExpression": Attr(f"{ScrapMapDDBSchema.Entity}.status").eq(
+                        PhotoStatus.UPLOADED
+                    )
+                },
+            },
+        )
+        entities = {
+            prefix: [item[ScrapMapDDBSchema.Entity] for item in items]
+            for prefix, items in groups.items()
+        }
+        destinations = entities[SortKeyPrefixes.DESTINATION]
+        places = entities[SortKeyPrefixes.PLACE]
+        photos = entities[SortKeyPrefixes.PHOTO]
+        logger.info(
+            "Query Results: %d destinations, %d places, %d photos",
+            len(destinations),
+            len(places),
+            len(photos),
+        )
+        count("Items", len(destinations) + len(places) + len(photos))
+
+        for photo in photos:
+            # Signed locally, no request to S3
+            presign_photo(s3, bucket, photo)
+
+        with span("serialize"):
+            body = dumps(build_map(destinations, places, photos))
+        return make_response(
+            200,
+            body,
+            # The photo URLs expire, so a stored copy would go stale
+            {"Cache-Control": "private, no-store"},
+            accept_encoding=event.get_header_value("Accept-Encoding"),
+        )
+    except CircuitOpenError as e:
+        logger.warning("Failing fast: %s", e)
+        return service_unavailable(e)
+    except ClientError:
+        logger.exception("AWS Client Error")
+        return make_response(500, "Server Error")
+    except Exception:
+        logger.exception("An Unknown Error has Occured")
+        return make_response(500, "Server Error")
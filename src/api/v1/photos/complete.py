@@ -0,0 +1,109 @@
+import json
+import os
+from utils.boto3.dynamo import SortKeyFormatStrings, update_entity
+from utils.boto3.s3 import complete_multipart_upload, s3_config
+from utils.boto3.sts_session import session_registry
+from utils.environment import EnvironmentVariables, validate_environment
+from utils.instrumentation import instrumented
+from utils.log_policy import log_event
+from utils.boto3.lambda_ import make_response, service_unavailable
+from utils.circuit_breaker import CircuitOpenError
+from models.v1.photo import PHOTO_KEY_FORMAT, PhotoStatus, validate_complete
+from botocore.exceptions import ClientError
+import logging
+from aws_lambda_powertools.utilities.data_classes import (
+    APIGatewayProxyEvent,
+    event_source,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel("INFO")
+
+required_env_vars = [
+    EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name,
+    EnvironmentVariables.DYNAMO_TABLE_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name,
+]
+
+# S3 errors caused by the parts the client reported
+INVALID_PARTS_ERRORS = {"InvalidPart", "InvalidPartOrder", "EntityTooSmall"}
+
+
+@instrumented("photos.complete")
+@event_source(data_class=APIGatewayProxyEvent)
+def lambda_handler(event: APIGatewayProxyEvent, context):
+    """
+    Completes a photo's multipart upload from the ETags of its parts, and marks
+    the photo uploaded.
+    """
+    log_event(logger, event.raw_event)
+
+    logger.info("Validating Environment Variables")
+    env = os.environ
+    validate_environment(env, required_env_vars)
+
+    try:
+        body = validate_complete(json.loads(event.decoded_body))
+    except (TypeError, ValueError) as e:
+        logger.info("Invalid Body: %s", e)
+        return make_response(400, f"Invalid Upload: {e}")
+
+    dynamo = session_registry.resource(
+        "dynamodb",
+        role_arn=env[EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name],
+        role_session_name="COMPLETE_PHOTO",
+    )
+    table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
+
+    endpoint_url = env.get(EnvironmentVariables.S3_ENDPOINT_URL.name)
+    s3 = session_registry.client(
+        "s3",
+        role_arn=env[EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name],
+        role_session_name="UPLOAD_PHOTO",
+        endpoint_url=endpoint_url,
+        config=s3_config(endpoint_url),
+    )
+    bucket = env[EnvironmentVariables.PHOTO_BUCKET_NAME.name]
+
+    username: str = event.request_context.authorizer.claims.get("cognito:username")
+    place_id: str = body["place_id"]
+    photo_id: str = body["photo_id"]
+    # The key is derived from the caller, so nobody can complete another's upload
+    key = PHOTO_KEY_FORMAT.format(user=username, place_id=place_id, photo_id=photo_id)
+
+    try:
+        complete_multipart_upload(s3, bucket, key, body["upload_id"], body["parts"])
+    except ClientError as e:
+        code = e.response["Error"]["Code"]
+        if code == "NoSuchUpload":
+            logger.info("No upload %s for %s", body["upload_id"], key)
+            return make_response(404, "Upload Not Found")
+        if code in INVALID_PARTS_ERRORS:
+            logger.info("Invalid parts for %s: %s", key, code)
+            return make_response(400, f"Invalid Upload: {code}")
+        logger.exception("AWS Client Error")
+        return make_response(500, "Server Error")
+
+    try:
+        updated = update_entity(
+            table,
+            username,
+            SortKeyFormatStrings.PHOTO.format(place_id=place_id, photo_id=photo_id),
+            {"status": PhotoStatus.UPLOADED},
+            remove=["upload_id"],
+            expected={"upload_id": body["upload_id"]},
+        )
+        if not updated:
+            logger.info("Photo %s is not pending", photo_id)
+            return make_response(404, "Photo Not Found")
+        return make_response(204, "")
+    except CircuitOpenError as e:
+        logger.warning("Failing fast: %s", e)
+        return service_unavailable(e)
+    except ClientError:
+        logger.exception("AWS Client Error")
+        return make_response(500, "Server Error")
+    except Exception:
+        logger.exception("An Unknown Error Has Occured")
+        return make_response(500, "Internal Server Error")
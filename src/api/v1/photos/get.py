@@ -0,0 +1,132 @@
+from typing import Dict, List
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Attr
+import os
+from utils.boto3.dynamo import (
+    InvalidPaginationError,
+    ScrapMapDDBSchema,
+    SortKeyFormatStrings,
+    decode_cursor,
+    encode_cursor,
+    parse_query_limit,
+    query_entities,
+    read_native_numbers,
+)
+from utils.boto3.s3 import presign_photo, s3_config
+from utils.boto3.secrets import secret_provider
+from utils.boto3.sts_session import session_registry
+from utils.serializers import serialize_items
+from utils.boto3.lambda_ import make_response, service_unavailable
+from utils.circuit_breaker import CircuitOpenError
+from utils.environment import EnvironmentVariables, validate_environment
+from utils.instrumentation import instrumented
+from utils.log_policy import log_event
+from models.v1.photo import PhotoStatus
+from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
+from aws_lambda_powertools.utilities.data_classes import (
+    APIGatewayProxyEvent,
+    event_source,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel("INFO")
+
+required_env_vars = [
+    EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name,
+    EnvironmentVariables.DYNAMO_TABLE_NAME.name,
+    EnvironmentVariables.CURSOR_SIGNING_KEY_ARN.name,
+    EnvironmentVariables.PHOTO_BUCKET_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name,
+]
+
+
+@instrumented("photos.get")
+@event_source(data_class=APIGatewayProxyEvent)
+def lambda_handler(event: APIGatewayProxyEvent, context):
+    """
+    Lists the uploaded photos of a place, with presigned download URLs for each
+    original and its derivatives.
+    """
+    log_event(logger, event.raw_event)
+
+    logger.info("Validating Environment Variables")
+    env: Dict = dict(os.environ)
+    validate_environment(env, required_env_vars)
+
+    # Only reads, so numbers can come back as int/float rather than Decimal
+    dynamo: DynamoDBServiceResource = read_native_numbers(
+        session_registry.resource(
+            "dynamodb",
+            role_arn=env[EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name],
+            role_session_name="GET_PHOTOS_FOR_PLACE",
+        )
+    )
+
+    table: Table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
+
+    endpoint_url = env.get(EnvironmentVariables.S3_ENDPOINT_URL.name)
+    s3 = session_registry.client(
+        "s3",
+        role_arn=env[EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name],
+        role_session_name="DOWNLOAD_PHOTO",
+        endpoint_url=endpoint_url,
+        config=s3_config(endpoint_url),
+    )
+    bucket = env[EnvironmentVariables.PHOTO_BUCKET_NAME.name]
+
+    # API Gateway will validate that the user and place_id parameters exist
+    user: str = event.query_string_parameters["user"]
+    place_id: str = event.query_string_parameters["place_id"]
+    sort_key_prefix = SortKeyFormatStrings.PHOTOS_OF_PLACE.format(place_id=place_id)
+
+    try:
+        # Read at runtime (cached per container), never kept in the environment
+        signing_key = secret_provider.get(
+            env[EnvironmentVariables.CURSOR_SIGNING_KEY_ARN.name]
+        )
+        limit = parse_query_limit(event.get_query_string_value("limit"))
+        exclusive_start_key = decode_cursor(
+            event.get_query_string_value("cursor"),
+            signing_key,
+            pk=user,
+            sort_key_prefix=sort_key_prefix,
+        )
+
+        # A single range query over the place's photos, e.g. PHOTO#<place_id>#
+        query = query_entities(
+            table,
+            user,
+            sort_key_prefix,
+            limit=limit,
+            exclusive_start_key=exclusive_start_key,
+            FilterExpression=Attr(f"{ScrapMapDDBSchema.Entity}.status").eq(
+                PhotoStatus.UPLOADED
+            ),
+        )
+
+        photos: List[Dict] = []
+        for item in query:
+            # Signed locally, no request to S3
+            presign_photo(s3, bucket, item[ScrapMapDDBSchema.Entity])
+            photos.append(item)
+        logger.info("Query Results: %d items", query.count)
+
+        headers = {}
+        if query.last_evaluated_key is not None:
+            headers["X-Next-Cursor"] = encode_cursor(
+                query.last_evaluated_key, signing_key
+            )
+        return make_response(200, serialize_items(photos), headers)
+    except InvalidPaginationError:
+        logger.exception("Invalid Pagination Parameters")
+        return make_response(400, "Invalid Pagination Parameters")
+    except CircuitOpenError as e:
+        logger.warning("Failing fast: %s", e)
+        return service_unavailable(e)
+    except ClientError:
+        logger.exception("AWS Client Error")
+        return make_response(500, "Server Error")
+    except Exception:
+        logger.exception("An Unknown Error has Occured")
+        return make_response(500, "Server Error")
@@ -0,0 +1,119 @@
+import json
+import os
+import uuid
+from utils.boto3.dynamo import (
+    ScrapMapDDBSchema,
+    SortKeyFormatStrings,
+    create_child_record,
+    create_record,
+)
+from utils.boto3.s3 import s3_config, start_multipart_upload
+from utils.boto3.sts_session import session_registry
+from utils.environment import EnvironmentVariables, validate_environment
+from utils.instrumentation import instrumented
+from utils.log_policy import log_event
+from utils.boto3.lambda_ import make_response, service_unavailable
+from utils.circuit_breaker import CircuitOpenError
+from models.v1.photo import PHOTO_KEY_FORMAT, Photo, validate_upload
+from botocore.exceptions import ClientError
+import logging
+from aws_lambda_powertools.utilities.data_classes import (
+    APIGatewayProxyEvent,
+    event_source,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel("INFO")
+
+required_env_vars = [
+    EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name,
+    EnvironmentVariables.DYNAMO_TABLE_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name,
+]
+
+
+@instrumented("photos.post")
+@event_source(data_class=APIGatewayProxyEvent)
+def lambda_handler(event: APIGatewayProxyEvent, context):
+    """
+    Starts a multipart upload of a photo of one of the user's places, and returns
+    a presigned URL for each part.  The photo is recorded as pending until the
+    client completes the upload through POST /photos/complete.
+    """
+    log_event(logger, event.raw_event)
+
+    logger.info("Validating Environment Variables")
+    env = os.environ
+    validate_environment(env, required_env_vars)
+
+    try:
+        body = validate_upload(json.loads(event.decoded_body))
+    except (TypeError, ValueError) as e:
+        logger.info("Invalid Body: %s", e)
+        return make_response(400, f"Invalid Photo: {e}")
+
+    dynamo = session_registry.resource(
+        "dynamodb",
+        role_arn=env[EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name],
+        role_session_name="CREATE_NEW_PHOTO",
+    )
+    table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
+
+    endpoint_url = env.get(EnvironmentVariables.S3_ENDPOINT_URL.name)
+    s3 = session_registry.client(
+        "s3",
+        role_arn=env[EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name],
+        role_session_name="UPLOAD_PHOTO",
+        endpoint_url=endpoint_url,
+        config=s3_config(endpoint_url),
+    )
+    bucket = env[EnvironmentVariables.PHOTO_BUCKET_NAME.name]
+
+    try:
+        username: str = event.request_context.authorizer.claims.get("cognito:username")
+        place_id: str = body["place_id"]
+        photo_id = uuid.uuid4().hex
+        key = PHOTO_KEY_FORMAT.format(
+            user=username, place_id=place_id, photo_id=photo_id
+        )
+
+        upload = start_multipart_upload(
+            s3, bucket, key, body["content_type"], body["size"]
+        )
+        logger.info("Upload: %s in %d parts", key, len(upload["parts"]))
+
+        photo = Photo(
+            photo_id,
+            place_id,
+            key,
+            body["content_type"],
+            body["size"],
+            upload_id=upload["upload_id"],
+        )
+        item = create_record(
+            username,
+            SortKeyFormatStrings.PHOTO.format(place_id=place_id, photo_id=photo_id),
+            photo.to_item(),
+        )
+        parent_key = {
+            ScrapMapDDBSchema.PK: username,
+            ScrapMapDDBSchema.SK: SortKeyFormatStrings.PLACE.format(place_id=place_id),
+        }
+        if not create_child_record(dynamo, table, parent_key, item):
+            logger.info("Place %s does not exist", place_id)
+            s3.abort_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload["upload_id"]
+            )
+            return make_response(404, "Place Not Found")
+
+        return make_response(200, json.dumps(dict(upload, photo_id=photo_id)))
+    except CircuitOpenError as e:
+        logger.warning("Failing fast: %s", e)
+        return service_unavailable(e)
+    except ClientError:
+        logger.exception("AWS Client Error")
+        return make_response(500, "Server Error")
+    except Exception:
+        logger.exception("An Unknown Error Has Occured")
+        return make_response(500, "Internal Server Error")
@@ -1,13 +1,17 @@
 from typing import Dict
 from botocore.exceptions import ClientError
-import boto3
+import json
 import os
-from utils.boto3.dynamo import ScrapMapDDBSchema, SortKeyFormatStrings
-from utils.boto3.sts_session import create_sts_session
-from utils.boto3.lambda_ import make_response
+from utils.boto3.cascade import delete_place
+from utils.boto3.dynamo import bump_version
+from utils.boto3.s3 import s3_config
+from utils.boto3.sts_session import session_registry
+from utils.boto3.lambda_ import make_response, service_unavailable
+from utils.circuit_breaker import CircuitOpenError
 from utils.environment import EnvironmentVariables, validate_environment
+from utils.instrumentation import instrumented
+from utils.log_policy import log_event
 from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
-from mypy_boto3_sts.client import STSClient
 from aws_lambda_powertools.utilities.data_classes import (
     APIGatewayProxyEvent,
     event_source,
@@ -20,42 +24,66 @@ logger.setLevel("INFO")
 required_env_vars = [
     EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name,
     EnvironmentVariables.DYNAMO_TABLE_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name,
 ]
 
 
+@instrumented("places.delete")
 @event_source(data_class=APIGatewayProxyEvent)
 def lambda_handler(event: APIGatewayProxyEvent, context):
-    logger.info(event.raw_event)
+    log_event(logger, event.raw_event)
 
     logger.info("Validating Environment Variables")
     env: Dict = dict(os.environ)
     validate_environment(env, required_env_vars)
 
-    sts_client: STSClient = boto3.Session().client("sts")
-    dynamo: DynamoDBServiceResource = create_sts_session(
-        sts_client=sts_client,
+    dynamo: DynamoDBServiceResource = session_registry.resource(
+        "dynamodb",
         role_arn=env[EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name],
         role_session_name="DELETE_PLACE",
-    ).resource("dynamodb")
+    )
 
     table: Table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
 
+    endpoint_url = env.get(EnvironmentVariables.S3_ENDPOINT_URL.name)
+    s3 = session_registry.client(
+        "s3",
+        role_arn=env[EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name],
+        role_session_name="DELETE_PHOTOS",
+        endpoint_url=endpoint_url,
+        config=s3_config(endpoint_url),
+    )
+    bucket = env[EnvironmentVariables.PHOTO_BUCKET_NAME.name]
+
     username: str = event.request_context.authorizer.claims.get("cognito:username")
 
     # API Gateway will validate that the place_id parameter exists
     place_id: str = event.query_string_parameters["place_id"]
     try:
         logger.info("PK: %s", username)
-        response = table.delete_item(
-            Key={
-                ScrapMapDDBSchema.PK: username,
-                ScrapMapDDBSchema.SK: SortKeyFormatStrings.PLACE.format(
-                    place_id=place_id
-                ),
-            }
+        # The place's photos go with it
+        result = delete_place(
+            dynamo,
+            table,
+            s3,
+            bucket,
+            username,
+            place_id,
+            time_remaining=lambda: context.get_remaining_time_in_millis() / 1000,
         )
-        logger.info("Result: %s", response)
+        logger.info("Result: %s", result)
+        if result.deleted:
+            bump_version(table, username)
+        if not result.complete:
+            # Like a cascading destination delete, the client retries the rest
+            return make_response(
+                200, json.dumps({"deleted": result.deleted, "complete": False})
+            )
         return make_response(204, "")
+    except CircuitOpenError as e:
+        logger.warning("Failing fast: %s", e)
+        return service_unavailable(e)
     except ClientError:
         logger.exception("AWS Client Error")
         return make_response(500, "Server Error")
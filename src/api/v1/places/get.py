@@ -1,14 +1,36 @@
 from typing import Dict
 from botocore.exceptions import ClientError
-import boto3
 import os
-import json
-from utils.boto3.dynamo import ScrapMapDDBSchema, query_table, DecimalEncoder
-from utils.boto3.sts_session import create_sts_session
-from utils.boto3.lambda_ import make_response
+from utils.boto3.dynamo import (
+    Entities,
+    InvalidPaginationError,
+    SortKeyPrefixes,
+    decode_cursor,
+    encode_cursor,
+    get_version,
+    parse_query_limit,
+    parse_watermark,
+    query_changes,
+    query_entities,
+    read_native_numbers,
+    serialize_changes,
+    serialize_entities_columnar,
+)
+from utils.boto3.secrets import secret_provider
+from utils.boto3.sts_session import session_registry
+from utils.cache import collection_cache
+from utils.serializers import COLUMNAR_CONTENT_TYPE, serialize_items
+from utils.boto3.lambda_ import (
+    etag_matches,
+    make_etag,
+    make_response,
+    service_unavailable,
+)
+from utils.circuit_breaker import CircuitOpenError
 from utils.environment import EnvironmentVariables, validate_environment
+from utils.instrumentation import count, instrumented, size, span
+from utils.log_policy import log_event
 from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
-from mypy_boto3_sts.client import STSClient
 from aws_lambda_powertools.utilities.data_classes import (
     APIGatewayProxyEvent,
     event_source,
@@ -21,23 +43,27 @@ logger.setLevel("INFO")
 required_env_vars = [
     EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name,
     EnvironmentVariables.DYNAMO_TABLE_NAME.name,
+    EnvironmentVariables.CURSOR_SIGNING_KEY_ARN.name,
 ]
 
 
+@instrumented("places.get")
 @event_source(data_class=APIGatewayProxyEvent)
 def lambda_handler(event: APIGatewayProxyEvent, context):
-    logger.info("Body: %s", event.raw_event)
+    log_event(logger, event.raw_event)
 
     logger.info("Validating Environment Variables")
     env: Dict = dict(os.environ)
     validate_environment(env, required_env_vars)
 
-    sts_client: STSClient = boto3.Session().client("sts")
-    dynamo: DynamoDBServiceResource = create_sts_session(
-        sts_client=sts_client,
-        role_arn=env[EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name],
-        role_session_name="GET_PLACES_FOR_USER",
-    ).resource("dynamodb")
+    # Only reads, so numbers can come back as int/float rather than Decimal
+    dynamo: DynamoDBServiceResource = read_native_numbers(
+        session_registry.resource(
+            "dynamodb",
+            role_arn=env[EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name],
+            role_session_name="GET_PLACES_FOR_USER",
+        )
+    )
 
     table: Table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
 
@@ -45,13 +71,90 @@ def lambda_handler(event: APIGatewayProxyEvent, context):
     user: str = event.query_string_parameters["user"]
 
     try:
+        # Read at runtime (cached per container), never kept in the environment
+        signing_key = secret_provider.get(
+            env[EnvironmentVariables.CURSOR_SIGNING_KEY_ARN.name]
+        )
+        limit = parse_query_limit(event.get_query_string_value("limit"))
+        # Delta sync: only what changed at or after this watermark
+        since = parse_watermark(event.get_query_string_value("since"))
+        exclusive_start_key = decode_cursor(
+            event.get_query_string_value("cursor"),
+            signing_key,
+            pk=user,
+            sort_key_prefix=SortKeyPrefixes.PLACE,
+        )
+
         logger.info("PK: %s", user)
-        response = query_table(table, key=ScrapMapDDBSchema.PK, value=user)
-        logger.info("Query Results: %s", response)
-        serialized_results = json.dumps(
-            response["Items"] if "Items" in response else [], cls=DecimalEncoder
+        # Read the version before querying, so the ETag is never newer than the data
+        version = get_version(table, user)
+        cursor = event.get_query_string_value("cursor")
+        columnar = COLUMNAR_CONTENT_TYPE in (event.get_header_value("Accept") or "")
+        etag = make_etag(
+            user, version, Entities.PLACE, limit, cursor, since, columnar
+        )
+        # Both shape the body, so a 304 has to carry them too (RFC 9110)
+        vary = "Accept, Accept-Encoding"
+        matched = etag_matches(event.get_header_value("If-None-Match"), etag)
+        if matched:
+            logger.info("Version %d unchanged", version)
+            # The validator of the representation (coding) the client holds
+            return make_response(304, "", {"ETag": matched, "Vary": vary})
+
+        cache_key = (user, Entities.PLACE, limit, cursor, since, columnar)
+        cached = collection_cache.get(cache_key, version)
+        count("CacheMiss" if cached is None else "CacheHit")
+        if cached is None:
+            serialize = serialize_entities_columnar if columnar else serialize_items
+            if since is None:
+                query = query_entities(
+                    table,
+                    user,
+                    SortKeyPrefixes.PLACE,
+                    limit=limit,
+                    exclusive_start_key=exclusive_start_key,
+                )
+                with span("serialize"):
+                    serialized_results = serialize(query)
+            else:
+                query = query_changes(
+                    table,
+                    user,
+                    SortKeyPrefixes.PLACE,
+                    since,
+                    limit=limit,
+                    exclusive_start_key=exclusive_start_key,
+                )
+                with span("serialize"):
+                    serialized_results = serialize_changes(query, since, serialize)
+            logger.info("Query Results: %d items", query.count)
+            count("Items", query.count)
+
+            next_cursor = None
+            if query.last_evaluated_key is not None:
+                next_cursor = encode_cursor(query.last_evaluated_key, signing_key)
+            cached = (serialized_results, next_cursor)
+            collection_cache.put(cache_key, version, cached)
+
+        size("CacheBytes", collection_cache.bytes)
+        serialized_results, next_cursor = cached
+        headers = {"ETag": etag, "Vary": vary}
+        if columnar:
+            headers["Content-Type"] = COLUMNAR_CONTENT_TYPE
+        if next_cursor is not None:
+            headers["X-Next-Cursor"] = next_cursor
+        return make_response(
+            200,
+            serialized_results,
+            headers,
+            accept_encoding=event.get_header_value("Accept-Encoding"),
         )
-        return make_response(200, serialized_results)
+    except InvalidPaginationError:
+        logger.exception("Invalid Pagination Parameters")
+        return make_response(400, "Invalid Pagination Parameters")
+    except CircuitOpenError as e:
+        logger.warning("Failing fast: %s", e)
+        return service_unavailable(e)
     except ClientError:
         logger.exception("AWS Client Error")
         return make_response(500, "Server Error")
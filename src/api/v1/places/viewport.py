@@ -0,0 +1,91 @@
+from typing import Dict
+from botocore.exceptions import ClientError
+import os
+from utils import geohash
+from utils.boto3.dynamo import (
+    SortKeyPrefixes,
+    query_geohash_ranges,
+    read_native_numbers,
+)
+from utils.boto3.sts_session import session_registry
+from utils.serializers import serialize_items
+from utils.boto3.lambda_ import make_response, service_unavailable
+from utils.circuit_breaker import CircuitOpenError
+from utils.environment import EnvironmentVariables, validate_environment
+from utils.instrumentation import instrumented
+from utils.log_policy import log_event
+from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
+from aws_lambda_powertools.utilities.data_classes import (
+    APIGatewayProxyEvent,
+    event_source,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel("INFO")
+
+required_env_vars = [
+    EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name,
+    EnvironmentVariables.DYNAMO_TABLE_NAME.name,
+]
+
+
+@instrumented("places.viewport")
+@event_source(data_class=APIGatewayProxyEvent)
+def lambda_handler(event: APIGatewayProxyEvent, context):
+    log_event(logger, event.raw_event)
+
+    logger.info("Validating Environment Variables")
+    env: Dict = dict(os.environ)
+    validate_environment(env, required_env_vars)
+
+    # Only reads, so numbers can come back as int/float rather than Decimal
+    dynamo: DynamoDBServiceResource = read_native_numbers(
+        session_registry.resource(
+            "dynamodb",
+            role_arn=env[EnvironmentVariables.DYNAMO_READ_ROLE_ARN.name],
+            role_session_name="GET_PLACES_IN_VIEWPORT",
+        )
+    )
+
+    table: Table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
+
+    # API Gateway will validate that the parameters exist
+    user: str = event.query_string_parameters["user"]
+
+    try:
+        box = geohash.parse_bounding_box(
+            *(
+                event.get_query_string_value(name)
+                for name in geohash.BoundingBox._fields
+            )
+        )
+    except (TypeError, ValueError):
+        logger.exception("Invalid Viewport")
+        return make_response(400, "Invalid Viewport")
+
+    try:
+        ranges = geohash.cover(box)
+        logger.info("Viewport %s covered by %d ranges", box, len(ranges))
+
+        candidates = query_geohash_ranges(table, user, SortKeyPrefixes.PLACE, ranges)
+        # The cells overhang the viewport, drop whatever falls outside of it
+        places = [
+            item
+            for item in candidates
+            if box.contains(
+                float(item["Entity"]["latitude"]), float(item["Entity"]["longitude"])
+            )
+        ]
+        logger.info("Query Results: %d of %d candidates", len(places), len(candidates))
+
+        return make_response(200, serialize_items(places))
+    except CircuitOpenError as e:
+        logger.warning("Failing fast: %s", e)
+        return service_unavailable(e)
+    except ClientError:
+        logger.exception("AWS Client Error")
+        return make_response(500, "Server Error")
+    except Exception:
+        logger.exception("An Unknown Error has Occured")
+        return make_response(500, "Server Error")
@@ -1,3 +1,5 @@
 from models.v1.auth import Challenge, AuthenticationResult # noqa: F401
 from models.v1.destination import Destination  # noqa: F401
+from models.v1.photo import Photo, PhotoStatus  # noqa: F401
 from models.v1.place import Place  # noqa: F401
+from models.v1.validation import ValidationError, validate_batch  # noqa: F401
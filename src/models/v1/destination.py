@@ -1,14 +1,74 @@
+from decimal import Decimal
+from typing import Dict
+
 import attr
 
+from models.v1.validation import compile_validator, to_coordinate
+
+# Mirrors the destinationsModel API Gateway validates POST /destinations against
+DESTINATION_SCHEMA = {
+    "type": "object",
+    "required": [
+        "place_id",
+        "name",
+        "country",
+        "country_code",
+        "latitude",
+        "longitude",
+    ],
+    "properties": {
+        "place_id": {"type": "string", "minLength": 1},
+        "name": {"type": "string"},
+        "country": {"type": "string"},
+        "country_code": {"type": "string"},
+        "latitude": {"type": "number", "minimum": -90, "maximum": 90},
+        "longitude": {"type": "number", "minimum": -180, "maximum": 180},
+    },
+}
+
+_validate = compile_validator(DESTINATION_SCHEMA)
+_validate_many = compile_validator({"type": "array", "items": DESTINATION_SCHEMA})
+
 
-@attr.s(auto_attribs=True, frozen=True)
+@attr.s(auto_attribs=True, frozen=True, slots=True)
 class Destination(object):
     place_id: str = attr.ib()
     name: str = attr.ib()
     country: str = attr.ib()
     country_code: str = attr.ib()
-    latitude: float = attr.ib()
-    longitude: float = attr.ib()
+    latitude: Decimal = attr.ib(converter=to_coordinate)
+    longitude: Decimal = attr.ib(converter=to_coordinate)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Destination":
+        """
+        Raises `ValidationError` if `data` does not match `DESTINATION_SCHEMA`.
+        """
+        _validate(data)
+        return cls.from_valid(data)
+
+    @classmethod
+    def from_valid(cls, data: Dict) -> "Destination":
+        # Unknown keys are dropped rather than stored
+        return cls(
+            data["place_id"],
+            data["name"],
+            data["country"],
+            data["country_code"],
+            data["latitude"],
+            data["longitude"],
+        )
+
+    @staticmethod
+    def validate_many(entries) -> None:
+        _validate_many(entries)
 
-    def asdict(self):
-        return attr.asdict(self)
+    def to_item(self) -> Dict:
+        return {
+            "place_id": self.place_id,
+            "name": self.name,
+            "country": self.country,
+            "country_code": self.country_code,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+        }
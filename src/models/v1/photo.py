@@ -0,0 +1,113 @@
+from typing import Dict, Optional, Tuple
+
+import attr
+
+from models.v1.validation import compile_validator
+
+MAX_PHOTO_BYTES = 50 * 1024 * 1024
+# Only formats Pillow decodes out of the box, so every upload gets derivatives
+CONTENT_TYPES = ["image/jpeg", "image/png", "image/webp"]
+
+# Photos are stored per user and place, so a key alone says who owns it
+PHOTO_KEY_PREFIX = "photos/"
+PHOTO_KEY_FORMAT = PHOTO_KEY_PREFIX + "{user}/{place_id}/{photo_id}"
+# Outside PHOTO_KEY_PREFIX, so writing derivatives does not trigger more work
+DERIVATIVE_KEY_PREFIX = "derivatives/"
+DERIVATIVES_OF_PHOTO_FORMAT = DERIVATIVE_KEY_PREFIX + "{user}/{place_id}/{photo_id}/"
+DERIVATIVE_KEY_FORMAT = DERIVATIVES_OF_PHOTO_FORMAT + "v{version}/{name}.{extension}"
+# Every object of the photos of a place
+PLACE_OBJECT_PREFIX_FORMATS = (
+    PHOTO_KEY_PREFIX + "{user}/{place_id}/",
+    DERIVATIVE_KEY_PREFIX + "{user}/{place_id}/",
+)
+
+
+class PhotoStatus:
+    # Upload started, parts not yet reported back
+    PENDING = "PENDING"
+    UPLOADED = "UPLOADED"
+
+
+# Ids end up in sort keys, which are split on "#", and in object keys, which are
+# split on "/" (and deleted by prefix along with their place)
+ID_PATTERN = "^[^#/]+$"
+
+
+# Body of POST /photos, which starts an upload
+PHOTO_UPLOAD_SCHEMA = {
+    "type": "object",
+    "required": ["place_id", "content_type", "size"],
+    "properties": {
+        "place_id": {"type": "string", "minLength": 1, "pattern": ID_PATTERN},
+        "content_type": {"enum": CONTENT_TYPES},
+        "size": {"type": "integer", "minimum": 1, "maximum": MAX_PHOTO_BYTES},
+    },
+}
+
+# Body of POST /photos/complete, with the ETags S3 returned for each part
+PHOTO_COMPLETE_SCHEMA = {
+    "type": "object",
+    "required": ["place_id", "photo_id", "upload_id", "parts"],
+    "properties": {
+        "place_id": {"type": "string", "minLength": 1, "pattern": ID_PATTERN},
+        "photo_id": {"type": "string", "minLength": 1, "pattern": ID_PATTERN},
+        "upload_id": {"type": "string", "minLength": 1},
+        "parts": {
+            "type": "array",
+            "minItems": 1,
+            "maxItems": 10000,
+            "items": {
+                "type": "object",
+                "required": ["part_number", "etag"],
+                "properties": {
+                    "part_number": {"type": "integer", "minimum": 1, "maximum": 10000},
+                    "etag": {"type": "string", "minLength": 1},
+                },
+            },
+        },
+    },
+}
+
+
+def parse_photo_key(key: str) -> Optional[Tuple[str, str, str]]:
+    """
+    The (user, place_id, photo_id) an original's object key was built from.
+    """
+    if not key.startswith(PHOTO_KEY_PREFIX):
+        return None
+    parts = key[len(PHOTO_KEY_PREFIX) :].split("/")
+    if len(parts) != 3 or not all(parts):
+        return None
+    user, place_id, photo_id = parts
+    return user, place_id, photo_id
+
+
+validate_upload = compile_validator(PHOTO_UPLOAD_SCHEMA)
+validate_complete = compile_validator(PHOTO_COMPLETE_SCHEMA)
+
+
+@attr.s(auto_attribs=True, frozen=True, slots=True)
+class Photo(object):
+    photo_id: str = attr.ib()
+    # Place_Id is the place_id of the Place the photo belongs to
+    place_id: str = attr.ib()
+    # Object key in the photo bucket
+    key: str = attr.ib()
+    content_type: str = attr.ib()
+    size: int = attr.ib()
+    status: str = attr.ib(default=PhotoStatus.PENDING)
+    # Only set while the multipart upload is in progress
+    upload_id: Optional[str] = attr.ib(default=None)
+
+    def to_item(self) -> Dict:
+        item = {
+            "photo_id": self.photo_id,
+            "place_id": self.place_id,
+            "key": self.key,
+            "content_type": self.content_type,
+            "size": self.size,
+            "status": self.status,
+        }
+        if self.upload_id is not None:
+            item["upload_id"] = self.upload_id
+        return item
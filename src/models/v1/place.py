@@ -1,7 +1,44 @@
+from decimal import Decimal
+from typing import Dict
+
 import attr
 
+from models.v1.validation import compile_validator, to_coordinate
+
+# Mirrors the placesModel API Gateway validates POST /places against
+PLACE_SCHEMA = {
+    "type": "object",
+    "required": [
+        "place_id",
+        "name",
+        "address",
+        "city",
+        "state",
+        "country",
+        "zip_code",
+        "latitude",
+        "longitude",
+        "destination_id",
+    ],
+    "properties": {
+        "place_id": {"type": "string", "minLength": 1},
+        "name": {"type": "string"},
+        "address": {"type": "string"},
+        "city": {"type": "string"},
+        "state": {"type": "string"},
+        "country": {"type": "string"},
+        "zip_code": {"type": "string"},
+        "latitude": {"type": "number", "minimum": -90, "maximum": 90},
+        "longitude": {"type": "number", "minimum": -180, "maximum": 180},
+        "destination_id": {"type": "string", "minLength": 1},
+    },
+}
+
+_validate = compile_validator(PLACE_SCHEMA)
+_validate_many = compile_validator({"type": "array", "items": PLACE_SCHEMA})
+
 
-@attr.s(auto_attribs=True, frozen=True)
+@attr.s(auto_attribs=True, frozen=True, slots=True)
 class Place(object):
     place_id: str = attr.ib()
     name: str = attr.ib()
@@ -10,10 +47,49 @@ class Place(object):
     state: str
     country: str
     zip_code: str
-    latitude: str
-    longitude: str
+    latitude: Decimal = attr.ib(converter=to_coordinate)
+    longitude: Decimal = attr.ib(converter=to_coordinate)
     # Destination_Id is the place_id of the Destination
-    destination_id: str
+    destination_id: str = attr.ib()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Place":
+        """
+        Raises `ValidationError` if `data` does not match `PLACE_SCHEMA`.
+        """
+        _validate(data)
+        return cls.from_valid(data)
+
+    @classmethod
+    def from_valid(cls, data: Dict) -> "Place":
+        # Unknown keys are dropped rather than stored
+        return cls(
+            data["place_id"],
+            data["name"],
+            data["address"],
+            data["city"],
+            data["state"],
+            data["country"],
+            data["zip_code"],
+            data["latitude"],
+            data["longitude"],
+            data["destination_id"],
+        )
+
+    @staticmethod
+    def validate_many(entries) -> None:
+        _validate_many(entries)
 
-    def asdict(self):
-        return attr.asdict(self)
+    def to_item(self) -> Dict:
+        return {
+            "place_id": self.place_id,
+            "name": self.name,
+            "address": self.address,
+            "city": self.city,
+            "state": self.state,
+            "country": self.country,
+            "zip_code": self.zip_code,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "destination_id": self.destination_id,
+        }
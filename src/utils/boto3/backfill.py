@@ -0,0 +1,165 @@
+"""
+One-off backfill of the index attributes that items written before GeoIndex and
+ChangesIndex existed are missing.
+
+Both indexes are sparse: places and destinations without `GeoSK` are invisible
+to `/places/viewport` and `/clusters`, and items without `UpdatedAt`/`ChangeSK`
+never show up in delta syncs.  Run this once against each table after deploying
+the indexes, with credentials that can scan and update it:
+
+    cd src && python -m utils.boto3.backfill --table-name <table> [--dry-run]
+
+It only adds attributes that are missing, under a condition that they are still
+missing, so it is safe to re-run and to run while the API is serving writes.
+The version of every user it touches is bumped, so cached responses are dropped.
+"""
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Set
+
+import boto3
+from botocore.exceptions import ClientError
+from mypy_boto3_dynamodb.service_resource import Table
+
+from utils.boto3.dynamo import (
+    ScrapMapDDBSchema,
+    SortKeyPrefixes,
+    bump_version,
+    change_sort_key,
+    geo_sort_key,
+    next_timestamp,
+)
+
+BACKFILLED_PREFIXES = (
+    SortKeyPrefixes.DESTINATION,
+    SortKeyPrefixes.PLACE,
+    SortKeyPrefixes.PHOTO,
+)
+
+
+@dataclass
+class BackfillResult:
+    scanned: int = 0
+    updated: int = 0
+    # Rewritten by a concurrent write between the scan and the update
+    skipped: int = 0
+    users: Set[str] = field(default_factory=set)
+
+
+def missing_index_keys(item: Dict) -> Dict:
+    """
+    The index attributes `item` should have but does not, with their values.
+    """
+    sk = item[ScrapMapDDBSchema.SK]
+    if not sk.startswith(BACKFILLED_PREFIXES):
+        return {}
+
+    missing = {}
+    entity = item.get(ScrapMapDDBSchema.Entity)
+    if ScrapMapDDBSchema.GeoSK not in item and entity is not None:
+        geo_sk = geo_sort_key(sk, entity)
+        if geo_sk is not None:
+            missing[ScrapMapDDBSchema.GeoSK] = geo_sk
+    if ScrapMapDDBSchema.UpdatedAt not in item:
+        updated_at = next_timestamp()
+        missing[ScrapMapDDBSchema.UpdatedAt] = updated_at
+        missing[ScrapMapDDBSchema.ChangeSK] = change_sort_key(sk, updated_at)
+    return missing
+
+
+def _scan(table: Table) -> Iterator[Dict]:
+    kwargs = dict(
+        # Just enough of each item to work out what it is missing
+        ProjectionExpression=(
+            "#pk, #sk, #geo_sk, #updated_at, #entity.#latitude, #entity.#longitude"
+        ),
+        ExpressionAttributeNames={
+            "#pk": ScrapMapDDBSchema.PK,
+            "#sk": ScrapMapDDBSchema.SK,
+            "#geo_sk": ScrapMapDDBSchema.GeoSK,
+            "#updated_at": ScrapMapDDBSchema.UpdatedAt,
+            "#entity": ScrapMapDDBSchema.Entity,
+            "#latitude": "latitude",
+            "#longitude": "longitude",
+        },
+    )
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get("Items", [])
+        start_key = response.get("LastEvaluatedKey")
+        if start_key is None:
+            return
+        kwargs["ExclusiveStartKey"] = start_key
+
+
+def _set_missing(table: Table, item: Dict, missing: Dict) -> bool:
+    names = {"#sk": ScrapMapDDBSchema.SK}
+    values = {}
+    assignments = []
+    # The item must still exist, and not have gained the attributes meanwhile
+    conditions = ["attribute_exists(#sk)"]
+    for index, (name, value) in enumerate(missing.items()):
+        names[f"#a{index}"] = name
+        values[f":a{index}"] = value
+        assignments.append(f"#a{index} = :a{index}")
+        conditions.append(f"attribute_not_exists(#a{index})")
+
+    try:
+        table.update_item(
+            Key={
+                ScrapMapDDBSchema.PK: item[ScrapMapDDBSchema.PK],
+                ScrapMapDDBSchema.SK: item[ScrapMapDDBSchema.SK],
+            },
+            UpdateExpression="SET " + ", ".join(assignments),
+            ConditionExpression=" AND ".join(conditions),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def backfill_index_keys(table: Table, dry_run: bool = False) -> BackfillResult:
+    result = BackfillResult()
+    for item in _scan(table):
+        result.scanned += 1
+        missing = missing_index_keys(item)
+        if not missing:
+            continue
+
+        if dry_run or _set_missing(table, item, missing):
+            result.updated += 1
+            result.users.add(item[ScrapMapDDBSchema.PK])
+        else:
+            result.skipped += 1
+
+    if not dry_run:
+        for user in sorted(result.users):
+            bump_version(table, user)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--table-name", required=True)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only count the items to update"
+    )
+    args = parser.parse_args()
+
+    table = boto3.resource("dynamodb").Table(args.table_name)
+    result = backfill_index_keys(table, dry_run=args.dry_run)
+    action = "would update" if args.dry_run else "updated"
+    print(
+        f"Scanned {result.scanned} items, {action} {result.updated} of "
+        f"{len(result.users)} users, skipped {result.skipped} written meanwhile"
+    )
+
+
+if __name__ == "__main__":
+    main()
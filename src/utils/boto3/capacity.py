@@ -0,0 +1,102 @@
+"""
+Accounting of the DynamoDB capacity each invocation consumes.
+
+Every DynamoDB call made through a registry client asks for
+`ReturnConsumedCapacity=INDEXES`, and the units DynamoDB reports back are added
+to the invocation's metrics (see `utils.instrumentation`): read and write units
+in total and per table or index, e.g. `ConsumedRCU`, `ConsumedRCU.GeoIndex`.
+The invocation's `User` property attributes them to a user.
+
+With `CAPACITY_HEADER_ENABLED=true` the totals are also returned in an
+`X-Consumed-Capacity` response header, for debugging.
+"""
+from typing import Dict, Iterable
+
+from utils.environment import EnvironmentVariables, env_flag
+from utils.instrumentation import Invocation, add_response_hook, count, enabled
+
+CAPACITY_HEADER = "X-Consumed-Capacity"
+READ_UNITS = "ConsumedRCU"
+WRITE_UNITS = "ConsumedWCU"
+
+# Only reported as `CapacityUnits` for these; everything else is a write
+READ_OPERATIONS = frozenset(
+    {
+        "BatchGetItem",
+        "ExecuteStatement",
+        "GetItem",
+        "Query",
+        "Scan",
+        "TransactGetItems",
+    }
+)
+
+
+def _request_capacity(params: Dict, model, **kwargs):
+    if "ReturnConsumedCapacity" in model.input_shape.members:
+        params.setdefault("ReturnConsumedCapacity", "INDEXES")
+
+
+def _add(name: str, capacity: Dict, is_read: bool):
+    read = capacity.get("ReadCapacityUnits")
+    write = capacity.get("WriteCapacityUnits")
+    if read is None and write is None:
+        units = capacity.get("CapacityUnits", 0)
+        read, write = (units, 0) if is_read else (0, units)
+    if read:
+        count(f"{READ_UNITS}{name}", read)
+    if write:
+        count(f"{WRITE_UNITS}{name}", write)
+
+
+def _consumed(parsed: Dict) -> Iterable[Dict]:
+    consumed = parsed.get("ConsumedCapacity")
+    if consumed is None:
+        return ()
+    # Batch and transaction calls report one entry per table
+    return consumed if isinstance(consumed, list) else (consumed,)
+
+
+def _record_capacity(parsed: Dict, model, **kwargs):
+    is_read = model.name in READ_OPERATIONS
+    for consumed in _consumed(parsed):
+        _add("", consumed, is_read)
+        for kind in ("GlobalSecondaryIndexes", "LocalSecondaryIndexes"):
+            for index, capacity in consumed.get(kind, {}).items():
+                _add(f".{index}", capacity, is_read)
+
+
+def instrument_capacity(events):
+    """
+    Accounts for the capacity consumed by calls made through a DynamoDB client
+    with the given event emitter (`client.meta.events`).
+    """
+    if not enabled():
+        return
+    # Not provide-client-params: the resource layer replaces the params there
+    # with a copy, which would drop anything added to the original
+    events.register(
+        "before-parameter-build.dynamodb",
+        _request_capacity,
+        unique_id="capacity-request",
+    )
+    events.register(
+        "after-call.dynamodb", _record_capacity, unique_id="capacity-record"
+    )
+
+
+def _format(units: float) -> str:
+    return f"{units:g}"
+
+
+def _add_capacity_header(invocation: Invocation, response: Dict):
+    read = invocation.metrics.get(READ_UNITS, 0)
+    write = invocation.metrics.get(WRITE_UNITS, 0)
+    response["headers"] = dict(
+        response.get("headers") or {},
+        **{CAPACITY_HEADER: f"read={_format(read)}, write={_format(write)}"},
+    )
+
+
+if env_flag(EnvironmentVariables.CAPACITY_HEADER_ENABLED.name):
+    add_response_hook(_add_capacity_header)
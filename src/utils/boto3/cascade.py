@@ -0,0 +1,110 @@
+"""
+Deleting places together with their photos.
+
+A place's PHOTO items are tombstoned along with the place, and the objects of
+its photos (originals and derivatives) are removed from the bucket.  Objects go
+first: if the delete stops or fails before the items are tombstoned, the place
+is still there for the retry to find, while the reverse order would leave
+objects that nothing points to any more.
+"""
+import itertools
+from typing import Callable, Dict, Iterator, Optional
+
+from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
+
+from models.v1.photo import PLACE_OBJECT_PREFIX_FORMATS
+from utils.boto3.dynamo import (
+    CascadeDeleteResult,
+    ScrapMapDDBSchema,
+    SortKeyFormatStrings,
+    delete_record,
+    delete_with_children,
+    query_entities,
+)
+from utils.boto3.s3 import delete_prefix
+
+# Only the keys are needed to tombstone an item
+KEYS_ONLY = f"{ScrapMapDDBSchema.PK}, {ScrapMapDDBSchema.SK}"
+
+
+def delete_place_objects(s3, bucket: str, user: str, place_id: str) -> int:
+    if "/" in place_id:
+        # Never given photos (see `ID_PATTERN`), and its prefix would reach into
+        # another place's objects
+        return 0
+    return sum(
+        delete_prefix(s3, bucket, prefix.format(user=user, place_id=place_id))
+        for prefix in PLACE_OBJECT_PREFIX_FORMATS
+    )
+
+
+def place_photo_keys(
+    table: Table, s3, bucket: str, user: str, place_id: str
+) -> Iterator[Dict]:
+    """
+    Keys of a place's live PHOTO items, yielded once the place's objects have
+    been deleted.  A place that never had a photo costs a single query.
+    """
+    prefix = SortKeyFormatStrings.PHOTOS_OF_PLACE.format(place_id=place_id)
+    # Tombstones count: a retried delete may have tombstoned the photos already
+    ever_had_photos = next(
+        iter(
+            query_entities(
+                table,
+                user,
+                prefix,
+                include_deleted=True,
+                limit=1,
+                ProjectionExpression=KEYS_ONLY,
+            )
+        ),
+        None,
+    )
+    if ever_had_photos is None:
+        return
+
+    delete_place_objects(s3, bucket, user, place_id)
+    yield from query_entities(table, user, prefix, ProjectionExpression=KEYS_ONLY)
+
+
+def delete_place(
+    dynamo: DynamoDBServiceResource,
+    table: Table,
+    s3,
+    bucket: str,
+    user: str,
+    place_id: str,
+    time_remaining: Optional[Callable[[], float]] = None,
+) -> CascadeDeleteResult:
+    """
+    Deletes a place, its PHOTO items and its objects.  See `delete_with_children`
+    for `time_remaining` and the result.
+    """
+    sk = SortKeyFormatStrings.PLACE.format(place_id=place_id)
+    photo_keys = place_photo_keys(table, s3, bucket, user, place_id)
+    first = next(photo_keys, None)
+    if first is None:
+        # Only tombstones a place that exists
+        return CascadeDeleteResult(deleted=int(delete_record(table, user, sk)))
+
+    return delete_with_children(
+        dynamo,
+        table,
+        {ScrapMapDDBSchema.PK: user, ScrapMapDDBSchema.SK: sk},
+        itertools.chain([first], photo_keys),
+        time_remaining=time_remaining,
+    )
+
+
+def places_with_photo_keys(
+    table: Table, s3, bucket: str, user: str, place_keys: Iterator[Dict]
+) -> Iterator[Dict]:
+    """
+    The keys of each place in `place_keys` preceded by those of its photos, for
+    cascading deletes of whole destinations.  Each place's objects are deleted
+    as the iteration reaches it.
+    """
+    for place_key in place_keys:
+        place_id = place_key[ScrapMapDDBSchema.SK].partition("#")[2]
+        yield from place_photo_keys(table, s3, bucket, user, place_id)
+        yield place_key
@@ -1,7 +1,10 @@
 import hmac
 import hashlib as hl
 import base64
-from typing import Dict
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from botocore.exceptions import ClientError
 from mypy_boto3_cognito_idp.client import CognitoIdentityProviderClient
 from utils.environment import EnvironmentVariables
 
@@ -29,6 +32,74 @@ def _calculate_secret_hash(username: str, client_id: str, client_secret: str) ->
     return d2
 
 
+class ClientSecretProvider:
+    """
+    In-memory TTL cache for Cognito app client secrets.
+
+    The secret is needed for the SECRET_HASH of nearly every auth call, but it
+    only changes when the app client is rotated, so there is no reason to spend
+    a `DescribeUserPoolClient` (control-plane quota) on each request.  Loads are
+    single-flight per client: concurrent cold requests wait on the first caller
+    instead of all describing the client at once.
+    """
+
+    DEFAULT_TTL_SECONDS = 15 * 60
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._secrets: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _get_cached(self, key: Tuple[str, str]) -> Optional[str]:
+        entry = self._secrets.get(key)
+        if entry is None:
+            return None
+        secret, expires_at = entry
+        if self._clock() >= expires_at:
+            return None
+        return secret
+
+    def _get_load_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    def get(
+        self,
+        cognito: CognitoIdentityProviderClient,
+        user_pool_id: str,
+        client_id: str,
+    ) -> str:
+        key = (user_pool_id, client_id)
+        secret = self._get_cached(key)
+        if secret is not None:
+            return secret
+
+        with self._get_load_lock(key):
+            # Another request may have loaded the secret while we were waiting
+            secret = self._get_cached(key)
+            if secret is not None:
+                return secret
+
+            response = cognito.describe_user_pool_client(
+                UserPoolId=user_pool_id, ClientId=client_id
+            )
+            secret = response["UserPoolClient"]["ClientSecret"]
+            self._secrets[key] = (secret, self._clock() + self._ttl_seconds)
+            return secret
+
+    def invalidate(self, user_pool_id: str, client_id: str):
+        self._secrets.pop((user_pool_id, client_id), None)
+
+
+client_secret_provider = ClientSecretProvider()
+
+
 def get_secret_hash(
     cognito: CognitoIdentityProviderClient, env: Dict, username: str, client_id: str
 ) -> str:
@@ -40,9 +111,18 @@ def get_client_secret(
     cognito: CognitoIdentityProviderClient, env: Dict, client_id: str
 ) -> str:
     user_pool_id = env[EnvironmentVariables.USER_POOL_ID.name]
+    return client_secret_provider.get(cognito, user_pool_id, client_id)
+
 
-    response = cognito.describe_user_pool_client(
-        UserPoolId=user_pool_id, ClientId=client_id
-    )
+def invalidate_secret_on_hash_error(error: Exception, env: Dict, client_id: str):
+    """
+    Drops the cached client secret if Cognito rejected the SECRET_HASH, e.g. after
+    the app client secret was rotated, so the next request loads the new one.
+    """
+    if not isinstance(error, ClientError):
+        return
 
-    return response["UserPoolClient"]["ClientSecret"]
+    message = error.response.get("Error", {}).get("Message", "")
+    if "secret hash" in message.lower():
+        user_pool_id = env[EnvironmentVariables.USER_POOL_ID.name]
+        client_secret_provider.invalidate(user_pool_id, client_id)
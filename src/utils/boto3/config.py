@@ -0,0 +1,126 @@
+"""
+Client configuration shared by every AWS client the handlers create.
+
+botocore's defaults (legacy retries, 60 second connect and read timeouts) let a
+single slow call hold a 30 second Lambda until it times out.  Instead, each
+service gets the timeouts of its class of operations, small enough that every
+retry fits in the function's timeout, and adaptive retries, which also rate
+limit the client while the service is throttling it.
+
+Clients built by the session registry are additionally guarded by the
+service's circuit breaker (see `utils.circuit_breaker`).
+"""
+from typing import Dict, NamedTuple, Tuple
+
+from botocore.config import Config
+
+from utils.circuit_breaker import breaker_for
+
+
+class OperationClass(NamedTuple):
+    connect_timeout: float
+    read_timeout: float
+    # Including the first attempt
+    max_attempts: int
+
+
+# DynamoDB item and query calls, STS, Secrets Manager: normally single-digit
+# milliseconds
+INTERACTIVE = OperationClass(connect_timeout=1, read_timeout=3, max_attempts=3)
+# Cognito auth flows run triggers and SRP server side
+AUTH = OperationClass(connect_timeout=2, read_timeout=5, max_attempts=3)
+# S3 object reads and writes of a few MB, and completing multipart uploads
+STORAGE = OperationClass(connect_timeout=2, read_timeout=10, max_attempts=2)
+
+SERVICE_CLASSES: Dict[str, OperationClass] = {
+    "dynamodb": INTERACTIVE,
+    "sts": INTERACTIVE,
+    "secretsmanager": INTERACTIVE,
+    "cognito-idp": AUTH,
+    "s3": STORAGE,
+}
+
+# A container serves one request at a time, and its widest fan-out is the 8
+# concurrent GeoIndex queries of the viewport handlers
+MAX_POOL_CONNECTIONS = 10
+
+# Failed calls (after retries) that open a service's circuit breaker
+FAILURE_STATUS = 500
+FAILURE_CODES = frozenset(
+    {
+        "InternalServerError",
+        "ProvisionedThroughputExceededException",
+        "RequestLimitExceeded",
+        "ServiceUnavailable",
+        "SlowDown",
+        "ThrottlingException",
+        "TooManyRequestsException",
+    }
+)
+
+_configs: Dict[Tuple, Config] = {}
+
+
+def client_config(service_name: str, **overrides) -> Config:
+    """
+    The config for clients of `service_name`, with any `Config` options in
+    `overrides` applied on top.  The same instance is returned for the same
+    arguments, so the session registry can cache the client.
+    """
+    key = (service_name,) + tuple(sorted(overrides.items()))
+    config = _configs.get(key)
+    if config is None:
+        operation_class = SERVICE_CLASSES.get(service_name, INTERACTIVE)
+        options = dict(
+            connect_timeout=operation_class.connect_timeout,
+            read_timeout=operation_class.read_timeout,
+            retries={
+                "mode": "adaptive",
+                "total_max_attempts": operation_class.max_attempts,
+            },
+            max_pool_connections=MAX_POOL_CONNECTIONS,
+        )
+        # Keeps pooled connections of a warm container from being dropped by
+        # idle timeouts between invocations (botocore >= 1.27)
+        if "tcp_keepalive" in Config.OPTION_DEFAULTS:
+            options["tcp_keepalive"] = True
+        options.update(overrides)
+        config = Config(**options)
+        _configs[key] = config
+    return config
+
+
+def _is_failure(parsed: Dict, http_response) -> bool:
+    if http_response is not None and http_response.status_code >= FAILURE_STATUS:
+        return True
+    return parsed.get("Error", {}).get("Code") in FAILURE_CODES
+
+
+def guard_events(events, service_name: str):
+    """
+    Puts calls made through a client with the given event emitter
+    (`client.meta.events`) behind the circuit breaker of `service_name`.
+    Register before other call hooks, so they do not see calls that were
+    refused.
+    """
+    breaker = breaker_for(service_name)
+
+    def before_call(**kwargs):
+        breaker.before_call()
+
+    def after_call(parsed, http_response=None, **kwargs):
+        if _is_failure(parsed, http_response):
+            breaker.record_failure()
+        else:
+            # Client errors such as a failed condition mean the service is fine
+            breaker.record_success()
+
+    def after_call_error(**kwargs):
+        # Timeouts and connection errors that outlasted the retries
+        breaker.record_failure()
+
+    events.register("before-call", before_call, unique_id="breaker-before")
+    events.register("after-call", after_call, unique_id="breaker-after")
+    events.register(
+        "after-call-error", after_call_error, unique_id="breaker-after-error"
+    )
@@ -1,36 +1,308 @@
-from typing import Dict
-from boto3.dynamodb.conditions import Key
-from mypy_boto3_dynamodb.service_resource import Table
+import base64
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.transform import TransformationInjector
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
 from decimal import Decimal
 from json import JSONEncoder
+from utils import geohash
+from utils.serializers import native_number, serialize_columnar, serialize_items
+
+MAX_QUERY_LIMIT = 1000
+MAX_BATCH_WRITE_ITEMS = 25
+MAX_BATCH_CREATE_ENTRIES = 1000
+MAX_TRANSACTION_ITEMS = 25
+# How long deletes are remembered for delta syncs; a client that last synced
+# before that has to re-download everything
+TOMBSTONE_TTL_SECONDS = 30 * 24 * 60 * 60
+# Watermarks trail the query by this much, so a write that was stamped just
+# before the query but had not landed yet is picked up by the next sync
+WATERMARK_SAFETY_WINDOW_MS = 5 * 1000
 
 
 class ScrapMapDDBSchema:
     PK = "PK"
     SK = "SK"
     Entity = "Entity"
+    Version = "Version"
+    # ENTITY#<geohash>, the sort key of GeoIndex
+    GeoSK = "GeoSK"
+    # Milliseconds since the epoch of the item's last write
+    UpdatedAt = "UpdatedAt"
+    # ENTITY#<UpdatedAt, zero padded>, the sort key of ChangesIndex
+    ChangeSK = "ChangeSK"
+    # Set on tombstones, which replace deleted items until ExpiresAt
+    Deleted = "Deleted"
+    ExpiresAt = "ExpiresAt"
+
+
+class Indexes:
+    GEO = "GeoIndex"
+    CHANGES = "ChangesIndex"
 
 
 class Entities:
     DESTINATION = "DESTINATION"
     PLACE = "PLACE"
     PHOTO = "PHOTO"
+    VERSION = "VERSION"
+
+
+class SortKeyPrefixes:
+    DESTINATION = Entities.DESTINATION + "#"
+    PLACE = Entities.PLACE + "#"
+    PHOTO = Entities.PHOTO + "#"
 
 
 class SortKeyFormatStrings:
-    DESTINATION = Entities.DESTINATION + "#{place_id}"
-    PLACE = Entities.PLACE + "#{place_id}"
-    PHOTO = Entities.PHOTO + "#{photo}"
+    DESTINATION = SortKeyPrefixes.DESTINATION + "{place_id}"
+    PLACE = SortKeyPrefixes.PLACE + "{place_id}"
+    # Photos sort under their place, so one range query lists a place's photos
+    PHOTO = SortKeyPrefixes.PHOTO + "{place_id}#{photo_id}"
+    PHOTOS_OF_PLACE = SortKeyPrefixes.PHOTO + "{place_id}#"
+    # A single per-user counter, bumped by every write to the user's map
+    VERSION = Entities.VERSION
+
+
+def geo_sort_key(sk: str, entity) -> Optional[str]:
+    """
+    GeoIndex sort key for an entity with coordinates, e.g. `PLACE#9q8yyk8yt`.
+    """
+    try:
+        lat = float(entity["latitude"])
+        lng = float(entity["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    entity_type = sk.partition("#")[0]
+    return f"{entity_type}#{geohash.encode(lat, lng)}"
+
+
+_timestamp_lock = threading.Lock()
+_last_timestamp = 0
+
+
+def next_timestamp() -> int:
+    """
+    Milliseconds since the epoch, strictly increasing within the process so
+    writes made in the same millisecond still get distinct, ordered stamps.
+    """
+    global _last_timestamp
+    with _timestamp_lock:
+        _last_timestamp = max(int(time.time() * 1000), _last_timestamp + 1)
+        return _last_timestamp
+
+
+def change_sort_key(sk: str, updated_at: int) -> str:
+    return f"{sk.partition('#')[0]}#{updated_at:015d}"
+
+
+def _stamp(record: Dict) -> Dict:
+    updated_at = next_timestamp()
+    record[ScrapMapDDBSchema.UpdatedAt] = updated_at
+    record[ScrapMapDDBSchema.ChangeSK] = change_sort_key(
+        record[ScrapMapDDBSchema.SK], updated_at
+    )
+    return record
 
 
 def create_record(pk: str, sk: str, entity) -> Dict:
+    record = _stamp(
+        {
+            ScrapMapDDBSchema.PK: pk,
+            ScrapMapDDBSchema.SK: sk,
+            ScrapMapDDBSchema.Entity: entity,
+        }
+    )
+
+    geo_sk = geo_sort_key(sk, entity)
+    if geo_sk is not None:
+        record[ScrapMapDDBSchema.GeoSK] = geo_sk
+    return record
+
+
+def create_tombstone(pk: str, sk: str) -> Dict:
+    """
+    Replaces a deleted item so delta syncs can report the delete.  DynamoDB's
+    TTL removes it once no client can still be relying on it.
+    """
+    return _stamp(
+        {
+            ScrapMapDDBSchema.PK: pk,
+            ScrapMapDDBSchema.SK: sk,
+            ScrapMapDDBSchema.Deleted: True,
+            ScrapMapDDBSchema.ExpiresAt: int(time.time()) + TOMBSTONE_TTL_SECONDS,
+        }
+    )
+
+
+def delete_record(table: Table, pk: str, sk: str) -> bool:
+    """
+    Replaces an item with a tombstone.  Returns False if there was no live item
+    to delete.
+    """
+    try:
+        table.put_item(
+            Item=create_tombstone(pk, sk),
+            ConditionExpression=Attr(ScrapMapDDBSchema.Entity).exists(),
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def create_child_record(
+    dynamo: DynamoDBServiceResource, table: Table, parent_key: Dict, item: Dict
+) -> bool:
+    """
+    Writes `item` only if there is a live item at `parent_key`, checked in the
+    same transaction.  Returns False if the parent is missing or deleted.
+    """
+    try:
+        dynamo.meta.client.transact_write_items(
+            TransactItems=[
+                {
+                    "ConditionCheck": {
+                        "TableName": table.name,
+                        "Key": parent_key,
+                        # Condition builders are only expanded for top-level
+                        # parameters, not inside transaction items
+                        "ConditionExpression": "attribute_exists(#entity)",
+                        "ExpressionAttributeNames": {
+                            "#entity": ScrapMapDDBSchema.Entity
+                        },
+                    }
+                },
+                {"Put": {"TableName": table.name, "Item": item}},
+            ]
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "TransactionCanceledException":
+            reasons = e.response.get("CancellationReasons") or [{}]
+            if reasons[0].get("Code") == "ConditionalCheckFailed":
+                return False
+        raise
+    return True
+
+
+def update_entity(
+    table: Table,
+    pk: str,
+    sk: str,
+    fields: Dict,
+    remove: Sequence[str] = (),
+    expected: Optional[Dict] = None,
+) -> bool:
+    """
+    Sets `fields` and removes `remove` on a live item's entity, and restamps the
+    item for delta syncs.  The entity's attributes must equal `expected`, if
+    given.  Returns False if there is no such item.
+    """
+    updated_at = next_timestamp()
+    names = {
+        "#entity": ScrapMapDDBSchema.Entity,
+        "#updated_at": ScrapMapDDBSchema.UpdatedAt,
+        "#change_sk": ScrapMapDDBSchema.ChangeSK,
+    }
+    values = {
+        ":updated_at": updated_at,
+        ":change_sk": change_sort_key(sk, updated_at),
+    }
+    assignments = ["#updated_at = :updated_at", "#change_sk = :change_sk"]
+    for index, (name, value) in enumerate(fields.items()):
+        names[f"#f{index}"] = name
+        values[f":f{index}"] = value
+        assignments.append(f"#entity.#f{index} = :f{index}")
+    expression = "SET " + ", ".join(assignments)
+
+    removals = []
+    for index, name in enumerate(remove):
+        names[f"#r{index}"] = name
+        removals.append(f"#entity.#r{index}")
+    if removals:
+        expression += " REMOVE " + ", ".join(removals)
+
+    condition = "attribute_exists(#entity)"
+    for index, (name, value) in enumerate((expected or {}).items()):
+        names[f"#e{index}"] = name
+        values[f":e{index}"] = value
+        condition += f" AND #entity.#e{index} = :e{index}"
+
+    try:
+        table.update_item(
+            Key={ScrapMapDDBSchema.PK: pk, ScrapMapDDBSchema.SK: sk},
+            UpdateExpression=expression,
+            ConditionExpression=condition,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def _version_key(pk: str) -> Dict:
     return {
         ScrapMapDDBSchema.PK: pk,
-        ScrapMapDDBSchema.SK: sk,
-        ScrapMapDDBSchema.Entity: entity,
+        ScrapMapDDBSchema.SK: SortKeyFormatStrings.VERSION,
     }
 
 
+def bump_version(table: Table, pk: str) -> int:
+    """
+    Atomically increments the user's map version.  Call it *after* the write it
+    covers, so a reader that sees the new version is guaranteed to see the write.
+    """
+    response = table.update_item(
+        Key=_version_key(pk),
+        UpdateExpression="ADD #version :one",
+        ExpressionAttributeNames={"#version": ScrapMapDDBSchema.Version},
+        ExpressionAttributeValues={":one": 1},
+        ReturnValues="UPDATED_NEW",
+    )
+    return int(response["Attributes"][ScrapMapDDBSchema.Version])
+
+
+def get_version(table: Table, pk: str) -> int:
+    """
+    Reads the user's map version (0 if the user has never written).  Read it
+    *before* querying the data it describes.
+    """
+    response = table.get_item(
+        Key=_version_key(pk),
+        ProjectionExpression="#version",
+        ExpressionAttributeNames={"#version": ScrapMapDDBSchema.Version},
+        ConsistentRead=True,
+    )
+    return int(response.get("Item", {}).get(ScrapMapDDBSchema.Version, 0))
+
+
 def query_table(table: Table, key: str = None, value: str = None) -> Dict:
     if key is not None and value is not None:
         filtering_exp = Key(key).eq(value)
@@ -39,6 +311,637 @@ def query_table(table: Table, key: str = None, value: str = None) -> Dict:
     raise ValueError("Parameters missing or invalid")
 
 
+@dataclass
+class BatchWriteResult:
+    processed: int = 0
+    # (request, reason) for every write that could not be applied
+    failed: List = field(default_factory=list)
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def batch_write(
+    dynamo: DynamoDBServiceResource,
+    table_name: str,
+    requests: Iterable[Dict],
+    max_attempts: int = 5,
+    base_delay: float = 0.05,
+    max_delay: float = 2.0,
+) -> BatchWriteResult:
+    """
+    Applies `PutRequest`/`DeleteRequest`s with `BatchWriteItem` in chunks of 25.
+
+    Unprocessed items are retried with full-jitter exponential backoff; whatever
+    is still unprocessed after `max_attempts` is reported as failed instead of
+    raising, so callers can report partial success.  `requests` is consumed
+    lazily, one chunk at a time.
+    """
+    result = BatchWriteResult()
+
+    for chunk in _chunks(requests, MAX_BATCH_WRITE_ITEMS):
+        pending = chunk
+        for attempt in range(max_attempts):
+            if attempt:
+                delay = min(max_delay, base_delay * 2**attempt)
+                time.sleep(random.uniform(0, delay))
+
+            try:
+                response = dynamo.batch_write_item(RequestItems={table_name: pending})
+            except ClientError as e:
+                reason = e.response.get("Error", {}).get("Code", "ClientError")
+                result.failed.extend((request, reason) for request in pending)
+                pending = []
+                break
+
+            unprocessed = response.get("UnprocessedItems", {}).get(table_name, [])
+            result.processed += len(pending) - len(unprocessed)
+            pending = unprocessed
+            if not pending:
+                break
+
+        result.failed.extend((request, "Unprocessed") for request in pending)
+
+    return result
+
+
+@dataclass
+class CascadeDeleteResult:
+    deleted: int = 0
+    # False if the children could not all be removed in time; the parent is only
+    # deleted once every child is gone, so the delete can simply be retried
+    complete: bool = True
+    # False if there was no live parent, in which case nothing was written
+    found: bool = True
+
+
+# Condition on the parent's tombstone: it must be live, not missing or deleted
+_LIVE_PARENT_CONDITION = "attribute_exists(#pk) AND attribute_not_exists(#deleted)"
+_LIVE_PARENT_NAMES = {
+    "#pk": ScrapMapDDBSchema.PK,
+    "#deleted": ScrapMapDDBSchema.Deleted,
+}
+
+
+def _is_live(table: Table, key: Dict) -> bool:
+    item = table.get_item(
+        Key=key,
+        ConsistentRead=True,
+        ProjectionExpression="#pk, #deleted",
+        ExpressionAttributeNames=_LIVE_PARENT_NAMES,
+    ).get("Item")
+    return item is not None and ScrapMapDDBSchema.Deleted not in item
+
+
+def delete_with_children(
+    dynamo: DynamoDBServiceResource,
+    table: Table,
+    parent_key: Dict,
+    child_keys: Iterable[Dict],
+    time_remaining: Optional[Callable[[], float]] = None,
+    margin: float = 5.0,
+) -> CascadeDeleteResult:
+    """
+    Deletes an item along with its children, replacing each with a tombstone.
+
+    Small sets (parent + children fit in one transaction) are removed atomically
+    with `TransactWriteItems`.  Larger ones are streamed from `child_keys` into
+    `batch_write` 25 at a time, so memory stays bounded regardless of how many
+    children there are; `time_remaining` (seconds) lets the caller stop early,
+    leaving the parent in place, before the Lambda times out.
+
+    Nothing is written unless the parent is live: it is checked before any
+    child is read, and the parent's tombstone is conditional on it, so a
+    missing or already deleted parent yields `found=False`.
+    """
+    if not _is_live(table, parent_key):
+        return CascadeDeleteResult(found=False)
+
+    child_keys = iter(child_keys)
+    head = list(itertools.islice(child_keys, MAX_TRANSACTION_ITEMS))
+
+    if len(head) < MAX_TRANSACTION_ITEMS:
+        transact_items = [
+            {
+                "Put": {
+                    "TableName": table.name,
+                    "Item": create_tombstone(
+                        key[ScrapMapDDBSchema.PK], key[ScrapMapDDBSchema.SK]
+                    ),
+                }
+            }
+            for key in head + [parent_key]
+        ]
+        # Condition builders are only expanded for top-level parameters, not
+        # inside transaction items
+        transact_items[-1]["Put"]["ConditionExpression"] = _LIVE_PARENT_CONDITION
+        transact_items[-1]["Put"]["ExpressionAttributeNames"] = _LIVE_PARENT_NAMES
+        try:
+            # The resource's client serializes attribute values like the resource
+            # does
+            dynamo.meta.client.transact_write_items(TransactItems=transact_items)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "TransactionCanceledException":
+                reasons = e.response.get("CancellationReasons") or [{}]
+                if reasons[-1].get("Code") == "ConditionalCheckFailed":
+                    # Deleted since the check above
+                    return CascadeDeleteResult(found=False)
+            raise
+        return CascadeDeleteResult(deleted=len(head) + 1)
+
+    stopped_early = False
+
+    def delete_requests() -> Iterator[Dict]:
+        nonlocal stopped_early
+        for key in itertools.chain(head, child_keys):
+            if time_remaining is not None and time_remaining() < margin:
+                stopped_early = True
+                return
+            yield {
+                "PutRequest": {
+                    "Item": create_tombstone(
+                        key[ScrapMapDDBSchema.PK], key[ScrapMapDDBSchema.SK]
+                    )
+                }
+            }
+
+    batch_result = batch_write(dynamo, table.name, delete_requests())
+    result = CascadeDeleteResult(deleted=batch_result.processed)
+
+    # Children may remain, so leave the parent for the retry to find
+    if stopped_early or batch_result.failed:
+        result.complete = False
+        return result
+
+    try:
+        table.put_item(
+            Item=create_tombstone(
+                parent_key[ScrapMapDDBSchema.PK], parent_key[ScrapMapDDBSchema.SK]
+            ),
+            ConditionExpression=_LIVE_PARENT_CONDITION,
+            ExpressionAttributeNames=_LIVE_PARENT_NAMES,
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            # Deleted by a concurrent request while the children were removed
+            result.found = False
+            return result
+        raise
+    result.deleted += 1
+    return result
+
+
+def batch_create_records(
+    dynamo: DynamoDBServiceResource,
+    table_name: str,
+    pk: str,
+    records: List[Tuple[int, Any]],
+    sort_key_format: str,
+    invalid: Optional[List[Dict]] = None,
+) -> Dict:
+    """
+    Writes already validated model `records`, each paired with its index in the
+    request, with `batch_write`.  Returns a report of which entries were saved
+    and which failed and why, including the `invalid` entries rejected before
+    any write.
+    """
+    succeeded: List[Dict] = []
+    failed: List[Dict] = list(invalid or ())
+    entries_by_sk: Dict[str, Dict] = {}
+    items: Dict[str, Dict] = {}
+
+    for index, record in records:
+        sk = sort_key_format.format(place_id=record.place_id)
+        # BatchWriteItem rejects a batch that writes the same key twice
+        if sk in entries_by_sk:
+            failed.append(
+                dict(
+                    entries_by_sk[sk],
+                    error="Superseded by a later entry with the same place_id",
+                )
+            )
+
+        entries_by_sk[sk] = {"index": index, "place_id": record.place_id}
+        items[sk] = create_record(pk, sk, record.to_item())
+
+    result = batch_write(
+        dynamo,
+        table_name,
+        ({"PutRequest": {"Item": item}} for item in items.values()),
+    )
+
+    failed_sks = set()
+    for request, reason in result.failed:
+        sk = request["PutRequest"]["Item"][ScrapMapDDBSchema.SK]
+        failed_sks.add(sk)
+        failed.append(dict(entries_by_sk[sk], error=reason))
+
+    for sk in items:
+        if sk not in failed_sks:
+            succeeded.append(entries_by_sk[sk])
+
+    return {
+        "succeeded": sorted(succeeded, key=lambda entry: entry["index"]),
+        "failed": sorted(failed, key=lambda entry: entry["index"]),
+    }
+
+
+class PaginatedQuery:
+    """
+    Lazily iterates over every item matching a query, following `LastEvaluatedKey`
+    one page at a time so only a single page is held in memory.
+
+    If `limit` is set, iteration stops after that many items and
+    `last_evaluated_key` holds the key to resume from (None once the query is
+    exhausted).
+    """
+
+    def __init__(
+        self,
+        table: Table,
+        key_condition_expression,
+        limit: Optional[int] = None,
+        exclusive_start_key: Optional[Dict] = None,
+        key_attributes: Sequence[str] = (ScrapMapDDBSchema.PK, ScrapMapDDBSchema.SK),
+        **query_kwargs,
+    ):
+        self._table = table
+        self._key_condition_expression = key_condition_expression
+        self._limit = limit
+        self._exclusive_start_key = exclusive_start_key
+        self._key_attributes = key_attributes
+        self._query_kwargs = query_kwargs
+        self.last_evaluated_key: Optional[Dict] = None
+        self.count = 0
+
+    def __iter__(self) -> Iterator[Dict]:
+        kwargs = dict(
+            self._query_kwargs, KeyConditionExpression=self._key_condition_expression
+        )
+        start_key = self._exclusive_start_key
+        remaining = self._limit
+
+        while True:
+            if start_key is not None:
+                kwargs["ExclusiveStartKey"] = start_key
+            if remaining is not None:
+                kwargs["Limit"] = remaining
+
+            response = self._table.query(**kwargs)
+            items = response.get("Items", [])
+            start_key = response.get("LastEvaluatedKey")
+
+            for index, item in enumerate(items):
+                self.count += 1
+                yield item
+
+                if remaining is not None:
+                    remaining -= 1
+                    if remaining == 0:
+                        has_more = index < len(items) - 1 or start_key is not None
+                        self.last_evaluated_key = (
+                            {attr: item[attr] for attr in self._key_attributes}
+                            if has_more
+                            else None
+                        )
+                        return
+
+            if start_key is None:
+                self.last_evaluated_key = None
+                return
+
+
+def entity_key_condition(pk: str, sort_key_prefix: str):
+    """
+    Key condition that only matches one entity type within a user's partition,
+    e.g. `entity_key_condition(user, SortKeyPrefixes.PLACE)`.
+    """
+    return Key(ScrapMapDDBSchema.PK).eq(pk) & Key(ScrapMapDDBSchema.SK).begins_with(
+        sort_key_prefix
+    )
+
+
+def query_entities(
+    table: Table,
+    pk: str,
+    sort_key_prefix: str,
+    include_deleted: bool = False,
+    **kwargs,
+) -> PaginatedQuery:
+    """
+    Paginated query over a single entity type, so reads are not charged for the
+    partition's other entities.  Tombstones are filtered out unless
+    `include_deleted` is set.
+    """
+    if not include_deleted:
+        live = Attr(ScrapMapDDBSchema.Deleted).not_exists()
+        filter_expression = kwargs.get("FilterExpression")
+        kwargs["FilterExpression"] = (
+            live if filter_expression is None else live & filter_expression
+        )
+    return PaginatedQuery(table, entity_key_condition(pk, sort_key_prefix), **kwargs)
+
+
+def query_changes(
+    table: Table, pk: str, sort_key_prefix: str, since: int, **kwargs
+) -> PaginatedQuery:
+    """
+    Paginated query over ChangesIndex for the items of one entity type written
+    (or deleted) at or after `since`, in the order they were written.
+    """
+    key_condition = Key(ScrapMapDDBSchema.PK).eq(pk) & Key(
+        ScrapMapDDBSchema.ChangeSK
+    ).between(
+        change_sort_key(sort_key_prefix, since),
+        # Sorts after every zero padded timestamp
+        sort_key_prefix + "~",
+    )
+    return PaginatedQuery(
+        table,
+        key_condition,
+        IndexName=Indexes.CHANGES,
+        key_attributes=(
+            ScrapMapDDBSchema.PK,
+            ScrapMapDDBSchema.SK,
+            ScrapMapDDBSchema.ChangeSK,
+        ),
+        **kwargs,
+    )
+
+
+def serialize_entities_columnar(items: Iterable[Dict]) -> str:
+    """
+    Columnar encoding of just the entities, without the keys and bookkeeping
+    attributes around them.
+    """
+    return serialize_columnar(item[ScrapMapDDBSchema.Entity] for item in items)
+
+
+def serialize_changes(
+    changes: Iterable[Dict],
+    since: int,
+    serialize: Callable[[Iterable[Dict]], str] = serialize_items,
+) -> str:
+    """
+    Delta sync response: the items written and the ids deleted since `since`,
+    and the watermark to pass as `since` next time.  If tombstones from `since`
+    may already have expired, only `full_resync` is set and the client has to
+    re-download everything.
+    """
+    now = int(time.time() * 1000)
+    watermark = now - WATERMARK_SAFETY_WINDOW_MS
+    full_resync = since < now - TOMBSTONE_TTL_SECONDS * 1000
+
+    upserts: List[Dict] = []
+    deletes: List[str] = []
+    if not full_resync:
+        for item in changes:
+            if item.get(ScrapMapDDBSchema.Deleted):
+                deletes.append(item[ScrapMapDDBSchema.SK].partition("#")[2])
+            else:
+                upserts.append(item)
+
+    return "".join(
+        (
+            '{"watermark":',
+            json.dumps(watermark),
+            ',"full_resync":',
+            json.dumps(full_resync),
+            ',"upserts":',
+            serialize(upserts),
+            ',"deletes":',
+            json.dumps(deletes),
+            "}",
+        )
+    )
+
+
+def query_geohash_ranges(
+    table: Table,
+    pk: str,
+    sort_key_prefix: str,
+    ranges: Sequence[Tuple[str, str]],
+    max_workers: int = 8,
+    **query_kwargs,
+) -> List[Dict]:
+    """
+    Fetches every item in GeoIndex whose geohash falls in one of `ranges`
+    (inclusive pairs of geohash prefixes, as returned by `geohash.cover`).
+
+    The ranges are queried concurrently.  Queries go through the resource's
+    client, which unlike the resource itself is safe to share between threads.
+    """
+    client = table.meta.client
+
+    def query_range(prefix_range: Tuple[str, str]) -> List[Dict]:
+        low, high = prefix_range
+        key_condition = Key(ScrapMapDDBSchema.PK).eq(pk) & Key(
+            ScrapMapDDBSchema.GeoSK
+        ).between(sort_key_prefix + low, sort_key_prefix + high + geohash.RANGE_END)
+        return list(
+            PaginatedQuery(
+                client,
+                key_condition,
+                TableName=table.name,
+                IndexName=Indexes.GEO,
+                **query_kwargs,
+            )
+        )
+
+    if len(ranges) == 1:
+        return query_range(ranges[0])
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(ranges))) as executor:
+        return [item for items in executor.map(query_range, ranges) for item in items]
+
+
+def query_entity_groups(
+    table: Table, pk: str, queries: Dict[str, Dict]
+) -> Dict[str, List[Dict]]:
+    """
+    Fetches every live item of several entity types of a partition at once.
+    `queries` maps each sort key prefix to extra query arguments (e.g. a
+    `FilterExpression`), and the result maps it to the items found.
+
+    Each entity type is paginated through on its own thread, so the whole fetch
+    takes about as long as the slowest type rather than the sum of them.
+    """
+    client = table.meta.client
+
+    def query_group(prefix: str) -> List[Dict]:
+        return list(
+            query_entities(client, pk, prefix, TableName=table.name, **queries[prefix])
+        )
+
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        return dict(zip(queries, executor.map(query_group, queries)))
+
+
+class InvalidPaginationError(ValueError):
+    pass
+
+
+def _sign(payload: bytes, signing_key: str) -> bytes:
+    return hmac.new(signing_key.encode("utf-8"), payload, hashlib.sha256).digest()
+
+
+def encode_cursor(key: Dict, signing_key: str) -> str:
+    """
+    Turns a `LastEvaluatedKey` into an opaque, HMAC-signed cursor that is safe to
+    hand to clients.
+    """
+    payload = json.dumps(key, sort_keys=True, separators=(",", ":"), cls=DecimalEncoder)
+    payload_bytes = payload.encode("utf-8")
+    return ".".join(
+        base64.urlsafe_b64encode(part).decode().rstrip("=")
+        for part in (payload_bytes, _sign(payload_bytes, signing_key))
+    )
+
+
+def _b64decode(part: str) -> bytes:
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def decode_cursor(
+    cursor: Optional[str],
+    signing_key: str,
+    pk: Optional[str] = None,
+    sort_key_prefix: Optional[str] = None,
+) -> Optional[Dict]:
+    """
+    Verifies and decodes a cursor produced by `encode_cursor`.  If `pk` or
+    `sort_key_prefix` are given, the cursor must also fall inside that partition
+    and entity.
+    """
+    if not cursor:
+        return None
+
+    try:
+        payload_part, signature_part = cursor.split(".")
+        payload = _b64decode(payload_part)
+        signature = _b64decode(signature_part)
+    except ValueError:
+        raise InvalidPaginationError("Malformed cursor")
+
+    if not hmac.compare_digest(signature, _sign(payload, signing_key)):
+        raise InvalidPaginationError("Cursor signature does not match")
+
+    key = json.loads(payload)
+    if pk is not None and key.get(ScrapMapDDBSchema.PK) != pk:
+        raise InvalidPaginationError("Cursor does not belong to this partition")
+    if sort_key_prefix is not None and not str(
+        key.get(ScrapMapDDBSchema.SK, "")
+    ).startswith(sort_key_prefix):
+        raise InvalidPaginationError("Cursor does not belong to this entity")
+    return key
+
+
+def parse_query_limit(limit: Optional[str]) -> Optional[int]:
+    if limit is None:
+        return None
+
+    try:
+        value = int(limit)
+    except ValueError:
+        raise InvalidPaginationError(f"Invalid limit <{limit}>")
+
+    if not 0 < value <= MAX_QUERY_LIMIT:
+        raise InvalidPaginationError(f"Limit must be between 1 and {MAX_QUERY_LIMIT}")
+    return value
+
+
+def parse_watermark(since: Optional[str]) -> Optional[int]:
+    if since is None:
+        return None
+
+    try:
+        value = int(since)
+    except ValueError:
+        raise InvalidPaginationError(f"Invalid watermark <{since}>")
+
+    if value < 0:
+        raise InvalidPaginationError("Watermark must not be negative")
+    return value
+
+
+class NativeNumberDeserializer(TypeDeserializer):
+    """
+    Deserializes numbers to `int`, or to `float` when that is lossless, and only
+    falls back to `Decimal` for the rest.  Converting once here means the JSON
+    encoder never has to call back into Python for a number.
+
+    The types items are made of (strings, numbers, maps, lists, booleans, nulls)
+    are dispatched directly; sets and binary go through boto3's deserializer.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._direct = {
+            "S": str,
+            "N": self._deserialize_n,
+            "M": self._deserialize_m,
+            "L": self._deserialize_l,
+            "BOOL": bool,
+            "NULL": lambda value: None,
+        }
+
+    def deserialize(self, value):
+        if len(value) == 1:
+            for dynamodb_type, inner in value.items():
+                direct = self._direct.get(dynamodb_type)
+                if direct is not None:
+                    return direct(inner)
+        return super().deserialize(value)
+
+    def _deserialize_n(self, value):
+        number = native_number(value)
+        if number is None:
+            return super()._deserialize_n(value)
+        return number
+
+    def _deserialize_m(self, value):
+        deserialize = self.deserialize
+        return {name: deserialize(inner) for name, inner in value.items()}
+
+    def _deserialize_l(self, value):
+        deserialize = self.deserialize
+        return [deserialize(inner) for inner in value]
+
+
+_native_numbers = TransformationInjector(deserializer=NativeNumberDeserializer())
+# boto3's own output transformation, registered for every resource it creates
+_OUTPUT_TRANSFORM_ID = "dynamodb-attr-value-output"
+_native_number_clients: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def read_native_numbers(dynamo: DynamoDBServiceResource) -> DynamoDBServiceResource:
+    """
+    Makes `dynamo`, and the tables created from it, return numbers as
+    `int`/`float` (see `NativeNumberDeserializer`) instead of `Decimal`.  Only
+    for resources that never write what they read: boto3 refuses to serialize
+    floats.  Cheap to call on every invocation.
+    """
+    client = dynamo.meta.client
+    if client not in _native_number_clients:
+        events = client.meta.events
+        # Under boto3's unique id, so a `Table` created later (which registers
+        # boto3's transformation again) leaves this one in place
+        events.unregister("after-call.dynamodb", unique_id=_OUTPUT_TRANSFORM_ID)
+        events.register_first(
+            "after-call.dynamodb",
+            _native_numbers.inject_attribute_value_output,
+            unique_id=_OUTPUT_TRANSFORM_ID,
+        )
+        _native_number_clients.add(client)
+    return dynamo
+
+
 class DecimalEncoder(JSONEncoder):
     def default(self, o):
         if isinstance(o, Decimal):
@@ -1,9 +1,135 @@
-from typing import Dict
+import base64
+import gzip
+import hashlib
+from typing import Dict, Optional
 
+from utils.circuit_breaker import CircuitOpenError
+from utils.instrumentation import span
 
-def make_response(status_code: int, body: str, headers: Dict = None):
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Below this, compression saves less than the base64 encoding adds back
+MIN_COMPRESSED_SIZE = 1024
+# Content codings make_response may apply, and suffix strong ETags with
+CONTENT_CODINGS = ("br", "gzip")
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    encodings = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Picks the content coding for a response from the request's
+    `Accept-Encoding`, preferring br (when brotli is installed) over gzip.
+    """
+    if not accept_encoding:
+        return None
+
+    encodings = _accepted_encodings(accept_encoding)
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    for encoding in supported:
+        if encodings.get(encoding, encodings.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def make_response(
+    status_code: int,
+    body: str,
+    headers: Dict = None,
+    accept_encoding: Optional[str] = None,
+):
+    """
+    Builds an API Gateway proxy response.  If `accept_encoding` (the request's
+    `Accept-Encoding`) allows it, large bodies are compressed and returned
+    base64 encoded, which API Gateway decodes back to binary.  A strong `ETag`
+    in `headers` then gets the coding as a suffix (e.g. `"…-gzip"`), since each
+    coding is a different representation.
+    """
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None or len(body) < MIN_COMPRESSED_SIZE:
+        return {
+            "statusCode": status_code,
+            "headers": headers,
+            "body": body,
+        }
+
+    data = body.encode("utf-8")
+    with span("compress"):
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=5)
+        else:
+            compressed = gzip.compress(data, compresslevel=6)
+
+    headers = dict(headers or {}, **{"Content-Encoding": encoding})
+    if "ETag" in headers:
+        headers["ETag"] = _encoded_etag(headers["ETag"], encoding)
     return {
         "statusCode": status_code,
         "headers": headers,
-        "body": body,
+        "body": base64.b64encode(compressed).decode("ascii"),
+        "isBase64Encoded": True,
     }
+
+
+def service_unavailable(error: CircuitOpenError):
+    """
+    The response while a downstream service's circuit breaker is open.
+    """
+    return make_response(
+        503, "Service Unavailable", {"Retry-After": error.retry_after_header}
+    )
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _encoded_etag(etag: str, encoding: str) -> str:
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _identity_etag(etag: str) -> str:
+    for encoding in CONTENT_CODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    Implements the `If-None-Match` comparison (weak, so `W/` prefixes and the
+    content-coding suffixes `make_response` adds are ignored).  Returns the
+    client's matching validator, to send back on the 304, or None.
+    """
+    if not if_none_match:
+        return None
+
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    if "*" in candidates:
+        return etag
+    for candidate in candidates:
+        opaque = candidate[2:] if candidate.startswith("W/") else candidate
+        if _identity_etag(opaque) == etag:
+            return candidate
+    return None
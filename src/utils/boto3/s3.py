@@ -0,0 +1,157 @@
+"""
+Direct-to-S3 uploads and downloads with presigned URLs.
+
+Photo bytes never pass through API Gateway or Lambda: the client is handed one
+presigned URL per part of a multipart upload and PUTs the parts straight to the
+bucket, then reports the parts' ETags so the upload can be completed.
+
+Presigned URLs are signed with the assumed role's temporary credentials, so they
+stop working when those credentials expire, whatever `ExpiresIn` says.  botocore
+refreshes the credentials 15 minutes ahead of expiry, which is why the lifetimes
+here stay below that.
+"""
+import math
+from typing import Dict, List, Optional
+
+from botocore.config import Config
+
+from utils.boto3.config import client_config
+
+# S3 rejects parts under 5 MiB, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+PART_SIZE = 8 * 1024 * 1024
+MAX_PARTS = 10000
+UPLOAD_URL_EXPIRES_IN = 10 * 60
+DOWNLOAD_URL_EXPIRES_IN = 10 * 60
+# The most keys one DeleteObjects call takes, and one ListObjectsV2 page holds
+MAX_DELETE_KEYS = 1000
+
+_configs: Dict[Optional[str], Config] = {}
+
+
+def s3_config(endpoint_url: Optional[str] = None) -> Config:
+    """
+    Client config for presigning, on top of the shared S3 config.  Local
+    stand-ins (`S3_ENDPOINT_URL`) generally only understand path-style
+    addressing.  The same `Config` instance is returned for the same endpoint so
+    the session registry can cache the client.
+    """
+    config = _configs.get(endpoint_url)
+    if config is None:
+        config = client_config("s3").merge(
+            Config(
+                signature_version="s3v4",
+                s3={"addressing_style": "path" if endpoint_url else "auto"},
+            )
+        )
+        _configs[endpoint_url] = config
+    return config
+
+
+def part_count(size: int, part_size: int = PART_SIZE) -> int:
+    return max(1, math.ceil(size / part_size))
+
+
+def part_size_for(size: int) -> int:
+    """
+    The smallest part size of at least `PART_SIZE` that fits `size` bytes in
+    `MAX_PARTS` parts.
+    """
+    return max(PART_SIZE, math.ceil(size / MAX_PARTS))
+
+
+def start_multipart_upload(
+    s3,
+    bucket: str,
+    key: str,
+    content_type: str,
+    size: int,
+    expires_in: int = UPLOAD_URL_EXPIRES_IN,
+) -> Dict:
+    """
+    Starts a multipart upload of `size` bytes and presigns an `UploadPart` URL for
+    each part.  Presigning is computed locally, so only `CreateMultipartUpload`
+    calls S3.
+    """
+    upload_id = s3.create_multipart_upload(
+        Bucket=bucket, Key=key, ContentType=content_type
+    )["UploadId"]
+
+    part_size = part_size_for(size)
+    parts = [
+        {
+            "part_number": part_number,
+            "url": s3.generate_presigned_url(
+                "upload_part",
+                Params={
+                    "Bucket": bucket,
+                    "Key": key,
+                    "UploadId": upload_id,
+                    "PartNumber": part_number,
+                },
+                ExpiresIn=expires_in,
+            ),
+        }
+        for part_number in range(1, part_count(size, part_size) + 1)
+    ]
+    return {"upload_id": upload_id, "part_size": part_size, "parts": parts}
+
+
+def complete_multipart_upload(
+    s3, bucket: str, key: str, upload_id: str, parts: List[Dict]
+) -> Dict:
+    """
+    `parts` are the `part_number`/`etag` pairs the client got back from S3.
+    """
+    return s3.complete_multipart_upload(
+        Bucket=bucket,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={
+            "Parts": [
+                {"PartNumber": part["part_number"], "ETag": part["etag"]}
+                for part in sorted(parts, key=lambda part: part["part_number"])
+            ]
+        },
+    )
+
+
+def presign_download(
+    s3, bucket: str, key: str, expires_in: int = DOWNLOAD_URL_EXPIRES_IN
+) -> str:
+    return s3.generate_presigned_url(
+        "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires_in
+    )
+
+
+def presign_photo(s3, bucket: str, photo: Dict) -> Dict:
+    """
+    Adds a download `url` to a PHOTO entity and to each of its derivatives.
+    """
+    photo["url"] = presign_download(s3, bucket, photo["key"])
+    for derivative in photo.get("derivatives", {}).values():
+        derivative["url"] = presign_download(s3, bucket, derivative["key"])
+    return photo
+
+
+def delete_prefix(s3, bucket: str, prefix: str) -> int:
+    """
+    Deletes every object under `prefix`, one page of keys at a time.  Returns
+    how many were deleted.
+    """
+    deleted = 0
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket, Prefix=prefix, PaginationConfig={"PageSize": MAX_DELETE_KEYS}
+    ):
+        keys = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+        if not keys:
+            continue
+        response = s3.delete_objects(
+            Bucket=bucket, Delete={"Objects": keys, "Quiet": True}
+        )
+        errors = response.get("Errors", [])
+        if errors:
+            raise RuntimeError(f"Could not delete {len(errors)} objects: {errors[0]}")
+        deleted += len(keys)
+    return deleted
@@ -0,0 +1,89 @@
+"""
+Secrets read from Secrets Manager at runtime, so their values never appear in a
+function's environment (readable by anyone with `lambda:GetFunctionConfiguration`).
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import boto3.session
+
+from utils.boto3.config import client_config, guard_events
+from utils.instrumentation import instrument_events
+
+
+class SecretProvider:
+    """
+    In-memory TTL cache for secret strings, keyed by secret ARN.
+
+    Secrets only change when they are rotated, so a warm container reads each
+    one once per TTL instead of once per request.  Loads are single-flight per
+    secret, like `ClientSecretProvider`'s.
+    """
+
+    DEFAULT_TTL_SECONDS = 15 * 60
+
+    def __init__(
+        self,
+        client_factory: Optional[Callable] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._client_factory = client_factory or self._default_client
+        self._client = None
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._secrets: Dict[str, Tuple[str, float]] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _default_client():
+        # The function's own role, which the stack grants read access to
+        client = boto3.session.Session().client(
+            "secretsmanager", config=client_config("secretsmanager")
+        )
+        guard_events(client.meta.events, "secretsmanager")
+        instrument_events(client.meta.events)
+        return client
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self._client_factory()
+            return self._client
+
+    def _get_cached(self, secret_id: str) -> Optional[str]:
+        entry = self._secrets.get(secret_id)
+        if entry is None:
+            return None
+        secret, expires_at = entry
+        if self._clock() >= expires_at:
+            return None
+        return secret
+
+    def _get_load_lock(self, secret_id: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(secret_id, threading.Lock())
+
+    def get(self, secret_id: str) -> str:
+        secret = self._get_cached(secret_id)
+        if secret is not None:
+            return secret
+
+        with self._get_load_lock(secret_id):
+            # Another request may have loaded the secret while we were waiting
+            secret = self._get_cached(secret_id)
+            if secret is not None:
+                return secret
+
+            response = self._get_client().get_secret_value(SecretId=secret_id)
+            secret = response["SecretString"]
+            self._secrets[secret_id] = (secret, self._clock() + self._ttl_seconds)
+            return secret
+
+    def invalidate(self, secret_id: str):
+        self._secrets.pop(secret_id, None)
+
+
+secret_provider = SecretProvider()
@@ -2,7 +2,8 @@
 Module provides utilities around boto3 sessions (e.g. creating boto3 sessions
 with custom providers).
 """
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import boto3.session
 import botocore.credentials
@@ -11,6 +12,10 @@ from mypy_boto3.boto3_session import Session
 from mypy_boto3_sts import STSClient
 from mypy_boto3_sts.type_defs import AssumeRoleRequestRequestTypeDef
 
+from utils.boto3.capacity import instrument_capacity
+from utils.boto3.config import client_config, guard_events
+from utils.instrumentation import instrument_events, span
+
 
 class _StsCredentialProvider(botocore.credentials.CredentialProvider):
     """
@@ -95,3 +100,155 @@ def create_sts_session(
         role_external_id=role_external_id,
     )
     return _create_custom_session([provider], boto3_session_kwargs=boto3_session_kwargs)
+
+
+class SessionRegistry:
+    """
+    Process-wide registry of assumed-role sessions and the clients/resources built
+    from them.
+
+    Lambda keeps module state alive between invocations of a warm container, so
+    keying sessions by (role ARN, session name) and clients by (role ARN, session
+    name, service) means `AssumeRole` and client construction are paid once per
+    container instead of once per request.  The cached sessions hold
+    `RefreshableCredentials`, which botocore refreshes under its own lock ahead of
+    expiry; a session is only rebuilt if its credentials have actually expired
+    (e.g. a refresh failed).
+    """
+
+    def __init__(self, sts_client_factory: Optional[Callable[[], STSClient]] = None):
+        self._sts_client_factory = sts_client_factory or (
+            lambda: boto3.session.Session().client(
+                "sts", config=client_config("sts")
+            )
+        )
+        self._sts_client: Optional[STSClient] = None
+        self._sessions: Dict[Tuple[str, str], Session] = {}
+        self._clients: Dict[Tuple, Any] = {}
+        self._lock = threading.RLock()
+        self._shared_session_name: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _get_sts_client(self) -> STSClient:
+        if self._sts_client is None:
+            self._sts_client = self._sts_client_factory()
+            # AssumeRole is timed like any other call
+            instrument_events(self._sts_client.meta.events)
+        return self._sts_client
+
+    @staticmethod
+    def _is_expired(session: Session) -> bool:
+        credentials = session.get_credentials()
+        if isinstance(credentials, botocore.credentials.RefreshableCredentials):
+            return credentials.refresh_needed(refresh_in=0)
+        return credentials is None
+
+    def share_sessions(self, role_session_name: Optional[str]):
+        """
+        Uses `role_session_name` for every session, so handlers that assume the
+        same role with different session names (e.g. several routes served by one
+        function) share a single session and its clients.  `None` restores one
+        session per name.
+        """
+        with self._lock:
+            self._shared_session_name = role_session_name
+
+    def session(self, *, role_arn: str, role_session_name: str) -> Session:
+        role_session_name = self._shared_session_name or role_session_name
+        key = (role_arn, role_session_name)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and self._is_expired(session):
+                self._evict(role_arn, role_session_name)
+                session = None
+
+            if session is None:
+                session = create_sts_session(
+                    sts_client=self._get_sts_client(),
+                    role_arn=role_arn,
+                    role_session_name=role_session_name,
+                )
+                self._sessions[key] = session
+            return session
+
+    def _get_or_create(
+        self,
+        kind: str,
+        service_name: str,
+        role_arn: str,
+        role_session_name: str,
+        **kwargs,
+    ) -> Any:
+        role_session_name = self._shared_session_name or role_session_name
+        kwargs.setdefault("config", client_config(service_name))
+        # Extra arguments (e.g. endpoint_url, config) must be hashable
+        key = (role_arn, role_session_name, service_name, kind) + tuple(
+            sorted(kwargs.items())
+        )
+        with self._lock:
+            session = self.session(
+                role_arn=role_arn, role_session_name=role_session_name
+            )
+            cached = self._clients.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            self.misses += 1
+            factory = session.resource if kind == "resource" else session.client
+            with span("create_client"):
+                created = factory(service_name, **kwargs)
+            events = (
+                created.meta.client.meta.events
+                if kind == "resource"
+                else created.meta.events
+            )
+            # Ahead of the other hooks, which should not see refused calls
+            guard_events(events, service_name)
+            instrument_events(events)
+            if service_name == "dynamodb":
+                instrument_capacity(events)
+            self._clients[key] = created
+            return created
+
+    def client(
+        self, service_name: str, *, role_arn: str, role_session_name: str, **kwargs
+    ):
+        return self._get_or_create(
+            "client", service_name, role_arn, role_session_name, **kwargs
+        )
+
+    def resource(
+        self, service_name: str, *, role_arn: str, role_session_name: str, **kwargs
+    ):
+        return self._get_or_create(
+            "resource", service_name, role_arn, role_session_name, **kwargs
+        )
+
+    def _evict(self, role_arn: str, role_session_name: str):
+        self._sessions.pop((role_arn, role_session_name), None)
+        for key in [k for k in self._clients if k[:2] == (role_arn, role_session_name)]:
+            del self._clients[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "sessions": len(self._sessions),
+                "clients": len(self._clients),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._clients.clear()
+            self._sts_client = None
+            self.hits = 0
+            self.misses = 0
+
+
+# Created at import time (i.e. during Lambda init) and shared by every handler in
+# the process
+session_registry = SessionRegistry()
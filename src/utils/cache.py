@@ -0,0 +1,136 @@
+"""
+In-process caching for warm Lambda containers.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from utils.environment import EnvironmentVariables
+from utils.instrumentation import count
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 5 * 60
+
+
+def approximate_size(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(approximate_size(element) for element in value)
+    return size
+
+
+class VersionedLRUCache:
+    """
+    LRU cache bounded by the approximate size of its values and by a TTL.
+
+    Each entry is stored with the version of the data it was built from and is
+    only returned when the caller's current version matches, so a write that
+    bumps the version invalidates every cached entry for that user without the
+    cache having to know about writes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        sizeof: Callable[[Any], int] = approximate_size,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._max_bytes = max_bytes
+        # A single huge entry would flush everything else out of the cache
+        self._max_entry_bytes = max_bytes // 4
+        self._ttl_seconds = ttl_seconds
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            entry_version, value, size, expires_at = entry
+            if entry_version != version or self._clock() >= expires_at:
+                self._remove(key, size)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, version: int, value: Any):
+        size = self._sizeof(value)
+        if size > self._max_entry_bytes:
+            return
+
+        evicted = 0
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._remove(key, existing[2])
+
+            self._entries[key] = (
+                version,
+                value,
+                size,
+                self._clock() + self._ttl_seconds,
+            )
+            self.bytes += size
+
+            while self.bytes > self._max_bytes:
+                oldest_key, oldest = next(iter(self._entries.items()))
+                self._remove(oldest_key, oldest[2])
+                evicted += 1
+            self.evictions += evicted
+
+        if evicted:
+            # Reported by the invocation whose put pushed the entries out
+            count("CacheEvictions", evicted)
+
+    def _remove(self, key: Hashable, size: int):
+        del self._entries[key]
+        self.bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+            }
+
+
+# Shared by every handler in the process.  The default leaves most of a 128 MB
+# function for the runtime and the request being served.
+collection_cache = VersionedLRUCache(
+    max_bytes=int(
+        os.environ.get(
+            EnvironmentVariables.COLLECTION_CACHE_MAX_BYTES.name, DEFAULT_MAX_BYTES
+        )
+    ),
+    ttl_seconds=float(
+        os.environ.get(
+            EnvironmentVariables.COLLECTION_CACHE_TTL_SECONDS.name,
+            DEFAULT_TTL_SECONDS,
+        )
+    ),
+)
@@ -0,0 +1,116 @@
+"""
+Circuit breakers that fail fast while a downstream service is degraded.
+
+A breaker opens after `failure_threshold` consecutive failed calls (timeouts,
+throttling and 5xx responses that outlasted the client's retries).  While open,
+calls raise `CircuitOpenError` straight away, which handlers turn into a 503,
+instead of each request waiting out its own timeouts.  After `reset_timeout`
+seconds one trial call is let through: if it succeeds the breaker closes, if it
+fails the breaker opens again.
+
+State is per process, so each warm container learns about a degraded service on
+its own.  Only the standard library is used, so the routers can catch
+`CircuitOpenError` without importing botocore.
+"""
+import math
+import threading
+import time
+from typing import Callable, Dict
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 10.0
+
+
+class States:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        # Retry-After takes whole seconds
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = States.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at = 0.0
+
+    def before_call(self):
+        """
+        Raises `CircuitOpenError` unless the call may go ahead.
+        """
+        with self._lock:
+            if self.state == States.CLOSED:
+                return
+
+            now = self._clock()
+            if self.state == States.OPEN:
+                remaining = self._opened_at + self._reset_timeout - now
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = States.HALF_OPEN
+                self._trial_started_at = now
+                return
+
+            # Half open: one trial at a time, unless the trial never reported back
+            if now - self._trial_started_at < self._reset_timeout:
+                raise CircuitOpenError(
+                    self.name, self._trial_started_at + self._reset_timeout - now
+                )
+            self._trial_started_at = now
+
+    def record_success(self):
+        with self._lock:
+            self.state = States.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            # A failed trial reopens the breaker straight away
+            tripped = self.failures >= self._failure_threshold
+            if tripped or self.state == States.HALF_OPEN:
+                self.state = States.OPEN
+                self._opened_at = self._clock()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(name: str) -> CircuitBreaker:
+    """
+    The process-wide breaker of a downstream service, e.g. "dynamodb".
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
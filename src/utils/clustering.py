@@ -0,0 +1,128 @@
+"""
+Geohash bucketing of map points into clusters.
+
+Points that share a geohash prefix fall in the same grid cell, so clustering
+at a precision is a single pass that groups points by a prefix of the geohash
+already stored in GeoSK, and coarsening is the same pass over the clusters.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from utils import geohash
+
+MAX_ZOOM = 22
+MAX_CLUSTERS = 500
+MAX_REPRESENTATIVES = 3
+# Roughly how many cells to fit across one 256px map tile
+CELLS_PER_TILE = 8
+
+
+class Point(NamedTuple):
+    entity: str
+    geohash: str
+    latitude: float
+    longitude: float
+    place_id: str
+
+
+class Cluster(NamedTuple):
+    entity: str
+    cell: str
+    count: int
+    latitude_sum: float
+    longitude_sum: float
+    # The first few place ids in geohash order, so they are stable between calls
+    place_ids: Tuple[str, ...]
+
+    @property
+    def latitude(self) -> float:
+        return self.latitude_sum / self.count
+
+    @property
+    def longitude(self) -> float:
+        return self.longitude_sum / self.count
+
+    def asdict(self) -> Dict:
+        return {
+            "entity": self.entity,
+            "geohash": self.cell,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "count": self.count,
+            "place_ids": list(self.place_ids),
+        }
+
+
+def precision_for_zoom(zoom: int) -> int:
+    """
+    The coarsest geohash precision whose cells are at most 1/CELLS_PER_TILE of
+    a map tile wide at `zoom`.
+    """
+    max_cell_width = 360.0 / 2**zoom / CELLS_PER_TILE
+    for precision in range(1, geohash.DEFAULT_PRECISION):
+        if geohash.cell_size(precision)[1] <= max_cell_width:
+            return precision
+    return geohash.DEFAULT_PRECISION
+
+
+def _merge(clusters: Iterable[Cluster], precision: int) -> List[Cluster]:
+    merged: Dict[Tuple[str, str], list] = {}
+    for cluster in clusters:
+        key = (cluster.entity, cluster.cell[:precision])
+        bucket = merged.get(key)
+        if bucket is None:
+            merged[key] = [
+                cluster.count,
+                cluster.latitude_sum,
+                cluster.longitude_sum,
+                list(cluster.place_ids),
+            ]
+            continue
+
+        bucket[0] += cluster.count
+        bucket[1] += cluster.latitude_sum
+        bucket[2] += cluster.longitude_sum
+        if len(bucket[3]) < MAX_REPRESENTATIVES:
+            bucket[3].extend(cluster.place_ids[: MAX_REPRESENTATIVES - len(bucket[3])])
+
+    return [
+        Cluster(entity, cell, count, lat_sum, lng_sum, tuple(place_ids))
+        for (entity, cell), (count, lat_sum, lng_sum, place_ids) in merged.items()
+    ]
+
+
+def cluster_points(points: Iterable[Point], precision: int) -> List[Cluster]:
+    return _merge(
+        (
+            Cluster(
+                point.entity,
+                point.geohash,
+                1,
+                point.latitude,
+                point.longitude,
+                (point.place_id,),
+            )
+            for point in points
+        ),
+        precision,
+    )
+
+
+def clusters_in_view(
+    clusters: Iterable[Cluster],
+    box: geohash.BoundingBox,
+    precision: int,
+    max_clusters: int = MAX_CLUSTERS,
+) -> Tuple[int, List[Cluster]]:
+    """
+    Clusters whose centroid is inside `box`, coarsened one precision at a time
+    until there are at most `max_clusters` of them.  Returns the precision that
+    was used along with the clusters.
+    """
+    visible = [
+        cluster
+        for cluster in clusters
+        if box.contains(cluster.latitude, cluster.longitude)
+    ]
+    while len(visible) > max_clusters and precision > 1:
+        precision -= 1
+        visible = _merge(visible, precision)
+    return precision, visible
@@ -1,3 +1,4 @@
+import os
 from enum import Enum, auto
 from typing import Dict, List
 
@@ -9,9 +10,31 @@ class EnvironmentVariables(Enum):
     DYNAMO_TABLE_NAME = auto()
     DYNAMO_READ_ROLE_ARN = auto()
     DYNAMO_WRITE_ROLE_ARN = auto()
+    CURSOR_SIGNING_KEY_ARN = auto()
+    COLLECTION_CACHE_MAX_BYTES = auto()
+    COLLECTION_CACHE_TTL_SECONDS = auto()
+    PHOTO_BUCKET_NAME = auto()
+    PHOTO_BUCKET_ROLE_ARN = auto()
+    # Optional, points S3 clients at a local stand-in instead of AWS
+    S3_ENDPOINT_URL = auto()
+    # Optional, "true" emits per-request metrics (see utils.instrumentation)
+    METRICS_ENABLED = auto()
+    # Optional, "true" records X-Ray subsegments for the same phases
+    XRAY_ENABLED = auto()
+    # Optional, share of requests (0 to 1) whose full event is logged
+    LOG_SAMPLE_RATE = auto()
+    # Optional, "true" returns the consumed DynamoDB capacity in a response header
+    CAPACITY_HEADER_ENABLED = auto()
 
 
 def validate_environment(env: Dict, required_env_vars: List):
     for env_var in required_env_vars:
         if env_var not in env:
             raise KeyError(f"Environment varibale {env_var} does not exist")
+
+
+def env_flag(name: str) -> bool:
+    """
+    Whether an optional on/off variable (e.g. `METRICS_ENABLED`) is on.
+    """
+    return os.environ.get(name, "").lower() in ("1", "true", "yes", "on")
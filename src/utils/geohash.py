@@ -0,0 +1,167 @@
+"""
+Geohash encoding and bounding-box covering.
+
+A geohash interleaves longitude and latitude bits (longitude first) and writes
+them 5 bits at a time in base 32.  Because the alphabet is in ASCII order, the
+geohashes of a cell's descendants sort contiguously, so "every point in these
+cells" can be asked of DynamoDB as a handful of sort key range queries.
+"""
+import math
+from typing import List, NamedTuple, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {char: index for index, char in enumerate(BASE32)}
+
+DEFAULT_PRECISION = 9
+# Sorts after every geohash character, so `prefix + RANGE_END` bounds every
+# geohash that starts with `prefix`
+RANGE_END = "~"
+
+
+class BoundingBox(NamedTuple):
+    min_lat: float
+    min_lng: float
+    max_lat: float
+    max_lng: float
+
+    def contains(self, lat: float, lng: float) -> bool:
+        if not self.min_lat <= lat <= self.max_lat:
+            return False
+        if self.min_lng <= self.max_lng:
+            return self.min_lng <= lng <= self.max_lng
+        # Crosses the antimeridian
+        return lng >= self.min_lng or lng <= self.max_lng
+
+    def split_at_antimeridian(self) -> List["BoundingBox"]:
+        if self.min_lng <= self.max_lng:
+            return [self]
+        return [
+            BoundingBox(self.min_lat, self.min_lng, self.max_lat, 180.0),
+            BoundingBox(self.min_lat, -180.0, self.max_lat, self.max_lng),
+        ]
+
+
+WORLD = BoundingBox(-90.0, -180.0, 90.0, 180.0)
+
+
+def parse_bounding_box(min_lat, min_lng, max_lat, max_lng) -> BoundingBox:
+    """
+    Builds a validated box from e.g. query string values.  `min_lng` > `max_lng`
+    means the box crosses the antimeridian.
+    """
+    box = BoundingBox(float(min_lat), float(min_lng), float(max_lat), float(max_lng))
+
+    if not -90.0 <= box.min_lat <= box.max_lat <= 90.0:
+        raise ValueError(f"Invalid latitudes <{box.min_lat}, {box.max_lat}>")
+    if not (-180.0 <= box.min_lng <= 180.0 and -180.0 <= box.max_lng <= 180.0):
+        raise ValueError(f"Invalid longitudes <{box.min_lng}, {box.max_lng}>")
+    return box
+
+
+def encode(lat: float, lng: float, precision: int = DEFAULT_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            value, value_range = lng, lng_range
+        else:
+            value, value_range = lat, lat_range
+
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits <<= 1
+            value_range[1] = mid
+
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """
+    (height in degrees latitude, width in degrees longitude) of a cell.
+    """
+    total_bits = 5 * precision
+    lng_bits = math.ceil(total_bits / 2)
+    lat_bits = total_bits // 2
+    return 180.0 / 2**lat_bits, 360.0 / 2**lng_bits
+
+
+def _to_int(geohash: str) -> int:
+    value = 0
+    for char in geohash:
+        value = value * 32 + _DECODE[char]
+    return value
+
+
+def _cells(box: BoundingBox, precision: int) -> List[str]:
+    height, width = cell_size(precision)
+    row_start = math.floor((box.min_lat + 90.0) / height)
+    row_end = min(math.floor((box.max_lat + 90.0) / height), round(180.0 / height) - 1)
+    col_start = math.floor((box.min_lng + 180.0) / width)
+    col_end = min(math.floor((box.max_lng + 180.0) / width), round(360.0 / width) - 1)
+
+    return [
+        encode(
+            -90.0 + (row + 0.5) * height,
+            -180.0 + (col + 0.5) * width,
+            precision,
+        )
+        for row in range(row_start, row_end + 1)
+        for col in range(col_start, col_end + 1)
+    ]
+
+
+def _cell_count(box: BoundingBox, precision: int) -> int:
+    height, width = cell_size(precision)
+    rows = math.floor((box.max_lat + 90.0) / height) - math.floor(
+        (box.min_lat + 90.0) / height
+    )
+    cols = math.floor((box.max_lng + 180.0) / width) - math.floor(
+        (box.min_lng + 180.0) / width
+    )
+    return (rows + 1) * (cols + 1)
+
+
+def cover(
+    box: BoundingBox, max_cells: int = 32, max_precision: int = DEFAULT_PRECISION
+) -> List[Tuple[str, str]]:
+    """
+    Covers `box` with geohash cells and returns them as inclusive
+    (first prefix, last prefix) ranges of cells that are adjacent in sort order.
+
+    The finest precision that needs at most `max_cells` cells per side of the
+    antimeridian is used, so the cover hugs the box without turning into an
+    unbounded number of queries.
+    """
+    ranges: List[Tuple[str, str]] = []
+    for part in box.split_at_antimeridian():
+        precision = 1
+        while (
+            precision < max_precision and _cell_count(part, precision + 1) <= max_cells
+        ):
+            precision += 1
+
+        cells = sorted(set(_cells(part, precision)))
+        start = previous = cells[0]
+        for cell in cells[1:]:
+            if _to_int(cell) != _to_int(previous) + 1:
+                ranges.append((start, previous))
+                start = cell
+            previous = cell
+        ranges.append((start, previous))
+
+    return ranges
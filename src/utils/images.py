@@ -0,0 +1,122 @@
+"""
+Resized, re-encoded variants ("derivatives") of uploaded photos.
+
+An original is decoded once and every derivative is rendered from that decoded
+image, in parallel.  Pillow releases the GIL while it resizes and encodes, so a
+thread pool keeps several cores busy without pickling images between processes
+(Lambda also lacks the /dev/shm that `multiprocessing` pools need).  Any
+`concurrent.futures.Executor` can be passed in instead.
+"""
+import io
+from concurrent.futures import Executor
+from functools import partial
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from PIL import Image, ImageOps
+
+# Bump when the specs change, so new derivatives get new keys instead of
+# overwriting ones that clients may have cached
+DERIVATIVES_VERSION = 1
+
+
+class DerivativeSpec(NamedTuple):
+    name: str
+    # Longest edge in pixels.  Images are only ever scaled down.
+    max_size: int
+    format: str
+    quality: int
+
+    @property
+    def extension(self) -> str:
+        return _EXTENSIONS[self.format]
+
+    @property
+    def content_type(self) -> str:
+        return _CONTENT_TYPES[self.format]
+
+
+_EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+_CONTENT_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+DERIVATIVES: Tuple[DerivativeSpec, ...] = (
+    # Map markers and list rows
+    DerivativeSpec("thumbnail", 160, "WEBP", 70),
+    # Place details on a phone
+    DerivativeSpec("small", 640, "WEBP", 75),
+    # Full screen viewing
+    DerivativeSpec("large", 1600, "JPEG", 82),
+)
+
+
+class Derivative(NamedTuple):
+    spec: DerivativeSpec
+    body: bytes
+    width: int
+    height: int
+
+
+class UnsupportedImageError(ValueError):
+    pass
+
+
+def decode(data: bytes, max_size: int) -> Image.Image:
+    """
+    Decodes an original and applies its EXIF orientation.  JPEGs are decoded
+    straight to the smallest scale (1/2, 1/4 or 1/8) that still covers
+    `max_size`, which skips most of the work for large phone photos.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.draft("RGB", _fit(image.size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except Image.UnidentifiedImageError as e:
+        raise UnsupportedImageError("Not a supported image format") from e
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+        raise UnsupportedImageError(str(e)) from e
+    return image
+
+
+def _fit(size: Tuple[int, int], max_size: int) -> Tuple[int, int]:
+    width, height = size
+    scale = min(1.0, max_size / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _mode_for(image: Image.Image, format: str) -> str:
+    has_alpha = image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+    # JPEG has no alpha channel
+    return "RGBA" if has_alpha and format != "JPEG" else "RGB"
+
+
+def render(image: Image.Image, spec: DerivativeSpec) -> Derivative:
+    """
+    Scales a decoded image down to `spec` and encodes it.  Metadata (EXIF, GPS)
+    is not carried over.
+    """
+    size = _fit(image.size, spec.max_size)
+    mode = _mode_for(image, spec.format)
+    resized = image.convert(mode) if image.mode != mode else image
+    if size != resized.size:
+        # `reducing_gap` shrinks by whole factors first, then resamples
+        resized = resized.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+    output = io.BytesIO()
+    resized.save(output, format=spec.format, quality=spec.quality)
+    return Derivative(spec, output.getvalue(), *size)
+
+
+def render_all(
+    data: bytes,
+    specs: Sequence[DerivativeSpec] = DERIVATIVES,
+    executor: Optional[Executor] = None,
+) -> List[Derivative]:
+    """
+    Decodes `data` once and renders every spec, on `executor` if given.
+    """
+    image = decode(data, max(spec.max_size for spec in specs))
+    if executor is None:
+        return [render(image, spec) for spec in specs]
+    return list(executor.map(partial(render, image), specs))
@@ -0,0 +1,365 @@
+"""
+Per-invocation timings and counters, emitted as CloudWatch Embedded Metric
+Format (EMF) log lines and, optionally, X-Ray subsegments.
+
+    @instrumented("places.get")
+    @event_source(data_class=APIGatewayProxyEvent)
+    def lambda_handler(event, context):
+        with span("serialize"):
+            ...
+        count("items", query.count)
+
+Each phase is reported as its *own* time, excluding the phases nested inside
+it, so the phases of an invocation add up to (at most) its duration.  Every AWS
+call made through a registry client is a phase of its own, e.g.
+`aws.dynamodb.Query`, timed by botocore event hooks.
+
+Metrics are turned on with `METRICS_ENABLED=true` and X-Ray subsegments with
+`XRAY_ENABLED=true`.  When both are off, `instrumented` returns the handler
+unchanged and `span`/`count` return straight away.
+"""
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+from utils.environment import EnvironmentVariables, env_flag
+
+NAMESPACE = "ScrapMap"
+
+
+class Units:
+    MILLISECONDS = "Milliseconds"
+    COUNT = "Count"
+    BYTES = "Bytes"
+
+
+class _Span:
+    __slots__ = ("name", "start", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        # Time spent in spans nested inside this one
+        self.children = 0.0
+
+
+class Invocation:
+    """
+    What one invocation of a handler recorded.  Spans are tracked per thread, so
+    work fanned out to a thread pool is timed too (its phases can then add up to
+    more than the wall time).
+    """
+
+    def __init__(self, handler: str):
+        self.handler = handler
+        self.start = time.perf_counter()
+        self.dimensions: Dict[str, str] = {"Handler": handler}
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.metrics: Dict[str, float] = defaultdict(float)
+        self.units: Dict[str, str] = {}
+        self.properties: Dict[str, object] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def push(self, name: str) -> _Span:
+        span = _Span(name)
+        self._stack().append(span)
+        return span
+
+    def pop(self, span: _Span):
+        stack = self._stack()
+        # Tolerate a span that was never closed (e.g. a call that raised before
+        # its after-call hook)
+        while stack:
+            if stack.pop() is span:
+                break
+        duration = time.perf_counter() - span.start
+        if stack:
+            stack[-1].children += duration
+        with self._lock:
+            self.phases[span.name] += (duration - span.children) * 1000
+
+    def add(self, name: str, value: float, unit: str):
+        with self._lock:
+            self.metrics[name] += value
+            self.units[name] = unit
+
+    def emf(self) -> Dict:
+        duration_ms = (time.perf_counter() - self.start) * 1000
+        values: Dict[str, float] = {"Duration": duration_ms}
+        units = {"Duration": Units.MILLISECONDS}
+        for name, ms in self.phases.items():
+            values[f"Phase.{name}"] = ms
+            units[f"Phase.{name}"] = Units.MILLISECONDS
+        values.update(self.metrics)
+        units.update(self.units)
+
+        dimensions = [["Handler"]]
+        if len(self.dimensions) > 1:
+            dimensions.append(list(self.dimensions))
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": NAMESPACE,
+                        "Dimensions": dimensions,
+                        "Metrics": [
+                            {"Name": name, "Unit": units[name]} for name in values
+                        ],
+                    }
+                ],
+            },
+            **self.properties,
+            **self.dimensions,
+            **values,
+        }
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+_current: Optional[Invocation] = None
+# Called with each invocation and its response just before the metrics are emitted
+_response_hooks: List[Callable[[Invocation, Dict], None]] = []
+_metrics_enabled = env_flag(EnvironmentVariables.METRICS_ENABLED.name)
+_xray_enabled = env_flag(EnvironmentVariables.XRAY_ENABLED.name)
+_xray_recorder = None
+_cold_start = True
+
+
+def configure(metrics: Optional[bool] = None, xray: Optional[bool] = None):
+    """
+    Overrides the environment, e.g. for benchmarks.  Applies to handlers
+    decorated (and clients created) afterwards.
+    """
+    global _metrics_enabled, _xray_enabled
+    if metrics is not None:
+        _metrics_enabled = metrics
+    if xray is not None:
+        _xray_enabled = xray
+
+
+def enabled() -> bool:
+    """
+    Whether handlers record invocations, which clients' event hooks can check.
+    """
+    return _metrics_enabled or _xray_enabled or bool(_response_hooks)
+
+
+def add_response_hook(hook: Callable[[Invocation, Dict], None]):
+    """
+    Registers `hook` to amend each response (e.g. add a header) from what the
+    invocation recorded.  Register before the handlers are decorated, i.e. at
+    import.
+    """
+    _response_hooks.append(hook)
+
+
+def _recorder():
+    global _xray_recorder
+    if _xray_recorder is None:
+        # Only imported when tracing is on; it is not free at cold start
+        from aws_xray_sdk.core import patch, xray_recorder
+
+        patch(["botocore"])
+        _xray_recorder = xray_recorder
+    return _xray_recorder
+
+
+class _TimedSpan:
+    __slots__ = ("_invocation", "_name", "_span", "_subsegment")
+
+    def __init__(self, invocation: Invocation, name: str):
+        self._invocation = invocation
+        self._name = name
+        self._subsegment = False
+
+    def __enter__(self):
+        self._span = self._invocation.push(self._name)
+        # The X-Ray context lives on the invocation's own thread
+        if _xray_enabled and threading.current_thread() is threading.main_thread():
+            _recorder().begin_subsegment(self._name)
+            self._subsegment = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._subsegment:
+            _recorder().end_subsegment()
+        self._invocation.pop(self._span)
+        return False
+
+
+def span(name: str):
+    """
+    Context manager timing a phase of the current invocation.
+    """
+    invocation = _current
+    if invocation is None:
+        return _NOOP
+    return _TimedSpan(invocation, name)
+
+
+def count(name: str, value: float = 1):
+    invocation = _current
+    if invocation is not None:
+        invocation.add(name, value, Units.COUNT)
+
+
+def size(name: str, value: int):
+    """
+    Records a payload size in bytes.
+    """
+    invocation = _current
+    if invocation is not None:
+        invocation.add(name, value, Units.BYTES)
+
+
+def set_dimension(name: str, value: str):
+    """
+    Adds a low-cardinality dimension (e.g. the route) to the invocation's metrics.
+    """
+    invocation = _current
+    if invocation is not None:
+        invocation.dimensions[name] = value
+
+
+def set_property(name: str, value):
+    """
+    Attaches a searchable value to the EMF line that is not a metric dimension.
+    """
+    invocation = _current
+    if invocation is not None:
+        invocation.properties[name] = value
+
+
+# --- botocore hooks -----------------------------------------------------------
+
+_SPAN_KEY = "instrumentation_span"
+
+
+def _before_call(model, context, **kwargs):
+    invocation = _current
+    if invocation is not None:
+        name = f"aws.{model.service_model.service_name}.{model.name}"
+        context[_SPAN_KEY] = (invocation, invocation.push(name))
+
+
+def _after_call(context, **kwargs):
+    started = context.pop(_SPAN_KEY, None)
+    if started is not None:
+        invocation, started_span = started
+        invocation.pop(started_span)
+
+
+def instrument_events(events):
+    """
+    Times every call made through a client with the given event emitter
+    (`client.meta.events`).
+    """
+    if not _metrics_enabled:
+        return
+    events.register("before-call", _before_call, unique_id="instrumentation-before")
+    events.register("after-call", _after_call, unique_id="instrumentation-after")
+    events.register(
+        "after-call-error", _after_call, unique_id="instrumentation-after-error"
+    )
+
+
+# --- Handlers -----------------------------------------------------------------
+
+
+def _emit(invocation: Invocation):
+    # Lambda sends stdout to CloudWatch Logs, which extracts the metrics
+    sys.stdout.write(json.dumps(invocation.emf(), default=str) + "\n")
+    sys.stdout.flush()
+
+
+def _user(event) -> Optional[str]:
+    if not isinstance(event, dict):
+        return None
+    request_context = event.get("requestContext") or {}
+    claims = (request_context.get("authorizer") or {}).get("claims") or {}
+    return claims.get("cognito:username") or (
+        event.get("queryStringParameters") or {}
+    ).get("user")
+
+
+def _response_size(response) -> int:
+    if isinstance(response, dict) and isinstance(response.get("body"), str):
+        return len(response["body"])
+    return 0
+
+
+def instrumented(handler_name: str) -> Callable:
+    """
+    Decorator for a `lambda_handler`: records the invocation's duration, cold
+    start, status code and payload sizes alongside its phases, and emits them
+    when it returns.  A handler called from inside another instrumented handler
+    adds its phases to the caller's invocation.
+    """
+
+    def decorator(handler: Callable) -> Callable:
+        if not enabled():
+            return handler
+
+        @wraps(handler)
+        def wrapper(event, context):
+            global _current, _cold_start
+            if _current is not None:
+                # Called by another instrumented handler (e.g. a router), which
+                # records the invocation
+                return handler(event, context)
+
+            invocation = _current = Invocation(handler_name)
+            if _cold_start:
+                invocation.add("ColdStart", 1, Units.COUNT)
+                _cold_start = False
+            if isinstance(event, dict) and isinstance(event.get("body"), str):
+                invocation.add("RequestBytes", len(event["body"]), Units.BYTES)
+            if context is not None and hasattr(context, "aws_request_id"):
+                invocation.properties["RequestId"] = context.aws_request_id
+            user = _user(event)
+            if user is not None:
+                # A property rather than a dimension: there are too many users
+                invocation.properties["User"] = user
+
+            response = None
+            try:
+                with _TimedSpan(invocation, "handler"):
+                    response = handler(event, context)
+                return response
+            finally:
+                if isinstance(response, dict) and "statusCode" in response:
+                    invocation.properties["StatusCode"] = response["statusCode"]
+                    invocation.add(
+                        f"Status{str(response['statusCode'])[0]}xx", 1, Units.COUNT
+                    )
+                invocation.add("ResponseBytes", _response_size(response), Units.BYTES)
+                if isinstance(response, dict):
+                    for hook in _response_hooks:
+                        hook(invocation, response)
+                _current = None
+                if _metrics_enabled:
+                    _emit(invocation)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,180 @@
+"""
+What the handlers log about each request.
+
+Every request gets a one line summary (route, query parameters, body size),
+which is only rendered if the record is actually emitted.  The full event is
+logged for a sample of requests (`LOG_SAMPLE_RATE`, 0 to 1, default 0) and,
+once, alongside the first error logged while handling a request.  Full events
+are redacted (passwords, tokens, authorization headers, including inside JSON
+bodies) and capped in size as they are rendered.
+"""
+import base64
+import binascii
+import json
+import logging
+import os
+import random
+from typing import Any, Callable, Dict, Optional
+
+from utils.environment import EnvironmentVariables
+
+REDACTED = "***"
+# Matched case-insensitively against keys at any depth
+SECRET_KEYS = frozenset(
+    {
+        "authorization",
+        "cookie",
+        "password",
+        "new_password",
+        "previous_password",
+        "proposed_password",
+        "secret_hash",
+        # One-time codes: sign-up confirmation, password reset, MFA challenges
+        "code",
+        "confirmation_code",
+        "sms_mfa_code",
+        "software_token_mfa_code",
+        "access_token",
+        "id_token",
+        "refresh_token",
+        "session",
+        "x-amz-security-token",
+    }
+)
+MAX_SUMMARY_CHARS = 512
+MAX_PAYLOAD_CHARS = 16 * 1024
+
+
+def _sample_rate() -> float:
+    try:
+        rate = float(os.environ.get(EnvironmentVariables.LOG_SAMPLE_RATE.name, 0))
+    except ValueError:
+        return 0.0
+    return min(max(rate, 0.0), 1.0)
+
+
+_sample_rate_value = _sample_rate()
+
+
+class Lazy:
+    """
+    Defers building a log argument until the record is formatted, so nothing is
+    rendered for records below the logger's level.
+    """
+
+    __slots__ = ("_render",)
+
+    def __init__(self, render: Callable[[], str]):
+        self._render = render
+
+    def __str__(self) -> str:
+        return self._render()
+
+
+def truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... ({len(text)} chars)"
+
+
+def redact(value: Any) -> Any:
+    """
+    A copy of `value` with the values of `SECRET_KEYS` replaced.  Strings that
+    hold a JSON object or array (e.g. a proxy event's body) are redacted too.
+    """
+    if isinstance(value, dict):
+        return {
+            key: (
+                REDACTED
+                if isinstance(key, str) and key.lower() in SECRET_KEYS
+                else redact(item)
+            )
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    if isinstance(value, str) and value[:1] in ("{", "["):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            return value
+        return json.dumps(redact(parsed))
+    return value
+
+
+def summarize_event(event: Dict) -> Dict:
+    """
+    The parts of an API Gateway proxy event worth logging for every request.
+    """
+    request_context = event.get("requestContext") or {}
+    claims = (request_context.get("authorizer") or {}).get("claims") or {}
+    body = event.get("body") or ""
+    return {
+        "method": event.get("httpMethod"),
+        "resource": event.get("resource") or event.get("path"),
+        "query": redact(event.get("queryStringParameters")),
+        "body_bytes": len(body),
+        "base64": bool(event.get("isBase64Encoded")),
+        "user": claims.get("cognito:username"),
+        "request_id": request_context.get("requestId"),
+    }
+
+
+def _render_summary(event: Dict) -> str:
+    return truncate(json.dumps(summarize_event(event), default=str), MAX_SUMMARY_CHARS)
+
+
+def _decoded(event: Dict) -> Dict:
+    # The API treats every media type as binary, so bodies usually arrive base64
+    # encoded and would otherwise slip past redaction
+    if not (event.get("isBase64Encoded") and event.get("body")):
+        return event
+    try:
+        body = base64.b64decode(event["body"]).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        return dict(event, body=REDACTED)
+    return dict(event, body=body, isBase64Encoded=False)
+
+
+def _render_payload(event: Dict) -> str:
+    return truncate(json.dumps(redact(_decoded(event)), default=str), MAX_PAYLOAD_CHARS)
+
+
+class EventOnError(logging.Filter):
+    """
+    Appends the request's full event to the first error record of the request.
+    `log_event` adds it to the handler's logger; loggers that log errors on a
+    handler's behalf (e.g. a router's) can add it themselves.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.event: Optional[Dict] = None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR and self.event is not None:
+            record.msg = f"{record.getMessage()}\nEvent: {_render_payload(self.event)}"
+            record.args = ()
+            self.event = None
+        return True
+
+
+event_on_error = EventOnError()
+
+
+def log_event(logger: logging.Logger, event: Dict, sample_rate: Optional[float] = None):
+    """
+    Logs the summary of a proxy event, and the full event if the request is
+    sampled.  Until the next call, the first error `logger` logs carries the full
+    event.
+    """
+    if sample_rate is None:
+        sample_rate = _sample_rate_value
+    logger.addFilter(event_on_error)
+    event_on_error.event = event
+
+    logger.info("Request: %s", Lazy(lambda: _render_summary(event)))
+    if sample_rate > 0 and random.random() < sample_rate:
+        logger.info("Event: %s", Lazy(lambda: _render_payload(event)))
+        # Already logged in full
+        event_on_error.event = None
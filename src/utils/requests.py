@@ -11,6 +11,10 @@ CHANGE_PASSWORD_URL = f"{AUTH_URL}/change_password"
 RESPOND_TO_AUTH_CHALLENGE_URL = f"{AUTH_URL}/respond_to_auth_challenge"
 RESEND_VERIFICATION_CODE_URL = f"{AUTH_URL}/resend_verification_code"
 
+PLACES_URL = V1_BASE_URL + "/places"
+DESTINATIONS_URL = V1_BASE_URL + "/destinations"
+MAP_URL = V1_BASE_URL + "/map"
+
 
 class AuthBodyFields:
     USERNAME = "username"
@@ -0,0 +1,167 @@
+"""
+Minimal router for API Gateway proxy events.
+
+Routes are matched on (method, path) straight from the event, and the module
+that implements a route can be registered by name so it is only imported the
+first time that route is called.  Nothing here imports more than the standard
+library (the `utils` modules it uses included), which keeps the cold start of a
+multi-route function small.
+"""
+import base64
+import importlib
+import json
+import logging
+from logging import Logger
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from utils.circuit_breaker import CircuitOpenError
+from utils.instrumentation import set_dimension
+from utils.log_policy import event_on_error
+
+logger = logging.getLogger(__name__)
+# Route errors are logged here, with the request's event when it was not sampled
+logger.addFilter(event_on_error)
+
+
+class Methods:
+    GET = "GET"
+    POST = "POST"
+    DELETE = "DELETE"
+
+
+class BadRequestError(Exception):
+    pass
+
+
+class Request:
+    def __init__(self, event: Dict, context=None):
+        self.event = event
+        self.context = context
+        self.method: str = event.get("httpMethod", "")
+        self.path: str = _normalize_path(event.get("path", ""))
+        # The API Gateway resource the request matched, e.g. "/places/{id}"
+        self.resource: str = _normalize_path(event.get("resource") or self.path)
+        self.headers: Dict[str, str] = {
+            name.lower(): value for name, value in (event.get("headers") or {}).items()
+        }
+        self.query: Dict[str, str] = event.get("queryStringParameters") or {}
+        self._json = None
+
+    @property
+    def body(self) -> str:
+        body = self.event.get("body") or ""
+        if self.event.get("isBase64Encoded"):
+            return base64.b64decode(body).decode("utf-8")
+        return body
+
+    @property
+    def json(self):
+        if self._json is None:
+            try:
+                self._json = json.loads(self.body)
+            except ValueError:
+                raise BadRequestError("The request body is not valid JSON")
+        return self._json
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.headers.get(name.lower(), default)
+
+
+def _normalize_path(path: str) -> str:
+    return path.rstrip("/") or "/"
+
+
+def make_response(status: int, body: str, headers: Optional[Dict] = None) -> Dict:
+    return {
+        "statusCode": status,
+        "headers": dict({"Content-Type": "application/json"}, **(headers or {})),
+        "body": body,
+    }
+
+
+def make_exception(
+    status: int, msg: str, logger: Logger = None, headers: Optional[Dict] = None
+) -> Dict:
+    if logger:
+        logger.exception(msg)
+    return make_response(status, json.dumps({"message": msg}), headers)
+
+
+def service_unavailable(error: CircuitOpenError) -> Dict:
+    logger.warning("Failing fast: %s", error)
+    return make_exception(
+        503, "Service Unavailable", headers={"Retry-After": error.retry_after_header}
+    )
+
+
+RouteKey = Tuple[str, str]
+
+
+class Router:
+    def __init__(self, match_resource: bool = False):
+        """
+        Routes on the request path, or on the API Gateway resource when
+        `match_resource` is set, which stays the same under a custom domain's base
+        path and for paths with parameters.
+        """
+        self._match_resource = match_resource
+        self._handlers: Dict[RouteKey, Callable[[Request], Dict]] = {}
+        self._modules: Dict[RouteKey, str] = {}
+
+    def route(self, path: str, methods: Iterable[str]):
+        """
+        Decorator registering the function as the handler for `path`.  The
+        function is called with the `Request` and returns a proxy response.
+        """
+
+        def decorator(handler: Callable[[Request], Dict]):
+            for method in methods:
+                self._handlers[(method, _normalize_path(path))] = handler
+            return handler
+
+        return decorator
+
+    def lazy(self, path: str, methods: Iterable[str], module: str):
+        """
+        Declares that `module` registers the handler for `path` when imported,
+        deferring the import until the route is first requested.
+        """
+        for method in methods:
+            self._modules[(method, _normalize_path(path))] = module
+
+    def _resolve(self, key: RouteKey) -> Optional[Callable[[Request], Dict]]:
+        handler = self._handlers.get(key)
+        if handler is None and key in self._modules:
+            importlib.import_module(self._modules[key])
+            handler = self._handlers.get(key)
+            if handler is None:
+                raise RuntimeError(
+                    f"Module <{self._modules[key]}> did not register {key}"
+                )
+        return handler
+
+    def _paths(self):
+        return {path for _, path in self._handlers} | {
+            path for _, path in self._modules
+        }
+
+    def dispatch(self, event: Dict, context=None) -> Dict:
+        request = Request(event, context)
+        path = request.resource if self._match_resource else request.path
+        handler = self._resolve((request.method, path))
+        if handler is None:
+            if path in self._paths():
+                return make_exception(405, "Method Not Allowed")
+            return make_exception(404, "Not Found")
+
+        # Only known routes, so the dimension's values stay few
+        set_dimension("Route", f"{request.method} {path}")
+
+        try:
+            return handler(request)
+        except BadRequestError as e:
+            return make_exception(400, str(e), logger)
+        except CircuitOpenError as e:
+            return service_unavailable(e)
+        except Exception:
+            return make_exception(500, "Server Error", logger)
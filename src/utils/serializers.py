@@ -0,0 +1,165 @@
+"""
+JSON serialization for DynamoDB results.
+
+boto3 hands every number back as a `Decimal`, which `DecimalEncoder` turns into
+a JSON *string*.  Here numbers are written as JSON numbers instead.  The GET
+handlers read through `NativeNumberDeserializer`, so their numbers are already
+`int`s and `float`s and the C encoder never calls back into Python for them.
+A `Decimal` that is left (e.g. from a resource that still returns them) becomes
+an `int` or `float` whenever that is lossless, and only a chunk containing a
+decimal a float cannot represent exactly is re-written by a slower writer that
+emits the decimal digits verbatim.
+"""
+import io
+import itertools
+import json
+from decimal import Decimal
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+# Any decimal with at most 15 significant digits survives a round trip through
+# an IEEE 754 double; a decimal point plus 15 digits is at most 16 characters
+_FLOAT_SAFE_LENGTH = 16
+
+# Items are encoded in chunks to amortize the cost of each C encoder call while
+# keeping memory bounded
+_CHUNK_SIZE = 256
+
+COLUMNAR_CONTENT_TYPE = "application/vnd.scrapmap.columnar+json"
+
+
+class _ExactDecimalRequired(Exception):
+    pass
+
+
+def native_number(text: str) -> Optional[Union[int, float]]:
+    """
+    The `int` or `float` a decimal string stands for, or None if a float would
+    not represent it exactly.
+    """
+    if "." not in text and "E" not in text and "e" not in text:
+        return int(text)
+    if len(text) <= _FLOAT_SAFE_LENGTH and "E" not in text and "e" not in text:
+        return float(text)
+    return None
+
+
+def _to_number(o):
+    if isinstance(o, Decimal):
+        number = native_number(str(o))
+        if number is None:
+            raise _ExactDecimalRequired()
+        return number
+    # String and number sets come back from DynamoDB as python sets
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+_encode = json.JSONEncoder(
+    separators=(",", ":"), check_circular=False, default=_to_number
+).encode
+
+
+def _write_exact(value, write: Callable[[str], Any]):
+    if isinstance(value, Decimal):
+        write(str(value))
+    elif isinstance(value, dict):
+        write("{")
+        for index, (k, v) in enumerate(value.items()):
+            if index:
+                write(",")
+            write(encode_basestring_ascii(str(k)))
+            write(":")
+            _write_exact(v, write)
+        write("}")
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        write("[")
+        for index, v in enumerate(value):
+            if index:
+                write(",")
+            _write_exact(v, write)
+        write("]")
+    else:
+        write(_encode(value))
+
+
+def dumps(value) -> str:
+    try:
+        return _encode(value)
+    except _ExactDecimalRequired:
+        buffer = io.StringIO()
+        _write_exact(value, buffer.write)
+        return buffer.getvalue()
+
+
+def serialize_items(items: Iterable[Dict]) -> str:
+    """
+    Writes items into a JSON array a chunk at a time, so a lazily paginated query
+    can be serialized without first materializing every item in a list.
+    """
+    buffer = io.StringIO()
+    write = buffer.write
+    write("[")
+
+    iterator = iter(items)
+    first = True
+    while True:
+        chunk = list(itertools.islice(iterator, _CHUNK_SIZE))
+        if not chunk:
+            break
+
+        encoded = dumps(chunk)
+        # Drop the chunk's own brackets, the items are joined into one array
+        if len(encoded) > 2:
+            if not first:
+                write(",")
+            write(encoded[1:-1])
+            first = False
+
+    write("]")
+    return buffer.getvalue()
+
+
+def _to_decimal(value):
+    if isinstance(value, str):
+        try:
+            number = Decimal(value)
+        except ArithmeticError:
+            return value
+        if number.is_finite():
+            return number
+    return value
+
+
+def serialize_columnar(
+    entities: Iterable[Dict], numeric_keys: Sequence[str] = ("latitude", "longitude")
+) -> str:
+    """
+    Writes entities as `{"count": n, "keys": [...], "columns": [[...], ...]}`,
+    with the values of `keys[i]` for every entity in `columns[i]` (null where an
+    entity lacks the key), so attribute names are written once rather than once
+    per entity.  Values of `numeric_keys` stored as strings are written as
+    numbers.
+    """
+    keys: List[str] = []
+    columns: List[List] = []
+    key_indexes: Dict[str, int] = {}
+    count = 0
+
+    for entity in entities:
+        for key in entity:
+            if key not in key_indexes:
+                key_indexes[key] = len(keys)
+                keys.append(key)
+                columns.append([None] * count)
+        for key, column in zip(keys, columns):
+            column.append(entity.get(key))
+        count += 1
+
+    for key in numeric_keys:
+        if key in key_indexes:
+            index = key_indexes[key]
+            columns[index] = [_to_decimal(value) for value in columns[index]]
+
+    return dumps({"count": count, "keys": keys, "columns": columns})
@@ -0,0 +1,213 @@
+"""
+Renders the derivatives of each uploaded photo when S3 reports the original.
+
+Derivatives are written under deterministic keys and tagged with the ETag of the
+original they were rendered from, so a retried or duplicated event only renders
+what is missing or stale, and records the same metadata on the PHOTO item.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Sequence
+from urllib.parse import unquote_plus
+
+from botocore.exceptions import ClientError
+from aws_lambda_powertools.utilities.data_classes import S3Event, event_source
+
+from models.v1.photo import (
+    DERIVATIVE_KEY_FORMAT,
+    DERIVATIVES_OF_PHOTO_FORMAT,
+    parse_photo_key,
+)
+from utils.boto3.dynamo import SortKeyFormatStrings, update_entity
+from utils.boto3.s3 import delete_prefix, s3_config
+from utils.boto3.sts_session import session_registry
+from utils.environment import EnvironmentVariables, validate_environment
+from utils.instrumentation import count, instrumented, span
+from utils.images import (
+    DERIVATIVES,
+    DERIVATIVES_VERSION,
+    DerivativeSpec,
+    UnsupportedImageError,
+    render_all,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel("INFO")
+
+required_env_vars = [
+    EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name,
+    EnvironmentVariables.DYNAMO_TABLE_NAME.name,
+    EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name,
+]
+
+# Object metadata linking a derivative to the original it was rendered from
+SOURCE_ETAG = "source-etag"
+
+# Shared by every invocation of a warm container.  Renders derivatives in
+# parallel (see utils.images) and overlaps the S3 requests for them.
+executor = ThreadPoolExecutor(max_workers=max(4, len(DERIVATIVES)))
+
+
+def _derivative_metadata(spec: DerivativeSpec, key: str, width, height, size) -> Dict:
+    return {
+        "key": key,
+        "content_type": spec.content_type,
+        "width": int(width),
+        "height": int(height),
+        "size": int(size),
+    }
+
+
+def _existing(s3, bucket: str, key: str, spec: DerivativeSpec, etag: str):
+    """
+    Metadata of a derivative already rendered from this version of the original.
+    """
+    try:
+        head = s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    metadata = head.get("Metadata", {})
+    if metadata.get(SOURCE_ETAG) != etag:
+        return None
+    return _derivative_metadata(
+        spec, key, metadata["width"], metadata["height"], head["ContentLength"]
+    )
+
+
+def process_photo(
+    s3,
+    table,
+    bucket: str,
+    key: str,
+    etag: str,
+    specs: Sequence[DerivativeSpec] = DERIVATIVES,
+) -> Optional[Dict]:
+    """
+    Renders the derivatives of the original at `key` that are missing or stale,
+    and records all of them on its PHOTO item.  Returns the recorded metadata, or
+    None if `key` is not an original.
+    """
+    parsed = parse_photo_key(key)
+    if parsed is None:
+        logger.info("Not a photo: %s", key)
+        return None
+    user, place_id, photo_id = parsed
+
+    keys = {
+        spec.name: DERIVATIVE_KEY_FORMAT.format(
+            user=user,
+            place_id=place_id,
+            photo_id=photo_id,
+            version=DERIVATIVES_VERSION,
+            name=spec.name,
+            extension=spec.extension,
+        )
+        for spec in specs
+    }
+    existing = dict(
+        zip(
+            keys,
+            executor.map(
+                lambda spec: _existing(s3, bucket, keys[spec.name], spec, etag), specs
+            ),
+        )
+    )
+    missing = [spec for spec in specs if existing[spec.name] is None]
+    logger.info("%s: %d of %d derivatives to render", key, len(missing), len(specs))
+    count("DerivativesRendered", len(missing))
+
+    fields: Dict = {}
+    if missing:
+        # The original is read once, however many derivatives are missing
+        original = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+        try:
+            with span("render"):
+                derivatives = render_all(original, missing, executor)
+        except UnsupportedImageError as e:
+            # Retrying will not help, so record why and let the event go
+            logger.warning("Cannot render %s: %s", key, e)
+            derivatives = []
+            fields["derivatives_error"] = str(e)
+
+        def upload(derivative):
+            spec = derivative.spec
+            s3.put_object(
+                Bucket=bucket,
+                Key=keys[spec.name],
+                Body=derivative.body,
+                ContentType=spec.content_type,
+                # Keys change whenever the content could, see DERIVATIVES_VERSION
+                CacheControl="private, max-age=31536000, immutable",
+                Metadata={
+                    SOURCE_ETAG: etag,
+                    "width": str(derivative.width),
+                    "height": str(derivative.height),
+                },
+            )
+            return _derivative_metadata(
+                spec,
+                keys[spec.name],
+                derivative.width,
+                derivative.height,
+                len(derivative.body),
+            )
+
+        for derivative, metadata in zip(derivatives, executor.map(upload, derivatives)):
+            existing[derivative.spec.name] = metadata
+
+    fields["derivatives"] = {
+        name: metadata for name, metadata in existing.items() if metadata is not None
+    }
+    updated = update_entity(
+        table,
+        user,
+        SortKeyFormatStrings.PHOTO.format(place_id=place_id, photo_id=photo_id),
+        fields,
+    )
+    if not updated:
+        # Deleted (e.g. with its place) while the upload was completing, so
+        # nothing refers to these objects any more
+        logger.info("Photo %s no longer exists, deleting its objects", photo_id)
+        s3.delete_object(Bucket=bucket, Key=key)
+        delete_prefix(
+            s3,
+            bucket,
+            DERIVATIVES_OF_PHOTO_FORMAT.format(
+                user=user, place_id=place_id, photo_id=photo_id
+            ),
+        )
+    return fields
+
+
+@instrumented("photos.derivatives")
+@event_source(data_class=S3Event)
+def lambda_handler(event: S3Event, context):
+    logger.info("Validating Environment Variables")
+    env = os.environ
+    validate_environment(env, required_env_vars)
+
+    dynamo = session_registry.resource(
+        "dynamodb",
+        role_arn=env[EnvironmentVariables.DYNAMO_WRITE_ROLE_ARN.name],
+        role_session_name="RENDER_PHOTO_DERIVATIVES",
+    )
+    table = dynamo.Table(env[EnvironmentVariables.DYNAMO_TABLE_NAME.name])
+
+    endpoint_url = env.get(EnvironmentVariables.S3_ENDPOINT_URL.name)
+    s3 = session_registry.client(
+        "s3",
+        role_arn=env[EnvironmentVariables.PHOTO_BUCKET_ROLE_ARN.name],
+        role_session_name="RENDER_PHOTO_DERIVATIVES",
+        endpoint_url=endpoint_url,
+        config=s3_config(endpoint_url),
+    )
+
+    # Errors propagate so Lambda retries the event, which is safe to repeat
+    for record in event.records:
+        # Keys in S3 events are URL encoded
+        key = unquote_plus(record.s3.get_object.key)
+        etag = record.s3.get_object.etag
+        process_photo(s3, table, record.s3.bucket.name, key, etag)
@@ -0,0 +1,77 @@
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from utils.boto3.dynamo import Indexes, ScrapMapDDBSchema
+
+BUCKET = "scrap-map-photos-test"
+
+
+@pytest.fixture(autouse=True)
+def aws_environment(monkeypatch):
+    """
+    Fake credentials and a region, so no test can reach a real account.
+    """
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-west-2")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    monkeypatch.setenv("AWS_CONFIG_FILE", os.devnull)
+    monkeypatch.setenv("AWS_SHARED_CREDENTIALS_FILE", os.devnull)
+
+
+@pytest.fixture
+def aws(aws_environment):
+    """
+    Every AWS call of the test goes to moto.
+    """
+    with mock_aws():
+        yield
+
+
+@pytest.fixture
+def table(aws):
+    """
+    The single table, with its indexes.
+    """
+    key_schema = [
+        {"AttributeName": ScrapMapDDBSchema.PK, "KeyType": "HASH"},
+        {"AttributeName": ScrapMapDDBSchema.SK, "KeyType": "RANGE"},
+    ]
+    indexes = {
+        Indexes.GEO: ScrapMapDDBSchema.GeoSK,
+        Indexes.CHANGES: ScrapMapDDBSchema.ChangeSK,
+    }
+    key_attributes = [ScrapMapDDBSchema.PK, ScrapMapDDBSchema.SK]
+    key_attributes.extend(indexes.values())
+    boto3.client("dynamodb").create_table(
+        TableName="scrap-map-test",
+        KeySchema=key_schema,
+        AttributeDefinitions=[
+            {"AttributeName": name, "AttributeType": "S"} for name in key_attributes
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": index,
+                "KeySchema": [
+                    key_schema[0],
+                    {"AttributeName": sort_key, "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            }
+            for index, sort_key in indexes.items()
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return boto3.resource("dynamodb").Table("scrap-map-test")
+
+
+@pytest.fixture
+def s3(aws):
+    client = boto3.client("s3")
+    client.create_bucket(
+        Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "us-west-2"}
+    )
+    return client
@@ -0,0 +1,96 @@
+from decimal import Decimal
+
+import pytest
+
+from utils import geohash
+from utils.boto3.backfill import backfill_index_keys
+from utils.boto3.dynamo import (
+    ScrapMapDDBSchema,
+    SortKeyFormatStrings,
+    SortKeyPrefixes,
+    create_record,
+    get_version,
+    query_changes,
+    query_geohash_ranges,
+)
+
+USER = "user-1"
+PLACE_SK = SortKeyFormatStrings.PLACE.format(place_id="place-1")
+DESTINATION_SK = SortKeyFormatStrings.DESTINATION.format(place_id="destination-1")
+PHOTO_SK = SortKeyFormatStrings.PHOTO.format(place_id="place-1", photo_id="photo-1")
+LATITUDE, LONGITUDE = Decimal("39.78"), Decimal("-89.65")
+
+
+def _legacy_item(sk: str, entity) -> dict:
+    # What the handlers wrote before the indexes existed
+    return {ScrapMapDDBSchema.PK: USER, ScrapMapDDBSchema.SK: sk, "Entity": entity}
+
+
+@pytest.fixture
+def legacy(table):
+    located = {"latitude": LATITUDE, "longitude": LONGITUDE}
+    table.put_item(Item=_legacy_item(PLACE_SK, dict(located, place_id="place-1")))
+    table.put_item(
+        Item=_legacy_item(DESTINATION_SK, dict(located, place_id="destination-1"))
+    )
+    table.put_item(Item=_legacy_item(PHOTO_SK, {"photo_id": "photo-1"}))
+    return table
+
+
+def _in_viewport(table, prefix: str):
+    lat, lng = float(LATITUDE), float(LONGITUDE)
+    ranges = geohash.cover(geohash.BoundingBox(lat - 1, lng - 1, lat + 1, lng + 1))
+    return query_geohash_ranges(table, USER, prefix, ranges)
+
+
+def test_backfill_makes_legacy_items_visible_to_the_indexes(legacy):
+    assert _in_viewport(legacy, SortKeyPrefixes.PLACE) == []
+
+    result = backfill_index_keys(legacy)
+
+    assert (result.scanned, result.updated, result.skipped) == (3, 3, 0)
+    assert result.users == {USER}
+    assert [
+        item[ScrapMapDDBSchema.SK]
+        for item in _in_viewport(legacy, SortKeyPrefixes.PLACE)
+    ] == [PLACE_SK]
+    assert [
+        item[ScrapMapDDBSchema.SK]
+        for item in _in_viewport(legacy, SortKeyPrefixes.DESTINATION)
+    ] == [DESTINATION_SK]
+    assert [
+        item[ScrapMapDDBSchema.SK]
+        for item in query_changes(legacy, USER, SortKeyPrefixes.PHOTO, 0)
+    ] == [PHOTO_SK]
+    assert get_version(legacy, USER) == 1
+
+
+def test_backfill_is_idempotent(legacy):
+    backfill_index_keys(legacy)
+    stamped = legacy.get_item(Key={"PK": USER, "SK": PLACE_SK})["Item"]
+
+    result = backfill_index_keys(legacy)
+
+    assert result.updated == 0
+    assert legacy.get_item(Key={"PK": USER, "SK": PLACE_SK})["Item"] == stamped
+    # The version item itself is not an entity
+    assert get_version(legacy, USER) == 1
+
+
+def test_dry_run_changes_nothing(legacy):
+    result = backfill_index_keys(legacy, dry_run=True)
+
+    assert result.updated == 3
+    item = legacy.get_item(Key={"PK": USER, "SK": PLACE_SK})["Item"]
+    assert ScrapMapDDBSchema.GeoSK not in item
+    assert get_version(legacy, USER) == 0
+
+
+def test_backfill_leaves_current_items_alone(table):
+    current = create_record(
+        USER, PLACE_SK, {"latitude": LATITUDE, "longitude": LONGITUDE}
+    )
+    table.put_item(Item=current)
+
+    assert backfill_index_keys(table).updated == 0
+    assert table.get_item(Key={"PK": USER, "SK": PLACE_SK})["Item"] == current
@@ -0,0 +1,31 @@
+import pytest
+
+from utils import instrumentation
+from utils.cache import VersionedLRUCache
+
+
+@pytest.fixture
+def invocation(monkeypatch):
+    invocation = instrumentation.Invocation("test")
+    monkeypatch.setattr(instrumentation, "_current", invocation)
+    return invocation
+
+
+def test_evictions_are_counted_on_the_invocation(invocation):
+    cache = VersionedLRUCache(max_bytes=40, sizeof=lambda value: 10)
+    for key in range(6):
+        cache.put(key, 1, "value")
+
+    assert invocation.metrics["CacheEvictions"] == 2
+    assert cache.stats()["evictions"] == 2
+    assert cache.get(0, 1) is None
+    assert cache.get(5, 1) == "value"
+
+
+def test_puts_that_fit_count_no_evictions(invocation):
+    cache = VersionedLRUCache(max_bytes=40, sizeof=lambda value: 10)
+    for key in range(4):
+        cache.put(key, 1, "value")
+
+    assert "CacheEvictions" not in invocation.metrics
+    assert cache.stats()["entries"] == 4
@@ -0,0 +1,138 @@
+from typing import List
+
+import pytest
+from conftest import BUCKET
+
+from models.v1.photo import DERIVATIVE_KEY_FORMAT, PHOTO_KEY_FORMAT
+from utils.boto3.cascade import delete_place, places_with_photo_keys
+from utils.boto3.dynamo import (
+    ScrapMapDDBSchema,
+    SortKeyFormatStrings,
+    SortKeyPrefixes,
+    create_record,
+    create_tombstone,
+    delete_with_children,
+    query_entities,
+)
+
+USER = "user-1"
+
+
+def _put_place(table, s3, place_id: str, destination_id: str, photos: int):
+    table.put_item(
+        Item=create_record(
+            USER,
+            SortKeyFormatStrings.PLACE.format(place_id=place_id),
+            {"place_id": place_id, "destination_id": destination_id},
+        )
+    )
+    for index in range(photos):
+        photo_id = f"{place_id}-photo-{index}"
+        table.put_item(
+            Item=create_record(
+                USER,
+                SortKeyFormatStrings.PHOTO.format(place_id=place_id, photo_id=photo_id),
+                {"place_id": place_id, "photo_id": photo_id},
+            )
+        )
+        keys = {"user": USER, "place_id": place_id, "photo_id": photo_id}
+        s3.put_object(Bucket=BUCKET, Key=PHOTO_KEY_FORMAT.format(**keys), Body=b"o")
+        s3.put_object(
+            Bucket=BUCKET,
+            Key=DERIVATIVE_KEY_FORMAT.format(
+                **keys, version=1, name="thumb", extension="webp"
+            ),
+            Body=b"d",
+        )
+
+
+def _objects(s3) -> List[str]:
+    return [
+        item["Key"] for item in s3.list_objects_v2(Bucket=BUCKET).get("Contents", [])
+    ]
+
+
+def _live(table, prefix: str) -> List[str]:
+    return [item[ScrapMapDDBSchema.SK] for item in query_entities(table, USER, prefix)]
+
+
+@pytest.fixture
+def places(table, s3):
+    _put_place(table, s3, "place-1", "destination-1", photos=3)
+    _put_place(table, s3, "place-2", "destination-1", photos=1)
+    _put_place(table, s3, "place-3", "destination-2", photos=2)
+    return table
+
+
+def test_delete_place_takes_its_photos_and_objects(places, s3):
+    result = delete_place(places, places, s3, BUCKET, USER, "place-1")
+
+    assert (result.deleted, result.complete) == (4, True)
+    assert SortKeyFormatStrings.PLACE.format(place_id="place-1") not in _live(
+        places, SortKeyPrefixes.PLACE
+    )
+    assert _live(places, "PHOTO#place-1#") == []
+    assert len(_live(places, SortKeyPrefixes.PHOTO)) == 3
+    assert not any("/place-1/" in key for key in _objects(s3))
+    # Other places keep theirs
+    assert len(_objects(s3)) == 6
+
+
+def test_delete_place_without_photos(table, s3):
+    _put_place(table, s3, "place-1", "destination-1", photos=0)
+
+    assert delete_place(table, table, s3, BUCKET, USER, "place-1").deleted == 1
+    assert _live(table, SortKeyPrefixes.PLACE) == []
+    # Nothing is written for a place that does not exist
+    assert delete_place(table, table, s3, BUCKET, USER, "missing").deleted == 0
+
+
+def test_retried_delete_removes_objects_left_behind(places, s3):
+    # A delete that tombstoned the photos but not the place or the objects
+    for sk in _live(places, "PHOTO#place-1#"):
+        places.put_item(Item=create_tombstone(USER, sk))
+
+    result = delete_place(places, places, s3, BUCKET, USER, "place-1")
+
+    assert result.deleted == 1
+    assert not any("/place-1/" in key for key in _objects(s3))
+
+
+def test_destination_cascade_takes_the_photos_of_its_places(places, s3):
+    table = places
+    table.put_item(
+        Item=create_record(
+            USER,
+            SortKeyFormatStrings.DESTINATION.format(place_id="destination-1"),
+            {"place_id": "destination-1"},
+        )
+    )
+    place_keys = [
+        {ScrapMapDDBSchema.PK: USER, ScrapMapDDBSchema.SK: sk}
+        for sk in ("PLACE#place-1", "PLACE#place-2")
+    ]
+
+    result = delete_with_children(
+        table,
+        table,
+        {ScrapMapDDBSchema.PK: USER, ScrapMapDDBSchema.SK: "DESTINATION#destination-1"},
+        places_with_photo_keys(table, s3, BUCKET, USER, iter(place_keys)),
+    )
+
+    assert result.deleted == 7
+    assert _live(table, SortKeyPrefixes.PLACE) == ["PLACE#place-3"]
+    assert all(sk.startswith("PHOTO#place-3#") for sk in _live(table, "PHOTO#"))
+    assert all("/place-3/" in key for key in _objects(s3))
+    assert len(_objects(s3)) == 4
+
+
+def test_a_slash_in_a_place_id_reaches_no_other_place(places, s3):
+    # Its prefix, photos/user-1/place-1/place-1-photo-0/, holds place-1's objects
+    _put_place(places, s3, "place-1/place-1-photo-0", "destination-1", photos=0)
+    places.put_item(
+        Item=create_tombstone(USER, "PHOTO#place-1/place-1-photo-0#legacy-photo")
+    )
+
+    delete_place(places, places, s3, BUCKET, USER, "place-1/place-1-photo-0")
+
+    assert len(_objects(s3)) == 12
@@ -0,0 +1,178 @@
+import math
+from typing import Dict, List
+
+import boto3
+import pytest
+from boto3.dynamodb.conditions import Key
+
+from utils.boto3.dynamo import (
+    ScrapMapDDBSchema,
+    SortKeyFormatStrings,
+    SortKeyPrefixes,
+    create_record,
+    create_tombstone,
+    delete_with_children,
+    query_entities,
+)
+
+USER = "user-1"
+ENTITIES_PER_TYPE = 10
+
+
+def _item_size(item: Dict) -> int:
+    # Close enough to DynamoDB's item size for string-valued test items
+    def size(value) -> int:
+        if isinstance(value, dict):
+            return sum(len(name) + size(inner) for name, inner in value.items())
+        return len(str(value))
+
+    return size(item)
+
+
+def _read_units(items: List[Dict]) -> float:
+    # A Query is charged for every item it reads, filtered out or not: 0.5 RCU
+    # (eventually consistent) per started 4 KB of their combined size
+    return math.ceil(sum(_item_size(item) for item in items) / 4096) * 0.5
+
+
+@pytest.fixture
+def partition(table):
+    padding = "x" * 1000
+    for index in range(ENTITIES_PER_TYPE):
+        place_id = f"id-{index}"
+        for sk in (
+            SortKeyFormatStrings.DESTINATION.format(place_id=place_id),
+            SortKeyFormatStrings.PLACE.format(place_id=place_id),
+            SortKeyFormatStrings.PHOTO.format(place_id=place_id, photo_id="p"),
+        ):
+            entity = {"place_id": place_id, "notes": padding}
+            table.put_item(Item=create_record(USER, sk, entity))
+    return table
+
+
+@pytest.fixture
+def responses(partition):
+    """
+    Every raw Query response the table's client receives.
+    """
+    captured = []
+
+    def capture(parsed, **kwargs):
+        captured.append(parsed)
+
+    events = partition.meta.client.meta.events
+    events.register("after-call.dynamodb.Query", capture, unique_id="test-capture")
+    yield captured
+    events.unregister("after-call.dynamodb.Query", unique_id="test-capture")
+
+
+def test_query_entities_reads_only_its_entity(partition, responses):
+    items = list(query_entities(partition, USER, SortKeyPrefixes.PLACE))
+
+    assert len(items) == ENTITIES_PER_TYPE
+    assert all(
+        item[ScrapMapDDBSchema.SK].startswith(SortKeyPrefixes.PLACE) for item in items
+    )
+    assert responses[-1]["ScannedCount"] == ENTITIES_PER_TYPE
+
+
+def test_query_entities_reads_less_than_the_whole_partition(partition, responses):
+    # The handlers' query before entity scoping
+    whole = partition.query(KeyConditionExpression=Key(ScrapMapDDBSchema.PK).eq(USER))
+    places = list(query_entities(partition, USER, SortKeyPrefixes.PLACE))
+    scoped = responses[-1]
+
+    assert scoped["Count"] < whole["Count"]
+    assert scoped["ScannedCount"] < whole["ScannedCount"]
+    assert whole["ScannedCount"] == 3 * ENTITIES_PER_TYPE
+    # moto reports a flat ConsumedCapacity, so the units are worked out from
+    # the items each query read
+    assert _read_units(places) < _read_units(whole["Items"])
+    assert _read_units(places) <= _read_units(whole["Items"]) / 2
+
+
+def test_query_entities_skips_tombstones(partition):
+    sk = SortKeyFormatStrings.PLACE.format(place_id="id-0")
+    partition.put_item(Item=create_tombstone(USER, sk))
+
+    live = list(query_entities(partition, USER, SortKeyPrefixes.PLACE))
+    everything = list(
+        query_entities(partition, USER, SortKeyPrefixes.PLACE, include_deleted=True)
+    )
+
+    assert sk not in {item[ScrapMapDDBSchema.SK] for item in live}
+    assert len(live) == ENTITIES_PER_TYPE - 1
+    assert len(everything) == ENTITIES_PER_TYPE
+
+
+def _key(sk: str) -> Dict:
+    return {ScrapMapDDBSchema.PK: USER, ScrapMapDDBSchema.SK: sk}
+
+
+def _children(table, destination_id: str, count: int) -> List[Dict]:
+    keys = []
+    for index in range(count):
+        sk = SortKeyFormatStrings.PLACE.format(place_id=f"{destination_id}-{index}")
+        table.put_item(Item=create_record(USER, sk, {"place_id": sk}))
+        keys.append(_key(sk))
+    return keys
+
+
+# One below the transaction limit with the parent, and one over it
+@pytest.mark.parametrize("children", [3, 30])
+def test_delete_with_children_of_a_missing_parent_writes_nothing(table, children):
+    parent = _key(SortKeyFormatStrings.DESTINATION.format(place_id="missing"))
+    keys = _children(table, "missing", children)
+
+    result = delete_with_children(boto3.resource("dynamodb"), table, parent, iter(keys))
+
+    assert (result.found, result.deleted) == (False, 0)
+    assert "Item" not in table.get_item(Key=parent)
+    assert len(list(query_entities(table, USER, SortKeyPrefixes.PLACE))) == children
+
+
+@pytest.mark.parametrize("children", [3, 30])
+def test_delete_with_children_of_a_deleted_parent_writes_nothing(table, children):
+    sk = SortKeyFormatStrings.DESTINATION.format(place_id="gone")
+    tombstone = create_tombstone(USER, sk)
+    table.put_item(Item=tombstone)
+    keys = _children(table, "gone", children)
+
+    result = delete_with_children(
+        boto3.resource("dynamodb"), table, _key(sk), iter(keys)
+    )
+
+    assert (result.found, result.deleted) == (False, 0)
+    assert table.get_item(Key=_key(sk))["Item"] == tombstone
+    assert len(list(query_entities(table, USER, SortKeyPrefixes.PLACE))) == children
+
+
+@pytest.mark.parametrize("children", [3, 30])
+def test_delete_with_children_deletes_a_live_parent(table, children):
+    sk = SortKeyFormatStrings.DESTINATION.format(place_id="live")
+    table.put_item(Item=create_record(USER, sk, {"place_id": "live"}))
+    keys = _children(table, "live", children)
+
+    result = delete_with_children(
+        boto3.resource("dynamodb"), table, _key(sk), iter(keys)
+    )
+
+    assert (result.found, result.complete) == (True, True)
+    assert result.deleted == children + 1
+    assert table.get_item(Key=_key(sk))["Item"][ScrapMapDDBSchema.Deleted]
+    assert list(query_entities(table, USER, SortKeyPrefixes.PLACE)) == []
+
+
+@pytest.mark.parametrize("children", [3, 30])
+def test_delete_with_children_of_a_parent_deleted_meanwhile(
+    table, monkeypatch, children
+):
+    # The parent passes the first check, then is gone by the time it is written
+    monkeypatch.setattr("utils.boto3.dynamo._is_live", lambda table, key: True)
+    parent = _key(SortKeyFormatStrings.DESTINATION.format(place_id="raced"))
+    keys = _children(table, "raced", children)
+
+    result = delete_with_children(boto3.resource("dynamodb"), table, parent, iter(keys))
+
+    assert result.found is False
+    assert "Item" not in table.get_item(Key=parent)
@@ -0,0 +1,20 @@
+import io
+
+import pytest
+from PIL import Image
+
+from models.v1.photo import CONTENT_TYPES
+from utils.images import DERIVATIVES, render_all
+
+
+@pytest.mark.parametrize("content_type", CONTENT_TYPES)
+def test_accepted_uploads_can_be_rendered(content_type):
+    Image.init()
+    formats = {mime: format for format, mime in Image.MIME.items()}
+    body = io.BytesIO()
+    Image.new("RGB", (2000, 1000), "red").save(body, formats[content_type])
+
+    derivatives = render_all(body.getvalue())
+
+    assert [derivative.spec for derivative in derivatives] == list(DERIVATIVES)
+    assert derivatives[0].width == 160
@@ -0,0 +1,70 @@
+import base64
+import gzip
+
+import pytest
+
+from utils.boto3.lambda_ import (
+    MIN_COMPRESSED_SIZE,
+    brotli,
+    etag_matches,
+    make_etag,
+    make_response,
+)
+
+BODY = "[" + ",".join(['{"name":"place"}'] * MIN_COMPRESSED_SIZE) + "]"
+ETAG = make_etag("user-1", 3, "PLACE")
+
+
+def _etag(accept_encoding):
+    return make_response(200, BODY, {"ETag": ETAG}, accept_encoding=accept_encoding)[
+        "headers"
+    ]["ETag"]
+
+
+def test_each_content_coding_gets_its_own_etag():
+    identity = _etag(None)
+    gzipped = _etag("gzip")
+
+    assert identity == ETAG
+    assert gzipped == ETAG[:-1] + '-gzip"'
+    if brotli is not None:
+        assert _etag("br, gzip") == ETAG[:-1] + '-br"'
+
+
+def test_compressed_body_matches_its_coding():
+    response = make_response(200, BODY, {"ETag": ETAG}, accept_encoding="gzip")
+
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert gzip.decompress(base64.b64decode(response["body"])).decode() == BODY
+
+
+def test_small_bodies_keep_the_identity_etag():
+    response = make_response(200, "[]", {"ETag": ETAG}, accept_encoding="gzip")
+
+    assert response["headers"] == {"ETag": ETAG}
+
+
+def test_weak_etags_are_not_suffixed():
+    response = make_response(200, BODY, {"ETag": "W/" + ETAG}, accept_encoding="gzip")
+
+    assert response["headers"]["ETag"] == "W/" + ETAG
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    [ETAG, ETAG[:-1] + '-gzip"', ETAG[:-1] + '-br"', "W/" + ETAG, '"other", ' + ETAG],
+)
+def test_any_coding_of_the_current_etag_matches(if_none_match):
+    matched = etag_matches(if_none_match, ETAG)
+
+    assert matched is not None
+    assert matched in if_none_match
+
+
+@pytest.mark.parametrize("if_none_match", [None, "", '"other"', '"other-gzip"'])
+def test_other_etags_do_not_match(if_none_match):
+    assert etag_matches(if_none_match, ETAG) is None
+
+
+def test_wildcard_matches_the_current_etag():
+    assert etag_matches("*", ETAG) == ETAG
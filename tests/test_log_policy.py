@@ -0,0 +1,28 @@
+import json
+
+from utils.log_policy import REDACTED, redact
+
+
+def test_one_time_codes_are_redacted_in_bodies():
+    event = {
+        "path": "/v1/auth/verify",
+        "body": json.dumps({"username": "someone", "confirmation_code": "123456"}),
+    }
+
+    body = json.loads(redact(event)["body"])
+
+    assert body == {"username": "someone", "confirmation_code": REDACTED}
+
+
+def test_challenge_responses_are_redacted():
+    body = {
+        "challenge_name": "SMS_MFA",
+        "challenge_responses": {"USERNAME": "someone", "SMS_MFA_CODE": "123456"},
+        "session": "opaque",
+    }
+
+    assert redact(body) == {
+        "challenge_name": "SMS_MFA",
+        "challenge_responses": {"USERNAME": "someone", "SMS_MFA_CODE": REDACTED},
+        "session": REDACTED,
+    }
@@ -0,0 +1,53 @@
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from utils.boto3.secrets import SecretProvider
+
+SECRET_ARN = "arn:aws:secretsmanager:us-west-2:123456789012:secret:cursor"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def secretsmanager():
+    client = boto3.session.Session().client("secretsmanager")
+    with Stubber(client) as stubber:
+        yield client, stubber
+
+
+def _expect_get(stubber: Stubber, value: str):
+    stubber.add_response(
+        "get_secret_value", {"SecretString": value}, {"SecretId": SECRET_ARN}
+    )
+
+
+def test_secret_is_read_once_per_ttl(secretsmanager):
+    client, stubber = secretsmanager
+    clock = Clock()
+    provider = SecretProvider(lambda: client, ttl_seconds=60, clock=clock)
+    _expect_get(stubber, "first")
+    _expect_get(stubber, "second")
+
+    assert [provider.get(SECRET_ARN) for _ in range(5)] == ["first"] * 5
+    clock.now = 60
+    assert provider.get(SECRET_ARN) == "second"
+    stubber.assert_no_pending_responses()
+
+
+def test_invalidate_reloads_the_secret(secretsmanager):
+    client, stubber = secretsmanager
+    provider = SecretProvider(lambda: client)
+    _expect_get(stubber, "first")
+    _expect_get(stubber, "rotated")
+
+    assert provider.get(SECRET_ARN) == "first"
+    provider.invalidate(SECRET_ARN)
+    assert provider.get(SECRET_ARN) == "rotated"
+    stubber.assert_no_pending_responses()
@@ -0,0 +1,64 @@
+import json
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.types import Binary, TypeDeserializer, TypeSerializer
+
+from utils.boto3.dynamo import (
+    NativeNumberDeserializer,
+    SortKeyPrefixes,
+    create_record,
+    query_entities,
+    read_native_numbers,
+)
+from utils.serializers import serialize_items
+
+USER = "user-1"
+ENTITY = {
+    "place_id": "place-1",
+    "latitude": Decimal("47.606209"),
+    "longitude": Decimal("-122.332069"),
+    "visits": Decimal("3"),
+    # More digits than a float holds
+    "precise": Decimal("0.12345678901234567890"),
+    "tags": {"a", "b"},
+    "ratings": {Decimal("1"), Decimal("2.5")},
+    "thumbnail": Binary(b"\x00\x01"),
+    "nested": [{"flag": True, "missing": None}],
+}
+
+
+def test_numbers_are_native_where_lossless():
+    wire = TypeSerializer().serialize(ENTITY)
+
+    entity = NativeNumberDeserializer().deserialize(wire)
+
+    assert entity["latitude"] == 47.606209 and type(entity["latitude"]) is float
+    assert entity["visits"] == 3 and type(entity["visits"]) is int
+    assert entity["precise"] == ENTITY["precise"]
+    assert type(entity["precise"]) is Decimal
+    assert entity["ratings"] == {1, 2.5}
+    # Everything else as boto3 has it
+    expected = TypeDeserializer().deserialize(wire)
+    for name in ("place_id", "tags", "thumbnail", "nested"):
+        assert entity[name] == expected[name]
+
+
+def test_read_native_numbers_serializes_numbers_as_numbers(table):
+    table.put_item(Item=create_record(USER, "PLACE#place-1", ENTITY))
+    dynamo = read_native_numbers(boto3.resource("dynamodb"))
+    dynamo.Table(table.name)
+    # Handlers call it, then create the table, on every invocation
+    reader = read_native_numbers(dynamo).Table(table.name)
+
+    items = list(query_entities(reader, USER, SortKeyPrefixes.PLACE))
+    entity = json.loads(
+        serialize_items(
+            {k: v for k, v in item["Entity"].items() if k not in ("tags", "thumbnail")}
+            for item in items
+        )
+    )[0]
+
+    assert entity["latitude"] == 47.606209
+    assert entity["visits"] == 3
+    assert entity["precise"] == float(ENTITY["precise"])
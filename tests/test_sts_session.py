@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from utils.boto3.sts_session import SessionRegistry
+
+ROLE_ARN = "arn:aws:iam::123456789012:role/read"
+INVOCATIONS = 5
+
+
+def _credentials(expiration: datetime):
+    return {
+        "Credentials": {
+            "AccessKeyId": "ASIATESTINGTESTING",
+            "SecretAccessKey": "testing",
+            "SessionToken": "testing",
+            "Expiration": expiration,
+        }
+    }
+
+
+@pytest.fixture
+def sts():
+    client = boto3.session.Session().client("sts")
+    with Stubber(client) as stubber:
+        yield client, stubber
+
+
+@pytest.fixture
+def registry(sts):
+    client, _ = sts
+    return SessionRegistry(sts_client_factory=lambda: client)
+
+
+def _expect_assume_role(stubber: Stubber, expiration: datetime, session_name: str):
+    stubber.add_response(
+        "assume_role",
+        _credentials(expiration),
+        {"RoleArn": ROLE_ARN, "RoleSessionName": session_name},
+    )
+
+
+def test_warm_invocations_assume_the_role_once(sts, registry):
+    _, stubber = sts
+    # The stubber raises on any AssumeRole beyond the one queued
+    _expect_assume_role(
+        stubber, datetime.now(timezone.utc) + timedelta(hours=1), "GET_PLACES"
+    )
+
+    resources = [
+        registry.resource("dynamodb", role_arn=ROLE_ARN, role_session_name="GET_PLACES")
+        for _ in range(INVOCATIONS)
+    ]
+
+    stubber.assert_no_pending_responses()
+    assert all(resource is resources[0] for resource in resources)
+    assert registry.misses == 1
+    assert registry.hits == INVOCATIONS - 1
+    assert registry.stats()["sessions"] == 1
+
+
+def test_clients_of_a_session_share_its_credentials(sts, registry):
+    _, stubber = sts
+    _expect_assume_role(
+        stubber, datetime.now(timezone.utc) + timedelta(hours=1), "GET_PLACES"
+    )
+
+    for _ in range(INVOCATIONS):
+        registry.resource("dynamodb", role_arn=ROLE_ARN, role_session_name="GET_PLACES")
+        registry.client("dynamodb", role_arn=ROLE_ARN, role_session_name="GET_PLACES")
+
+    stubber.assert_no_pending_responses()
+    assert registry.misses == 2
+    assert registry.hits == 2 * INVOCATIONS - 2
+    assert registry.stats()["clients"] == 2
+
+
+def test_shared_session_name_assumes_the_role_once(sts, registry):
+    _, stubber = sts
+    _expect_assume_role(
+        stubber, datetime.now(timezone.utc) + timedelta(hours=1), "SCRAPMAP_API"
+    )
+    registry.share_sessions("SCRAPMAP_API")
+
+    for name in ("GET_PLACES", "GET_DESTINATIONS", "DELETE_PLACE"):
+        registry.resource("dynamodb", role_arn=ROLE_ARN, role_session_name=name)
+
+    stubber.assert_no_pending_responses()
+    assert registry.misses == 1
+    assert registry.hits == 2
+
+
+def test_expired_session_is_rebuilt(sts, registry):
+    _, stubber = sts
+    _expect_assume_role(
+        stubber, datetime.now(timezone.utc) - timedelta(minutes=1), "GET_PLACES"
+    )
+    _expect_assume_role(
+        stubber, datetime.now(timezone.utc) + timedelta(hours=1), "GET_PLACES"
+    )
+
+    first = registry.session(role_arn=ROLE_ARN, role_session_name="GET_PLACES")
+    second = registry.session(role_arn=ROLE_ARN, role_session_name="GET_PLACES")
+    assert second is not first
+
+    second.get_credentials()
+    stubber.assert_no_pending_responses()
+    assert registry.session(role_arn=ROLE_ARN, role_session_name="GET_PLACES") is second